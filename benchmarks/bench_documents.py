@@ -0,0 +1,129 @@
+"""Benchmark for holding and checking extracted documents in bulk.
+
+Generates claims of a bill, a discharge summary and an ID card as the agents
+extract them: fresh strings per document, hospitals, diagnoses and providers
+drawn from small sets, int amounts (1% of them 0, which the engine rejects)
+and stays that sometimes end before they start or miss the service date.
+
+Memory: Python memory retained per million documents, traced while building
+``--claims`` claims and scaled, for the agents' dicts, slotted records
+(``compact``) and a DocumentBatch. Each form is built from generated dicts
+that are then dropped, so only what the form keeps is counted.
+
+Throughput: documents per second through the date and amount checks, per
+claim with AdvancedClaimValidator and AdvancedClaimDecisionEngine and over
+the whole batch with ``date_discrepancies`` and ``invalid_bill_amounts``;
+building the batch is timed separately. Both must find the same claims.
+
+    python benchmarks/bench_documents.py --claims 100000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.routes.claim import AdvancedClaimDecisionEngine, AdvancedClaimValidator  # noqa: E402
+from src.services.document_batch import DocumentBatch, compact  # noqa: E402
+
+HOSPITALS = ["City General Hospital", "St. Mary's Medical Center", "Riverside Clinic", "Mercy Hospital"]
+DIAGNOSES = ["Pneumonia", "Fractured femur", "Appendicitis", "Myocardial infarction", "Bronchitis"]
+PROVIDERS = ["HealthFirst Insurance", "MediCare Plus", "SecureLife Health"]
+
+
+def fresh(value):
+    """A new string object, as a regex match in the agents gives"""
+    return "".join(list(value))
+
+
+def generate_claims(count, seed):
+    rng = random.Random(seed)
+    for number in range(count):
+        admission = 738_000 + rng.randint(0, 1000)
+        stay = rng.randint(-2, 14)
+        service = admission + rng.randint(-3, max(stay, 0) + 3)
+        name = fresh(f"Patient {number:07d}")
+
+        def day(ordinal):
+            return fresh(time.strftime("%Y-%m-%d", time.gmtime((ordinal - 719_163) * 86400)))
+
+        yield [
+            {"type": "bill", "hospital_name": fresh(rng.choice(HOSPITALS)),
+             "total_amount": rng.randint(100, 1_000_000) if rng.random() > 0.01 else 0,
+             "date_of_service": day(service)},
+            {"type": "discharge_summary", "patient_name": name, "diagnosis": fresh(rng.choice(DIAGNOSES)),
+             "admission_date": day(admission), "discharge_date": day(admission + stay)},
+            {"type": "id_card", "patient_name": fresh(name), "id_number": fresh(f"ID{rng.randint(0, 10 ** 9):09d}"),
+             "insurance_provider": fresh(rng.choice(PROVIDERS))},
+        ]
+
+
+def retained(build, claims, seed):
+    """Bytes ``build`` keeps from the generated claims, traced"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(generate_claims(claims, seed))
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def per_claim_checks(claims):
+    validator, engine = AdvancedClaimValidator(), AdvancedClaimDecisionEngine()
+    dates, amounts = {}, []
+    for index, documents in enumerate(claims):
+        validation = validator.validate(documents)
+        found = [message for message in validation["discrepancies"] if "date" in message]
+        if found:
+            dates[index] = found
+        # The engine stops at discrepancies; check the amount on its own
+        decision = engine.make_decision(documents, {})
+        if decision["reason"] == "Invalid or missing bill amount":
+            amounts.append(index)
+    return dates, amounts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--claims", type=int, default=100_000)
+    parser.add_argument("--memory-claims", type=int, default=50_000, help="claims built to measure memory")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    documents = args.memory_claims * 3
+    print(f"{'form':<16}{'MB per million documents':>26}{'bytes per document':>20}")
+    for label, build in (("dicts", list),
+                         ("slotted records", lambda claims: [[compact(doc) for doc in docs] for docs in claims]),
+                         ("DocumentBatch", DocumentBatch.from_claims)):
+        size = retained(build, args.memory_claims, args.seed)
+        print(f"{label:<16}{size / documents * 1_000_000 / 1024 ** 2:>26.1f}{size / documents:>20.1f}")
+
+    claims = list(generate_claims(args.claims, args.seed))
+    documents = args.claims * 3
+    start = time.perf_counter()
+    expected_dates, expected_amounts = per_claim_checks(claims)
+    per_claim = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = DocumentBatch.from_claims(claims)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    dates, amounts = batch.date_discrepancies(), batch.invalid_bill_amounts()
+    columnar = time.perf_counter() - start
+    if dates != expected_dates or amounts != expected_amounts:
+        sys.exit("DocumentBatch checks differ from the per-claim validator")
+
+    print(f"\n{'checks':<24}{'documents/s':>14}{'ms':>10}")
+    print(f"{'validator + engine':<24}{documents / per_claim:>14.0f}{per_claim * 1000:>10.1f}")
+    print(f"{'DocumentBatch build':<24}{documents / build:>14.0f}{build * 1000:>10.1f}")
+    print(f"{'DocumentBatch checks':<24}{documents / columnar:>14.0f}{columnar * 1000:>10.1f}")
+    print(f"\n{len(dates)} claims with date discrepancies, {len(amounts)} with invalid amounts, both agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark for handing upload bytes to claim pool workers.
+
+Each claim of ``--files`` uploads of a given size is handed to a pool of
+``--workers`` spawned workers with run_isolated, the way process_documents
+does. The worker reads the upload through open_content, as pypdf would.
+"pickled": bytes sent in the job, as before SharedUploads. "shared":
+SharedUploads writes each upload to a file in /dev/shm and the job carries a
+MappedUpload that the worker maps.
+
+Reported per claim:
+- copies of each upload made on the way: pickled copies 4 times (into the
+  pickle, into the pipe, out of it, into the unpickled bytes); shared
+  copies once (into the shared file) and the worker reads the mapping;
+- bytes pickled into jobs;
+- bytes written to shared files;
+- peak Python memory allocated in the parent during the hand-off;
+- median and p95 wall time per claim.
+
+    python benchmarks/bench_handoff.py --sizes 64,512,4096 --files 4 --claims 30
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from multiprocessing.reduction import ForkingPickler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.uploads import SharedUploads, open_content  # noqa: E402
+from src.services.worker_pool import run_isolated, shutdown_pools, warm_pool  # noqa: E402
+
+COPIES = {"pickled": 4, "shared": 1}
+
+
+def read_upload(filename, content):
+    """Read an upload the way pypdf does, in chunks from a seekable stream"""
+    stream = open_content(content)
+    total = 0
+    for chunk in iter(lambda: stream.read(64 * 1024), b""):
+        total += len(chunk)
+    return total
+
+
+def noop():
+    return None
+
+
+def hand_off(jobs, workers, shared_uploads):
+    with shared_uploads.share(jobs) as worker_jobs:
+        outcomes = run_isolated(read_upload, worker_jobs, workers, timeout=60)
+    for result, error in outcomes:
+        if error is not None:
+            raise error
+
+
+def bytes_moved(jobs, shared_uploads):
+    """(bytes pickled into the jobs, bytes written to shared files)"""
+    with shared_uploads.share(jobs) as worker_jobs:
+        pickled = sum(len(ForkingPickler.dumps(job)) for job in worker_jobs)
+    return pickled, sum(len(content) for _, content in jobs if shared_uploads.shared(content))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="64,512,4096", help="upload sizes in KB, comma separated")
+    parser.add_argument("--files", type=int, default=4, help="uploads per claim")
+    parser.add_argument("--claims", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    warm_pool(noop, args.workers, timed=True)
+    print(f"{'upload KB':>9} {'transport':<9} {'copies':>6} {'pickled KB':>11} {'shared KB':>10} "
+          f"{'parent peak KB':>15} {'p50 ms':>8} {'p95 ms':>8}")
+    try:
+        for size_kb in (int(size) for size in args.sizes.split(",")):
+            jobs = [(f"upload{index}.pdf", os.urandom(size_kb * 1024)) for index in range(args.files)]
+            for transport in ("pickled", "shared"):
+                shared_uploads = SharedUploads()
+                shared_uploads.enabled = transport == "shared"
+                shared_uploads.min_bytes = 1
+                hand_off(jobs, args.workers, shared_uploads)
+                pickled, written = bytes_moved(jobs, shared_uploads)
+                times, peaks = [], []
+                for _ in range(args.claims):
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    hand_off(jobs, args.workers, shared_uploads)
+                    times.append(time.perf_counter() - start)
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+                times.sort()
+                print(f"{size_kb:>9} {transport:<9} {COPIES[transport]:>6} {pickled / 1024:>11.1f} "
+                      f"{written / 1024:>10.1f} {statistics.median(peaks) / 1024:>15.1f} "
+                      f"{statistics.median(times) * 1000:>8.2f} {times[int(0.95 * (len(times) - 1))] * 1000:>8.2f}")
+    finally:
+        shutdown_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark for the document classifier's keyword scoring.
+
+Compares ``KeywordScorer.score`` with the previous approach (one ``in`` scan
+of the lowercased text per indicator of every label), with its substring scan
+of each distinct indicator and with its single-pass Aho-Corasick matcher, on
+multi-MB texts, first with the three built-in document types and then with
+extra synthetic types registered to show how each approach scales with the
+number of indicators and where AUTOMATON_MIN_INDICATORS should sit.
+
+    python benchmarks/bench_keyword_scorer.py --megabytes 1 4 8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.routes.claim import DOCUMENT_INDICATORS  # noqa: E402
+from src.services.keyword_scorer import AhoCorasick, KeywordScorer  # noqa: E402
+
+VOCABULARY = (
+    "the patient was seen in clinic for follow up of chronic back pain and was advised "
+    "physiotherapy twice weekly with review of imaging results at the next scheduled visit "
+    "medication was continued at the current dose and no adverse reactions were reported"
+).split()
+
+
+def synthetic_text(megabytes, rng):
+    words = []
+    size = 0
+    while size < megabytes * 1024 * 1024:
+        word = rng.choice(VOCABULARY)
+        words.append(word)
+        size += len(word) + 1
+    # Sprinkle a few real indicators so both approaches do some matching
+    for indicator in ("invoice", "amount due", "discharge summary", "member id"):
+        words.insert(rng.randrange(len(words)), indicator)
+    return " ".join(words).lower()
+
+
+def legacy_score(scorer, text_lower):
+    return {
+        label: sum(1 for indicator in scorer.indicators(label) if indicator in text_lower)
+        for label in scorer.labels
+    }
+
+
+def automaton_score(scorer, automaton, text_lower):
+    found = automaton.find(text_lower)
+    return {
+        label: sum(1 for indicator in scorer.indicators(label) if indicator in found)
+        for label in scorer.labels
+    }
+
+
+def extended_scorer(extra_types, seed, **options):
+    rng = random.Random(seed)
+    scorer = KeywordScorer(**options)
+    for label in DOCUMENT_INDICATORS.labels:
+        scorer.register(label, DOCUMENT_INDICATORS.indicators(label))
+    for index in range(extra_types):
+        scorer.register(f"type_{index}", [
+            "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(6, 14)))
+            for _ in range(10)
+        ])
+    return scorer
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=float, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--extra-types", type=int, nargs="+", default=[0, 10, 30, 50, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'MB':>5} {'types':>6} {'indicators':>10} {'legacy ms':>10} {'substring ms':>13} "
+          f"{'automaton ms':>13} {'scorer ms':>10} {'speedup':>8}")
+    for megabytes in args.megabytes:
+        text = synthetic_text(megabytes, rng)
+        for extra in args.extra_types:
+            scorer = extended_scorer(extra, args.seed)
+            substring = extended_scorer(extra, args.seed, automaton_min_indicators=float("inf"))
+            automaton = AhoCorasick({indicator for label in scorer.labels for indicator in scorer.indicators(label)})
+            expected = legacy_score(scorer, text)
+            if expected != scorer.score(text) or expected != substring.score(text) or \
+                    expected != automaton_score(scorer, automaton, text):
+                raise SystemExit(f"score mismatch at {megabytes} MB with {extra} extra types")
+            indicators = sum(len(scorer.indicators(label)) for label in scorer.labels)
+            legacy = timed(lambda: legacy_score(scorer, text), args.repeat)
+            scan = timed(lambda: substring.score(text), args.repeat)
+            single_pass = timed(lambda: automaton_score(scorer, automaton, text), args.repeat)
+            chosen = timed(lambda: scorer.score(text), args.repeat)
+            print(f"{megabytes:>5g} {len(scorer.labels):>6} {indicators:>10} {legacy * 1000:>10.1f} "
+                  f"{scan * 1000:>13.1f} {single_pass * 1000:>13.1f} {chosen * 1000:>10.1f} "
+                  f"{legacy / chosen:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Benchmark of claim serving under overload.
+
+Starts the app in a subprocess, threaded (``python src/main.py``) or ASGI
+(``python -m src.asgi``), and has ``--clients`` concurrent clients post
+synthetic claims for ``--seconds``, each sending its next claim as soon as
+the last one is answered (after Retry-After on 429, when
+``--honor-retry-after`` is given). A probe polls /api/health meanwhile.
+Reported: completed claims per second, latency of successful claims,
+how many requests were shed with 429 or failed otherwise, and health check
+latency. Compare a run with the cap and one without it:
+
+    python benchmarks/bench_overload.py --server asgi --clients 32
+    python benchmarks/bench_overload.py --server threaded --clients 32 --max-in-flight 0
+
+The server runs from a temporary copy of src/, so app.db is left alone.
+Every upload gets a unique trailing PDF comment, so no claim is served from
+the extraction cache.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pdf import synthetic_claim  # noqa: E402
+
+
+def multipart(files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for filename, content in files:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+                     f'Content-Type: application/pdf\r\n\r\n'.encode() + content + b"\r\n")
+    return b"".join(parts) + f"--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def start_server(args, database_dir):
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(args.port),
+        "HOST": "127.0.0.1",
+        "CLAIM_MAX_IN_FLIGHT": str(args.max_in_flight),
+        "CLAIM_MAX_QUEUED": str(args.max_queued),
+        "CLAIM_QUEUE_TIMEOUT": str(args.queue_timeout),
+        "CLAIM_WORKERS": str(args.workers),
+        "CLAIM_TIMING_LOG": "",
+        "CLAIM_JOB_WORKERS": "0",
+        "DUPLICATE_DETECTION": "0",
+    })
+    command = [sys.executable, "-m", "src.asgi"] if args.server == "asgi" else [sys.executable, "src/main.py"]
+    shutil.copytree(os.path.join(ROOT, "src"), os.path.join(database_dir, "src"),
+                    ignore=shutil.ignore_patterns("__pycache__", "claim_jobs", "*.db-wal", "*.db-shm"))
+    process = subprocess.Popen(command, cwd=database_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{args.port}/api/health", timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit("server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", choices=("threaded", "asgi"), default="asgi")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="CLAIM_WORKERS")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--max-queued", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=5)
+    parser.add_argument("--request-timeout", type=float, default=30, help="client timeout per request")
+    parser.add_argument("--honor-retry-after", action="store_true")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    claims = [synthetic_claim(rng, pages=args.pages) for _ in range(16)]
+    url = f"http://127.0.0.1:{args.port}"
+    lock = threading.Lock()
+    latencies, health = [], []
+    counts = {"ok": 0, "shed": 0, "failed": 0}
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = start_server(args, directory)
+        stop_at = time.monotonic() + args.seconds
+        try:
+            def client(index):
+                position = index
+                while time.monotonic() < stop_at:
+                    body, content_type = multipart([
+                        (filename, content + f"\n%{uuid.uuid4().hex}\n".encode())
+                        for filename, content in claims[position % len(claims)]
+                    ])
+                    position += 1
+                    request = urllib.request.Request(f"{url}/api/process-claim", data=body,
+                                                     headers={"Content-Type": content_type})
+                    start = time.perf_counter()
+                    wait = 0
+                    try:
+                        urllib.request.urlopen(request, timeout=args.request_timeout).read()
+                        outcome = "ok"
+                    except urllib.error.HTTPError as e:
+                        outcome = "shed" if e.code == 429 else "failed"
+                        wait = int(e.headers.get("Retry-After") or 0) if args.honor_retry_after else 0
+                    except OSError:
+                        outcome = "failed"
+                    with lock:
+                        counts[outcome] += 1
+                        if outcome == "ok":
+                            latencies.append(time.perf_counter() - start)
+                    time.sleep(min(wait, max(0.0, stop_at - time.monotonic())))
+
+            def probe():
+                while time.monotonic() < stop_at:
+                    start = time.perf_counter()
+                    try:
+                        urllib.request.urlopen(f"{url}/api/health", timeout=args.request_timeout).read()
+                        health.append(time.perf_counter() - start)
+                    except OSError:
+                        health.append(float("inf"))
+                    time.sleep(0.25)
+
+            threads = [threading.Thread(target=client, args=(index,)) for index in range(args.clients)]
+            threads.append(threading.Thread(target=probe))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.server} server, {args.clients} clients for {args.seconds:g}s, "
+          f"CLAIM_MAX_IN_FLIGHT={args.max_in_flight} CLAIM_MAX_QUEUED={args.max_queued}")
+    print(f"claims completed    {counts['ok']:>8} ({counts['ok'] / args.seconds:.1f}/s)")
+    print(f"shed with 429       {counts['shed']:>8}")
+    print(f"failed or timed out {counts['failed']:>8}")
+    print(f"claim latency ms    p50 {percentile(latencies, 0.5) * 1000:>8.0f}  p95 {percentile(latencies, 0.95) * 1000:>8.0f}"
+          f"  max {max(latencies, default=float('nan')) * 1000:>8.0f}")
+    finite = [sample for sample in health if sample != float("inf")]
+    print(f"health latency ms   p50 {statistics.median(finite) * 1000 if finite else float('nan'):>8.1f}"
+          f"  max {max(finite, default=float('nan')) * 1000:>8.1f}  failed {len(health) - len(finite)}")
+
+
+if __name__ == "__main__":
+    main()
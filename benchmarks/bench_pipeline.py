@@ -0,0 +1,241 @@
+"""Benchmark the claim pipeline stage by stage and end to end.
+
+Generates a reproducible corpus of synthetic claims (bill, discharge summary
+and ID card per claim, see ``synthetic_pdf.synthetic_claim``) and times:
+
+    extract           AdvancedTextExtractor, per document
+    classify          AdvancedDocumentClassifier, per document
+    <type>_agent      each agent on its own documents' text
+    validate          AdvancedClaimValidator, per claim
+    decide            AdvancedClaimDecisionEngine, per claim
+    pipeline          run_claim in-process, per claim
+    flask             POST /api/process-claim through the Flask test client
+
+Each case reports p50/p95/p99 latency, throughput and the peak memory traced
+while running a few operations on their own (pool workers are not traced, so
+run with --workers 1 to measure memory). The extraction cache is disabled so
+every pass measures real work.
+
+Results can be saved as JSON and compared with a stored baseline; the run
+exits with status 1 if any case's p50 or p95 regressed by more than the
+tolerance:
+
+    python benchmarks/bench_pipeline.py --pages 5 --output baseline.json
+    python benchmarks/bench_pipeline.py --pages 5 --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from io import BytesIO
+
+# The Flask case imports the app; keep its background job workers and
+# per-claim timing log out of the measurements
+os.environ.setdefault("CLAIM_JOB_WORKERS", "0")
+os.environ.setdefault("CLAIM_TIMING_LOG", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pypdf  # noqa: E402
+from synthetic_pdf import KINDS, PLACEMENTS, synthetic_claim  # noqa: E402
+from src.routes.claim import (  # noqa: E402
+    EXTRACTION_CACHE, AdvancedBillAgent, AdvancedClaimDecisionEngine, AdvancedClaimValidator,
+    AdvancedDischargeAgent, AdvancedDocumentClassifier, AdvancedIDCardAgent, AdvancedTextExtractor, run_claim,
+)
+
+CASES = ("extract", "classify", "bill_agent", "discharge_summary_agent", "id_card_agent",
+         "validate", "decide", "pipeline", "flask")
+AGENTS = {
+    "bill": AdvancedBillAgent,
+    "discharge_summary": AdvancedDischargeAgent,
+    "id_card": AdvancedIDCardAgent,
+}
+MEMORY_SAMPLES = 3
+
+
+def percentile(ordered, q):
+    """Linear-interpolated percentile of already sorted samples"""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure(operations, repeat, warmup, pages=0):
+    """Time every operation ``repeat`` times and summarise the samples"""
+    for operation in operations[:warmup]:
+        operation()
+    samples = []
+    for _ in range(repeat):
+        for operation in operations:
+            start = time.perf_counter()
+            operation()
+            samples.append(time.perf_counter() - start)
+
+    peak = 0
+    tracemalloc.start()
+    for operation in operations[:MEMORY_SAMPLES]:
+        tracemalloc.reset_peak()
+        operation()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    samples.sort()
+    total = sum(samples)
+    result = {
+        "ops": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p95_ms": round(percentile(samples, 95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "mean_ms": round(total / len(samples) * 1000, 4),
+        "ops_per_sec": round(len(samples) / total, 2),
+        "peak_mb": round(peak / 2 ** 20, 3),
+    }
+    if pages:
+        result["pages_per_sec"] = round(pages * repeat / total, 2)
+    return result
+
+
+def build_corpus(args):
+    rng = random.Random(args.seed)
+    claims = [
+        synthetic_claim(rng, args.pages, args.lines_per_page, args.words_per_line, args.placement)
+        for _ in range(args.claims)
+    ]
+    documents = [(filename, content, kind) for claim in claims for (filename, content), kind in zip(claim, KINDS)]
+    texts = [AdvancedTextExtractor().extract_text_from_pdf(BytesIO(content)) for _, content, _ in documents]
+
+    # The corpus is only useful if it exercises the real paths
+    classifier = AdvancedDocumentClassifier()
+    for (filename, _, kind), text in zip(documents, texts):
+        if classifier.classify_document(filename, text) != kind:
+            raise SystemExit(f"synthetic {kind} was not classified as such; adjust the corpus options")
+    return claims, documents, texts
+
+
+def operations_for(case, args, claims, documents, texts):
+    """Zero-argument callables for one case and the number of PDF pages they cover"""
+    streaming = args.mode == "streaming"
+    if case == "extract":
+        return [lambda content=content: AdvancedTextExtractor().extract_text_from_pdf(BytesIO(content))
+                for _, content, _ in documents], len(documents) * args.pages
+    if case == "classify":
+        return [lambda filename=filename, text=text: AdvancedDocumentClassifier().classify_document(filename, text)
+                for (filename, _, _), text in zip(documents, texts)], 0
+    if case.endswith("_agent"):
+        agent = AGENTS[case[:-len("_agent")]]
+        return [lambda text=text: agent().process(text)
+                for (_, _, kind), text in zip(documents, texts) if agent is AGENTS[kind]], 0
+
+    processed = [[AGENTS[kind]().process(text) for (_, _, kind), text in zip(documents[i:i + len(KINDS)],
+                                                                              texts[i:i + len(KINDS)])]
+                 for i in range(0, len(documents), len(KINDS))]
+    if case == "validate":
+        return [lambda docs=docs: AdvancedClaimValidator().validate(docs) for docs in processed], 0
+    if case == "decide":
+        validations = [AdvancedClaimValidator().validate(docs) for docs in processed]
+        return [lambda docs=docs, validation=validation: AdvancedClaimDecisionEngine().make_decision(docs, validation)
+                for docs, validation in zip(processed, validations)], 0
+    if case == "pipeline":
+        return [lambda claim=claim: run_claim(claim, args.workers, streaming, args.classify_pages)
+                for claim in claims], len(documents) * args.pages
+    if case == "flask":
+        from src.main import app, init_db
+        init_db()
+        app.config.update(CLAIM_WORKERS=args.workers, EXTRACTION_MODE=args.mode, CLASSIFY_PAGES=args.classify_pages)
+        EXTRACTION_CACHE.enabled = False
+        client = app.test_client()
+
+        def post(claim):
+            files = [(BytesIO(content), filename) for filename, content in claim]
+            response = client.post("/api/process-claim", data={"files": files}, content_type="multipart/form-data")
+            if response.status_code != 200:
+                raise SystemExit(f"/api/process-claim returned {response.status_code}")
+        return [lambda claim=claim: post(claim) for claim in claims], len(documents) * args.pages
+    raise ValueError(f"unknown case {case!r}")
+
+
+def compare(results, baseline, tolerance):
+    """Print p50/p95 changes against a baseline run and return the regressed cases"""
+    if baseline.get("config") != results["config"]:
+        print("warning: baseline was recorded with a different corpus or configuration")
+    regressions = []
+    print(f"\n{'case':<24} {'p50 ms':>10} {'base':>10} {'change':>8} {'p95 ms':>10} {'base':>10} {'change':>8}")
+    for case, current in results["cases"].items():
+        previous = baseline.get("cases", {}).get(case)
+        if previous is None:
+            continue
+        changes = []
+        for key in ("p50_ms", "p95_ms"):
+            changes.append(current[key] / previous[key] - 1 if previous[key] else 0.0)
+        flag = "  REGRESSED" if max(changes) > tolerance else ""
+        if flag:
+            regressions.append(case)
+        print(f"{case:<24} {current['p50_ms']:>10.3f} {previous['p50_ms']:>10.3f} {changes[0]:>+8.1%} "
+              f"{current['p95_ms']:>10.3f} {previous['p95_ms']:>10.3f} {changes[1]:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--claims", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=3, help="pages per document")
+    parser.add_argument("--lines-per-page", type=int, default=40)
+    parser.add_argument("--words-per-line", type=int, default=12)
+    parser.add_argument("--placement", choices=PLACEMENTS, default="first",
+                        help="where the field lines go: first page, last page or one per page")
+    parser.add_argument("--mode", choices=("full", "streaming"), default="full")
+    parser.add_argument("--classify-pages", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=1, help="claim pool size for the pipeline and flask cases")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes over the corpus")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed operations before each case")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results JSON of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50/p95 slowdown, as a fraction")
+    args = parser.parse_args()
+
+    EXTRACTION_CACHE.enabled = False
+    claims, documents, texts = build_corpus(args)
+    config = {key: getattr(args, key) for key in (
+        "claims", "pages", "lines_per_page", "words_per_line", "placement", "mode", "classify_pages",
+        "workers", "repeat", "seed")}
+    results = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pypdf": pypdf.__version__,
+        "config": config,
+        "cases": {},
+    }
+
+    print(f"{'case':<24} {'ops':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'pages/s':>9} {'peak MB':>8}")
+    for case in args.cases:
+        operations, pages = operations_for(case, args, claims, documents, texts)
+        result = measure(operations, args.repeat, args.warmup, pages)
+        results["cases"][case] = result
+        pages_per_sec = f"{result['pages_per_sec']:>9.1f}" if "pages_per_sec" in result else f"{'':>9}"
+        print(f"{case:<24} {result['ops']:>5} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+              f"{result['p99_ms']:>10.3f} {result['ops_per_sec']:>10.1f} {pages_per_sec} {result['peak_mb']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            raise SystemExit(f"regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
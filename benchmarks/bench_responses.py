@@ -0,0 +1,150 @@
+"""Benchmark for JSON encoding and compression of large responses.
+
+Builds synthetic batch results (claim results as /api/process-claim-batch
+streams them) and user lists, then compares Flask's default JSON provider
+with the orjson provider, uncompressed and compressed with gzip and zstd at
+the levels ResponseCompression uses. CPU time is the best of several runs;
+bytes are what goes on the wire. The last table compares peak memory of a
+user list built with jsonify against one streamed by stream_json_list.
+
+    python benchmarks/bench_responses.py --claims 2000 --users 100000
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zstandard  # noqa: E402
+from flask import Flask, jsonify  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from src.services.responses import (  # noqa: E402
+    DEFAULT_GZIP_LEVEL, DEFAULT_ZSTD_LEVEL, OrjsonProvider, json_line, stream_json_list,
+)
+
+NAMES = ("Jane Roe", "John Doe", "Ana Silva", "Wei Chen", "Priya Patel", "Omar Haddad")
+HOSPITALS = ("City Hospital", "St Mary Medical Center", "Riverside Clinic", "General Hospital")
+
+
+def synthetic_claim(index, rng):
+    name = rng.choice(NAMES)
+    documents = [
+        {"type": "bill", "hospital_name": rng.choice(HOSPITALS), "total_amount": rng.randint(100, 90000),
+         "date_of_service": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"},
+        {"type": "discharge_summary", "patient_name": name, "diagnosis": "Fracture of the left radius",
+         "admission_date": "2024-04-01", "discharge_date": "2024-04-10"},
+        {"type": "id_card", "patient_name": name, "id_number": f"HP{rng.randint(100000, 999999)}",
+         "insurance_provider": "Acme Health"},
+    ]
+    approved = rng.random() < 0.7
+    return {
+        "claim_id": f"c{index:06d}",
+        "documents": documents,
+        "validation": {"missing_documents": [], "discrepancies": [] if approved else ["Patient name mismatch"]},
+        "claim_decision": {"status": "approved" if approved else "rejected",
+                           "reason": "All required documents present and data is consistent" if approved
+                           else "Data discrepancies found: Patient name mismatch"},
+    }
+
+
+def synthetic_users(count):
+    return [{"id": index, "username": f"user{index}", "email": f"user{index}@example.com"}
+            for index in range(count)]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = fn()
+        best = min(best, time.process_time() - start)
+    return best, result
+
+
+def compare(title, payload, ndjson, app, repeat):
+    default = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app)
+    # NDJSON lines were written with json.dumps; lists are what jsonify returns
+    if ndjson:
+        encoders = {
+            "json": lambda: "".join(json.dumps(line) + "\n" for line in payload).encode("utf-8"),
+            "orjson": lambda: b"".join(json_line(line) for line in payload),
+        }
+    else:
+        encoders = {
+            "json": lambda: default.response(payload).get_data(),
+            "orjson": lambda: fast.response(payload).get_data(),
+        }
+    compressors = {
+        "identity": lambda data: data,
+        "gzip": lambda data: gzip.compress(data, DEFAULT_GZIP_LEVEL, mtime=0),
+        "zstd": lambda data: zstandard.ZstdCompressor(level=DEFAULT_ZSTD_LEVEL).compress(data),
+    }
+
+    print(f"\n{title}")
+    print(f"{'encoder':<8} {'encoding':<9} {'encode ms':>10} {'compress ms':>12} {'total ms':>9} {'bytes':>11}")
+    for encoder_name, encode in encoders.items():
+        encode_seconds, data = timed(encode, repeat)
+        for encoding, compress in compressors.items():
+            compress_seconds, body = timed(lambda: compress(data), repeat)
+            print(f"{encoder_name:<8} {encoding:<9} {encode_seconds * 1000:>10.1f} {compress_seconds * 1000:>12.1f} "
+                  f"{(encode_seconds + compress_seconds) * 1000:>9.1f} {len(body):>11}")
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare_streaming(app, count):
+    def rows():
+        for index in range(count):
+            yield {"id": index, "username": f"user{index}", "email": f"user{index}@example.com"}
+
+    def built():
+        with app.test_request_context():
+            return jsonify(list(rows())).get_data()
+
+    def streamed():
+        with app.test_request_context():
+            return sum(len(chunk) for chunk in stream_json_list(rows()).response)
+
+    print(f"\n{count} users, peak Python memory")
+    for name, fn in (("jsonify", built), ("stream", streamed)):
+        start = time.process_time()
+        peak = peak_memory(fn)
+        print(f"{name:<8} {peak / 1024 / 1024:>8.1f} MB {(time.process_time() - start) * 1000:>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--claims", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    claims = [synthetic_claim(index, rng) for index in range(args.claims)]
+    with app.app_context():
+        compare(f"{args.claims} batch results (NDJSON)", claims, True, app, args.repeat)
+        compare(f"{args.claims} claim results (one JSON list)", claims, False, app, args.repeat)
+        compare(f"{args.users} users (JSON list)", synthetic_users(args.users), False, app, args.repeat)
+    compare_streaming(app, args.users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark of cold start: app import time and first-request latency.
+
+Every run starts a fresh interpreter that imports src.main and then posts two
+synthetic claims to /api/process-claim through the Flask test client. The
+first request pays for everything the startup mode left for later (pypdf,
+text extraction modules, pipeline state); the second shows the steady state.
+Medians over the runs are reported, followed by the modules with the most
+import time of their own, from ``python -X importtime``.
+
+Claims are processed in the request process with the extraction cache,
+claim store and duplicate detection off, so the runs leave app.db alone and
+every run does the same work. With a threshold the run exits with status 1
+when the median exceeds it, so a regression fails CI:
+
+    python benchmarks/bench_startup.py --runs 7
+    python benchmarks/bench_startup.py --mode warm
+    python benchmarks/bench_startup.py --max-import-ms 800 --max-first-request-ms 400
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the fresh interpreter; prints one JSON line of timings in ms
+CHILD = """
+import json, random, sys, time
+from io import BytesIO
+start = time.perf_counter()
+from src.main import app
+imported = time.perf_counter()
+from src.routes.claim import EXTRACTION_CACHE
+from synthetic_pdf import synthetic_claim
+EXTRACTION_CACHE.enabled = False
+rng = random.Random(int(sys.argv[1]))
+claims = [synthetic_claim(rng) for _ in range(2)]
+client = app.test_client()
+timings = {"import_ms": (imported - start) * 1000}
+for name, claim in zip(("first_request_ms", "second_request_ms"), claims):
+    files = [(BytesIO(content), filename) for filename, content in claim]
+    began = time.perf_counter()
+    response = client.post("/api/process-claim", data={"files": files}, content_type="multipart/form-data")
+    timings[name] = (time.perf_counter() - began) * 1000
+    if response.status_code != 200:
+        raise SystemExit(f"/api/process-claim returned {response.status_code}")
+print(json.dumps(timings))
+"""
+
+
+def child_env(mode):
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join([ROOT, os.path.join(ROOT, "benchmarks")]),
+        "STARTUP_MODE": mode,
+        "CLAIM_WORKERS": "1",
+        "DOCUMENT_TIMEOUT_SECONDS": "0",
+        "DOCUMENT_MEMORY_BYTES": "0",
+        "CLAIM_JOB_WORKERS": "0",
+        "CLAIM_TIMING_LOG": "",
+        "CLAIM_STORE_ENABLED": "0",
+        "DUPLICATE_DETECTION": "0",
+    })
+    return env
+
+
+def run_once(mode, seed):
+    output = subprocess.run([sys.executable, "-c", CHILD, str(seed)], env=child_env(mode), cwd=ROOT,
+                            capture_output=True, text=True)
+    if output.returncode != 0:
+        raise SystemExit(f"startup run failed:\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def import_profile(mode, top):
+    """(self us, cumulative us, module) of the modules with the most self time"""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.main"],
+                            env=child_env(mode), cwd=ROOT, capture_output=True, text=True)
+    modules = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(own), int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", choices=("lazy", "warm"), default="lazy", help="STARTUP_MODE of the app")
+    parser.add_argument("--top", type=int, default=15, help="modules listed by import time")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-import-ms", type=float, help="fail if the median import time exceeds this")
+    parser.add_argument("--max-first-request-ms", type=float, help="fail if the median first request exceeds this")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    runs = [run_once(args.mode, rng.randrange(1 << 30)) for _ in range(args.runs)]
+    medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    print(f"STARTUP_MODE={args.mode}, median of {args.runs} fresh interpreters")
+    for key, label in (("import_ms", "import src.main"), ("first_request_ms", "first request"),
+                       ("second_request_ms", "second request")):
+        samples = [run[key] for run in runs]
+        print(f"{label:<18}{medians[key]:>9.1f} ms  (min {min(samples):.1f}, max {max(samples):.1f})")
+
+    print(f"\n{'self ms':>9} {'cumulative ms':>14}  module")
+    for own, cumulative, name in import_profile(args.mode, args.top):
+        print(f"{own / 1000:>9.1f} {cumulative / 1000:>14.1f}  {name}")
+
+    failures = []
+    if args.max_import_ms is not None and medians["import_ms"] > args.max_import_ms:
+        failures.append(f"import took {medians['import_ms']:.1f} ms, over {args.max_import_ms:g} ms")
+    if args.max_first_request_ms is not None and medians["first_request_ms"] > args.max_first_request_ms:
+        failures.append(f"first request took {medians['first_request_ms']:.1f} ms, "
+                        f"over {args.max_first_request_ms:g} ms")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark for static file serving.
+
+Builds a static folder like a bundled frontend (index.html, hashed JS and
+CSS bundles, an image) in a temporary directory and requests every file
+through a Flask test client. The previous catch-all route (os.path.exists and
+send_from_directory: an mtime ETag, no Cache-Control, never compressed) is
+compared with StaticFiles, for a first visit and for a revisit that
+revalidates with If-None-Match. Setup is the time to build the index. Reported: requests per
+second and bytes sent per page load.
+
+    python benchmarks/bench_static.py --requests 2000 --bundle-kb 400
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, send_from_directory  # noqa: E402
+
+from src.services.responses import ResponseCompression  # noqa: E402
+from src.services.static_files import StaticFiles  # noqa: E402
+
+ACCEPT = {"Accept-Encoding": "gzip, deflate, br, zstd"}
+
+
+def build_folder(directory, bundle_kb, rng):
+    words = ["const", "function", "return", "claim", "document", "render", "state", "props", "=>", "{", "}"]
+
+    def source(size):
+        out, length = [], 0
+        while length < size:
+            word = rng.choice(words) + str(rng.randint(0, 99))
+            out.append(word)
+            length += len(word) + 1
+        return " ".join(out)
+
+    files = {
+        "index.html": "<!DOCTYPE html><html><head><script src=/assets/index-4f1c9a2b.js></script></head>"
+                      + source(4 * 1024) + "</html>",
+        "assets/index-4f1c9a2b.js": source(bundle_kb * 1024),
+        "assets/vendor-9d3e7b10.js": source(bundle_kb * 2 * 1024),
+        "assets/index-a81f0c33.css": source(bundle_kb // 4 * 1024),
+    }
+    os.makedirs(os.path.join(directory, "assets"))
+    for name, text in files.items():
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(text)
+    with open(os.path.join(directory, "assets", "logo-7c2d9e41.png"), "wb") as f:
+        f.write(b"\x89PNG" + os.urandom(32 * 1024))
+    return ["/", "/assets/index-4f1c9a2b.js", "/assets/vendor-9d3e7b10.js",
+            "/assets/index-a81f0c33.css", "/assets/logo-7c2d9e41.png"]
+
+
+def make_app(directory, indexed):
+    app = Flask(__name__, static_folder=directory, static_url_path="/flask-static")
+    ResponseCompression().init_app(app)
+    if indexed:
+        static_files = StaticFiles()
+        static_files.init_app(app)
+
+        @app.route("/", defaults={"path": ""})
+        @app.route("/<path:path>")
+        def serve(path):
+            return static_files.serve(path)
+    else:
+        @app.route("/", defaults={"path": ""})
+        @app.route("/<path:path>")
+        def serve(path):
+            if path != "" and os.path.exists(os.path.join(directory, path)):
+                return send_from_directory(directory, path)
+            return send_from_directory(directory, "index.html")
+    return app
+
+
+def run(app, paths, count, revalidate):
+    client = app.test_client()
+    etags = {path: client.get(path, headers=ACCEPT).headers.get("ETag") for path in paths}
+    sent = 0
+    start = time.perf_counter()
+    for index in range(count):
+        path = paths[index % len(paths)]
+        headers = dict(ACCEPT)
+        if revalidate and etags[path]:
+            headers["If-None-Match"] = etags[path]
+        response = client.get(path, headers=headers)
+        sent += len(response.get_data())
+        response.close()
+    elapsed = time.perf_counter() - start
+    return count / elapsed, sent * len(paths) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--bundle-kb", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = build_folder(directory, args.bundle_kb, random.Random(args.seed))
+        print(f"{'route':<30}{'visit':<12}{'requests/s':>12}{'KB per page':>14}")
+        for label, indexed in (("exists + send_from_directory", False), ("StaticFiles", True)):
+            start = time.perf_counter()
+            app = make_app(directory, indexed)
+            setup_ms = (time.perf_counter() - start) * 1000
+            for visit, revalidate in (("first", False), ("revalidate", True)):
+                rate, page_bytes = run(app, paths, args.requests, revalidate)
+                print(f"{label:<30}{visit:<12}{rate:>12.0f}{page_bytes / 1024:>14.1f}")
+            print(f"{'':<30}{'setup ms':<12}{setup_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark full versus streaming (page-incremental) extraction.
+
+Builds discharge summaries and bills whose fields sit on the first page,
+followed by filler pages, and runs ``process_document`` in both modes. Reports
+wall time, peak traced memory and pages parsed versus pages available, and
+checks that both modes return the same document. The bill's service date is
+written MM/DD/YYYY, so its higher-priority ISO date pattern can only be ruled
+out by reading every page; it shows the fallback to full extraction.
+
+    python benchmarks/bench_streaming_extraction.py --pages 10 50 150
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pdf import make_pdf  # noqa: E402
+from src.routes.claim import process_document  # noqa: E402
+
+FILLER = (
+    "Nursing notes recorded stable vitals and adequate oral intake with mobilisation "
+    "as tolerated and analgesia reviewed by the ward pharmacist during the round"
+).split()
+
+FIRST_PAGES = {
+    "discharge.pdf": [
+        "DISCHARGE SUMMARY", "Patient Name: Jane Roe", "Primary Diagnosis: Closed fracture of radius",
+        "Admission Date: 2024-04-01", "Discharge Date: 2024-04-10",
+    ],
+    "bill.pdf": [
+        "CITY GENERAL HOSPITAL", "Total Amount Due: $12,450.00", "Date of Service: 04/10/2024",
+    ],
+}
+
+
+def synthetic_pdf(first_page, pages, rng):
+    filler = [[" ".join(rng.choice(FILLER) for _ in range(12)) for _ in range(55)] for _ in range(pages - 1)]
+    return make_pdf([first_page] + filler)
+
+
+def measure(filename, content, streaming):
+    tracemalloc.start()
+    start = time.perf_counter()
+    payload, _, document = process_document(filename, content, streaming)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return document, elapsed, peak, len(payload["pages"]), payload["pages_total"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 150])
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'file':<14} {'pages':>5} {'mode':<9} {'parsed':>6} {'ms':>9} {'peak MB':>8}")
+    for pages in args.pages:
+        for filename, first_page in FIRST_PAGES.items():
+            content = synthetic_pdf(first_page, pages, rng)
+            documents = []
+            for streaming in (False, True):
+                document, elapsed, peak, parsed, total = measure(filename, content, streaming)
+                documents.append(document)
+                mode = "streaming" if streaming else "full"
+                print(f"{filename:<14} {total:>5} {mode:<9} {parsed:>6} {elapsed * 1000:>9.1f} {peak / 2 ** 20:>8.2f}")
+            if documents[0] != documents[1]:
+                raise SystemExit(f"streaming result differs for {filename} ({pages} pages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark for bulk user import and user listing on SQLite.
+
+Imports synthetic users into a fresh database through /api/users/import and
+compares the rate with the previous approach (one POST /api/users, and so
+one commit, per user) on a sample. It then times listing at that size:
+cursor pages at the start, middle and end of the table, the streamed full
+list, and the previous full list (every User loaded and passed to jsonify).
+Each database runs with the engine settings of the app (WAL, busy timeout,
+connection pool).
+
+    python benchmarks/bench_users.py --users 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+
+from src.models.user import User, db  # noqa: E402
+from src.routes.user import user_bp  # noqa: E402
+from src.services.claim_store import encode_cursor  # noqa: E402
+from src.services.database import engine_options, init_sqlite  # noqa: E402
+from src.services.responses import RESPONSE_COMPRESSION  # noqa: E402
+from src.services.users import USER_STORE  # noqa: E402
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    app.config['MAX_CONTENT_LENGTH'] = None
+    db.init_app(app)
+    init_sqlite(app)
+    RESPONSE_COMPRESSION.init_app(app)
+    USER_STORE.init_app(app)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def csv_body(start, count):
+    return ("username,email\n" + "".join(
+        f"member{index:07d},member{index:07d}@example.com\n" for index in range(start, start + count)
+    )).encode("utf-8")
+
+
+def timed_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--legacy-sample", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(os.path.join(directory, "users.db"))
+        client = app.test_client()
+
+        start = time.perf_counter()
+        for index in range(args.legacy_sample):
+            client.post('/api/users', json={"username": f"legacy{index}", "email": f"legacy{index}@example.com"})
+        legacy_rate = args.legacy_sample / (time.perf_counter() - start)
+
+        body = csv_body(0, args.users)
+        start = time.perf_counter()
+        report = client.post('/api/users/import', data=body, content_type='text/csv').get_json()
+        import_seconds = time.perf_counter() - start
+        print(f"one POST per user   {legacy_rate:>10.0f} rows/s ({args.legacy_sample} rows)")
+        print(f"bulk import         {report['inserted'] / import_seconds:>10.0f} rows/s "
+              f"({report['inserted']} rows in {import_seconds:.1f}s)")
+
+        start = time.perf_counter()
+        report = client.post('/api/users/import', data=csv_body(0, 100000), content_type='text/csv').get_json()
+        print(f"all-conflict import {100000 / (time.perf_counter() - start):>10.0f} rows/s "
+              f"({report['conflict_count']} conflicts)")
+
+        total = args.users + args.legacy_sample
+        with app.app_context():
+            ids = db.session.execute(db.select(User.id).order_by(User.id)).scalars().all()
+        print(f"\nlisting {total} users")
+        for label, position in (("first page", 0), ("middle page", total // 2), ("last page", total - args.page_size)):
+            query = {"limit": args.page_size}
+            if position:
+                query["cursor"] = encode_cursor(ids[position - 1])
+            latency = timed_ms(lambda: client.get('/api/users', query_string=query).get_data(), args.repeat)
+            print(f"{label:<20}{latency:>8.2f} ms")
+
+        streamed = timed_ms(lambda: client.get('/api/users').get_data(), 1)
+        compressed = timed_ms(lambda: client.get('/api/users', headers={"Accept-Encoding": "zstd"}).get_data(), 1)
+
+        def legacy_list():
+            with app.test_request_context():
+                return jsonify([user.to_dict() for user in User.query.all()]).get_data()
+        legacy = timed_ms(legacy_list, 1)
+        print(f"{'stream all':<20}{streamed:>8.0f} ms")
+        print(f"{'stream all, zstd':<20}{compressed:>8.0f} ms")
+        print(f"{'query.all + jsonify':<20}{legacy:>8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
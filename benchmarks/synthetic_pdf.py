@@ -0,0 +1,128 @@
+"""Minimal dependency-free writer for text-only PDFs used by the benchmarks.
+
+Each page is a list of text lines drawn in Helvetica; pypdf extracts them back
+one line per entry, which is all the claim pipeline needs. ``synthetic_claim``
+builds a reproducible claim (bill, discharge summary and ID card for one
+patient) with a configurable page count, text density and field placement.
+"""
+import random
+from datetime import date, timedelta
+from typing import List, Sequence, Tuple
+
+
+def _escape(line: str) -> bytes:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+
+
+def make_pdf(pages: Sequence[Sequence[str]]) -> bytes:
+    """Render pages of text lines into a PDF document"""
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for lines in pages:
+        content = b"BT /F1 10 Tf 40 800 Td 12 TL " + b" ".join(b"(" + _escape(line) + b") '" for line in lines) + b" ET"
+        page_number = len(objects) + 1
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_number + 1)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        kids.append(page_number)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+KINDS = ("bill", "discharge_summary", "id_card")
+PLACEMENTS = ("first", "last", "spread")
+
+# Filler avoids every classifier indicator and field keyword, so documents are
+# classified and extracted from their field lines alone
+FILLER = (
+    "nursing notes recorded stable vitals and adequate oral intake with mobilisation "
+    "as tolerated and analgesia reviewed by the ward pharmacist during the round "
+    "wound dressing changed under aseptic technique with no signs of infection noted"
+).split()
+
+FIRST_NAMES = ("Jane", "John", "Maria", "Wei", "Amara", "Luis", "Priya", "Tomas")
+LAST_NAMES = ("Roe", "Doe", "Garcia", "Chen", "Okafor", "Silva", "Patel", "Novak")
+HOSPITALS = ("City General Hospital", "Riverside Medical Center", "Northgate Clinic")
+DIAGNOSES = ("Closed fracture of radius", "Community acquired pneumonia", "Acute appendicitis")
+INSURERS = ("Acme Health", "Blue Harbor Insurance", "Summit Mutual")
+
+
+def claim_facts(rng: random.Random) -> dict:
+    """Consistent patient, dates and amounts shared by the documents of one claim"""
+    admitted = date(2024, 1, 1) + timedelta(days=rng.randrange(330))
+    discharged = admitted + timedelta(days=rng.randrange(1, 15))
+    served = admitted + timedelta(days=rng.randrange((discharged - admitted).days + 1))
+    return {
+        "patient": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "hospital": rng.choice(HOSPITALS),
+        "diagnosis": rng.choice(DIAGNOSES),
+        "insurer": rng.choice(INSURERS),
+        "member_id": f"HP{rng.randrange(10 ** 8):08d}",
+        "amount": f"{rng.randrange(500, 90000):,}.{rng.randrange(100):02d}",
+        "admitted": admitted.isoformat(),
+        "discharged": discharged.isoformat(),
+        "served": served.isoformat(),
+    }
+
+
+def field_lines(kind: str, facts: dict) -> List[str]:
+    if kind == "bill":
+        return [f"Hospital: {facts['hospital']}", "Itemized invoice of charges",
+                f"Total Amount Due: ${facts['amount']}", f"Date of Service: {facts['served']}"]
+    if kind == "discharge_summary":
+        return ["DISCHARGE SUMMARY", f"Patient Name: {facts['patient']}", f"Primary Diagnosis: {facts['diagnosis']}",
+                f"Admission Date: {facts['admitted']}", f"Discharge Date: {facts['discharged']}"]
+    if kind == "id_card":
+        return ["HEALTH ID CARD", f"Name: {facts['patient']}", f"Policy Number: {facts['member_id']}",
+                f"Insurance: {facts['insurer']}"]
+    raise ValueError(f"unknown document kind {kind!r}")
+
+
+def synthetic_document(kind: str, facts: dict, rng: random.Random, pages: int = 1, lines_per_page: int = 40,
+                       words_per_line: int = 12, placement: str = "first") -> bytes:
+    """Render one document: filler text with the field lines placed on the first
+    page, the last page, or one field line per page ("spread")"""
+    if placement not in PLACEMENTS:
+        raise ValueError(f"unknown placement {placement!r}")
+    content = [[" ".join(rng.choice(FILLER) for _ in range(words_per_line)) for _ in range(lines_per_page)]
+               for _ in range(max(1, pages))]
+    fields = field_lines(kind, facts)
+    if placement == "first":
+        content[0][:0] = fields
+    elif placement == "last":
+        content[-1].extend(fields)
+    else:
+        for index, line in enumerate(fields):
+            page = content[index * len(content) // len(fields)]
+            page.insert(rng.randrange(len(page) + 1), line)
+    return make_pdf(content)
+
+
+def synthetic_claim(rng: random.Random, pages: int = 1, lines_per_page: int = 40, words_per_line: int = 12,
+                    placement: str = "first", kinds: Sequence[str] = KINDS) -> List[Tuple[str, bytes]]:
+    """(filename, content) uploads for one claim; filenames carry no type hint,
+    so classification has to read the content"""
+    facts = claim_facts(rng)
+    return [
+        (f"scan-{index + 1:02d}.pdf",
+         synthetic_document(kind, facts, rng, pages, lines_per_page, words_per_line, placement))
+        for index, kind in enumerate(kinds)
+    ]
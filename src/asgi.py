@@ -0,0 +1,29 @@
+"""ASGI serving mode.
+
+The Flask app runs on a pool of ``ASGI_THREADS`` threads behind an event
+loop, with claim admission (``CLAIM_MAX_IN_FLIGHT`` and friends) applied on
+the loop: requests waiting for a claim slot hold no thread, so health checks
+and user endpoints stay responsive while claims queue, and requests past the
+queue are answered with 429 straight away. PDF extraction runs on the claim
+worker process pool as in the threaded server.
+
+    python -m src.asgi
+    uvicorn src.asgi:application --host 0.0.0.0 --port 5000
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from src.main import app, init_db
+from src.routes.claim_jobs import claim_jobs
+from src.services.admission import ADMISSION, AdmissionMiddleware
+
+application = AdmissionMiddleware(WSGIMiddleware(app, workers=app.config['ASGI_THREADS']), app, ADMISSION)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    init_db()
+    claim_jobs.start()
+    uvicorn.run(application, host=os.environ.get('HOST', '0.0.0.0'), port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,241 @@
+"""Offline claim processing for directories of claim PDFs.
+
+Every folder under the root that directly contains PDFs is one claim; its id
+is the folder path relative to the root. Claims run through the same pipeline
+as /api/process-claim, one claim per worker process, and each result is
+appended to a JSONL file as soon as it finishes:
+
+    python -m src.batch archive/ -o results.jsonl --workers 8
+
+A checkpoint file next to the output records every finished claim together
+with the output size after its line was written. Running the same command
+again skips those claims and first truncates any partially written line, so
+an interrupted run resumes without redoing or duplicating claims.
+
+With --store, results are also inserted into the claim store of the app
+database (or --database), CLAIM_STORE_BATCH_SIZE claims per transaction.
+Claims are only checkpointed once stored, and storing a claim id again
+replaces its earlier result, so resuming keeps the store exact as well.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flask import Flask
+from src.models.user import db
+from src.routes.claim import PAGE_STATS, run_claim
+from src.services.claim_store import CLAIM_STORE, ClaimEntry
+from src.services.database import engine_options, init_sqlite
+from src.services.uploads import MappedUpload
+from src.services.worker_pool import _discard_pool, default_pool_size, get_pool
+
+PROGRESS_SECONDS = 5.0
+DEFAULT_DATABASE = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+
+
+def find_claims(root: str) -> Iterator[Tuple[str, str]]:
+    """Yield (claim_id, folder) for every folder under root that contains PDFs, in sorted order"""
+    for folder, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if any(name.lower().endswith(".pdf") for name in filenames):
+            claim_id = os.path.relpath(folder, root).replace(os.sep, "/")
+            yield claim_id, folder
+
+
+def process_claim_folder(claim_id: str, folder: str, streaming: bool, classify_pages: int,
+                         episodes: bool = False) -> Tuple[Dict[str, Any], int, int]:
+    """Run one claim folder through the pipeline in a worker process.
+
+    Returns the output line, the number of PDFs and the number of pages parsed
+    (pages of PDFs already in the worker's extraction cache are not parsed again).
+    """
+    jobs = [(name, MappedUpload(os.path.join(folder, name)))
+            for name in sorted(os.listdir(folder)) if name.lower().endswith(".pdf")]
+    pages_before = PAGE_STATS["pages_parsed"]
+    result = run_claim(jobs, streaming=streaming, classify_pages=classify_pages, episodes=episodes)
+    return {"claim_id": claim_id, **result}, len(jobs), PAGE_STATS["pages_parsed"] - pages_before
+
+
+class Checkpoint:
+    """Finished claim ids and the output size after each, one JSON line per claim"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        self.offset = 0
+        self.size = 0
+
+    def load(self) -> None:
+        """Read finished claims, up to the first line cut short by an interruption"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as handle:
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                self.done.add(entry["claim_id"])
+                self.offset = entry["offset"]
+                self.size += len(line)
+
+    def record(self, handle, claim_id: str, offset: int) -> None:
+        handle.write(json.dumps({"claim_id": claim_id, "offset": offset}) + "\n")
+        handle.flush()
+        self.done.add(claim_id)
+        self.offset = offset
+
+
+def store_app(database: str) -> Flask:
+    """A minimal app bound to the database claims are stored in"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['CLAIM_STORE_BATCH_SIZE'] = int(os.environ.get('CLAIM_STORE_BATCH_SIZE', 200))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    db.init_app(app)
+    init_sqlite(app)
+    CLAIM_STORE.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def run_batch(root: str, output: str, checkpoint_path: str, workers: int, streaming: bool = False,
+              classify_pages: int = 2, store: Optional[Flask] = None, episodes: bool = False) -> Dict[str, Any]:
+    """Process every claim under root not yet in the checkpoint and return run totals.
+
+    With a ``store`` app the results are also saved in its claim store.
+    """
+    checkpoint = Checkpoint(checkpoint_path)
+    checkpoint.load()
+    claims = [(claim_id, folder) for claim_id, folder in find_claims(root) if claim_id not in checkpoint.done]
+    totals = {"claims": 0, "failed": 0, "skipped": len(checkpoint.done), "files": 0, "pages": 0}
+
+    # Drop anything written after the last checkpointed claim
+    with open(output, "ab") as out, open(checkpoint_path, "a", encoding="utf-8") as marks:
+        out.truncate(checkpoint.offset)
+        marks.truncate(checkpoint.size)
+
+        stored: List[ClaimEntry] = []
+        unrecorded: List[Tuple[str, int]] = []
+
+        def commit() -> None:
+            if stored:
+                with store.app_context():
+                    CLAIM_STORE.save_many(stored, replace=True)
+                stored.clear()
+            for claim_id, offset in unrecorded:
+                checkpoint.record(marks, claim_id, offset)
+            unrecorded.clear()
+
+        def finish(line: Dict[str, Any], files: int = 0, pages: int = 0) -> None:
+            out.write(json.dumps(line).encode("utf-8") + b"\n")
+            out.flush()
+            unrecorded.append((line["claim_id"], out.tell()))
+            if store is not None and "claim_decision" in line:
+                stored.append((line, "batch", line["claim_id"]))
+            if store is None or len(unrecorded) >= CLAIM_STORE.batch_size:
+                commit()
+            totals["claims"] += 1
+            totals["failed"] += "error" in line
+            totals["files"] += files
+            totals["pages"] += pages
+
+        started = last_report = time.perf_counter()
+        size = max(1, workers)
+        pending: Dict[Any, Tuple[str, str, int, Any]] = {}
+        retries: List[Tuple[str, str, int]] = []
+        queue = iter(claims)
+
+        def submit(claim_id: str, folder: str, attempt: int) -> None:
+            pool = get_pool(size)
+            try:
+                future = pool.submit(process_claim_folder, claim_id, folder, streaming, classify_pages, episodes)
+            except BrokenProcessPool:
+                _discard_pool(size, pool)
+                pool = get_pool(size)
+                future = pool.submit(process_claim_folder, claim_id, folder, streaming, classify_pages, episodes)
+            pending[future] = (claim_id, folder, attempt, pool)
+
+        while True:
+            # Keep a couple of claims per worker queued so workers never idle
+            while len(pending) < size * 2:
+                if retries:
+                    submit(*retries.pop())
+                    continue
+                claim = next(queue, None)
+                if claim is None:
+                    break
+                submit(*claim, 1)
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                claim_id, folder, attempt, pool = pending.pop(future)
+                try:
+                    finish(*future.result())
+                except BrokenProcessPool:
+                    # A dying worker takes every claim in flight down with it;
+                    # each is retried once on a fresh pool
+                    _discard_pool(size, pool)
+                    if attempt < 2:
+                        retries.append((claim_id, folder, attempt + 1))
+                    else:
+                        finish({"claim_id": claim_id, "error": "Worker process died while processing the claim"})
+                except Exception as e:
+                    finish({"claim_id": claim_id, "error": f"Processing failed: {str(e)}"})
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_SECONDS:
+                last_report = now
+                print(f"{totals['claims']}/{len(claims)} claims, "
+                      f"{totals['claims'] / (now - started):.1f} claims/sec", file=sys.stderr)
+        commit()
+
+    elapsed = time.perf_counter() - started
+    totals["seconds"] = round(elapsed, 3)
+    totals["claims_per_sec"] = round(totals["claims"] / elapsed, 2) if elapsed else 0.0
+    totals["pages_per_sec"] = round(totals["pages"] / elapsed, 2) if elapsed else 0.0
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="directory tree with one folder of PDFs per claim")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to append results to")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--workers", type=int, default=default_pool_size())
+    parser.add_argument("--mode", choices=("full", "streaming"), default="full",
+                        help="extraction mode, as EXTRACTION_MODE for the server")
+    parser.add_argument("--classify-pages", type=int, default=2)
+    parser.add_argument("--validation", choices=("single", "episodes"), default="single",
+                        help="validation mode, as VALIDATION_MODE for the server")
+    parser.add_argument("--store", action="store_true", help="also save results in the claim store")
+    parser.add_argument("--database", default=DEFAULT_DATABASE,
+                        help="SQLAlchemy URL of the claim store (default: the app database)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        parser.error(f"{args.root} is not a directory")
+    totals = run_batch(args.root, args.output, args.checkpoint or args.output + ".checkpoint",
+                       args.workers, args.mode == "streaming", args.classify_pages,
+                       store_app(args.database) if args.store else None, args.validation == "episodes")
+    print(f"{totals['claims']} claims ({totals['failed']} failed, {totals['skipped']} already done), "
+          f"{totals['pages']} pages in {totals['seconds']:.1f}s: "
+          f"{totals['claims_per_sec']:.2f} claims/sec, {totals['pages_per_sec']:.2f} pages/sec")
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,34 @@
 import os
 import sys
+from threading import Thread
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
 from src.models.user import db
 from src.routes.user import user_bp
-from src.routes.claim import claim_bp
+from src.routes.claim import EXTRACTION_CACHE, SHARED_UPLOADS, UPLOAD_LIMITS, claim_bp, pipeline_options, warm_up
+from src.routes.claim_batch import claim_batch_bp
+from src.routes.claim_jobs import claim_jobs, claim_jobs_bp
+from src.routes.claim_records import claim_records_bp
+from src.routes.claim_sessions import claim_sessions, claim_sessions_bp
+from src.routes.health import health_bp
+from src.routes.metrics import metrics_bp
+from src.services.admission import ADMISSION
+from src.services.claim_store import CLAIM_STORE
+from src.services.database import engine_options, init_sqlite
+from src.services.duplicates import DUPLICATE_INDEX
+from src.services.metrics import METRICS
+from src.services.profiling import PROFILER
+from src.services.responses import RESPONSE_COMPRESSION
+from src.services.static_files import STATIC_FILES
+from src.services.uploads import SpoolingRequest
+from src.services.users import USER_STORE
+from src.services.worker_pool import default_pool_size, in_worker_process, warm_pool
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+app.request_class = SpoolingRequest
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
 # Enable CORS for all routes
@@ -17,30 +36,207 @@ CORS(app)
 
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(claim_bp, url_prefix='/api')
+app.register_blueprint(claim_jobs_bp, url_prefix='/api')
+app.register_blueprint(claim_batch_bp, url_prefix='/api')
+app.register_blueprint(claim_records_bp, url_prefix='/api')
+app.register_blueprint(claim_sessions_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp, url_prefix='/api')
+app.register_blueprint(health_bp, url_prefix='/api')
 
 # uncomment if you need to use database
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# SQLite runs in WAL mode so reads proceed during writes; a writer waits up
+# to SQLITE_BUSY_TIMEOUT seconds for the lock. Each process pools
+# SQLITE_POOL_SIZE connections (plus SQLITE_MAX_OVERFLOW under load)
+app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+app.config['SQLITE_BUSY_TIMEOUT'] = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 30))
+app.config['SQLITE_POOL_SIZE'] = int(os.environ.get('SQLITE_POOL_SIZE', 10))
+app.config['SQLITE_MAX_OVERFLOW'] = int(os.environ.get('SQLITE_MAX_OVERFLOW', 20))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
 db.init_app(app)
-with app.app_context():
-    db.create_all()
+init_sqlite(app)
+
+# Size of the process pool used to extract and process the files of a claim
+# in parallel; 0 or 1 processes files in the request worker itself
+app.config['CLAIM_WORKERS'] = int(os.environ.get('CLAIM_WORKERS', default_pool_size()))
+
+# "streaming" parses PDF pages lazily: classification looks at the first
+# CLASSIFY_PAGES pages and agents stop once their fields are resolved
+app.config['EXTRACTION_MODE'] = os.environ.get('EXTRACTION_MODE', 'full')
+app.config['CLASSIFY_PAGES'] = int(os.environ.get('CLASSIFY_PAGES', 2))
+
+# "episodes" validates claims with several admissions: every bill is matched
+# to the discharge summary whose stay contains its service date
+app.config['VALIDATION_MODE'] = os.environ.get('VALIDATION_MODE', 'single')
+
+# Budgets for one document: a worker that runs longer is killed and one that
+# allocates more fails with MemoryError; the document is reported as failed
+# and the rest of the claim still processed. 0 disables a budget
+app.config['DOCUMENT_TIMEOUT_SECONDS'] = float(os.environ.get('DOCUMENT_TIMEOUT_SECONDS', 60))
+app.config['DOCUMENT_MEMORY_BYTES'] = int(os.environ.get('DOCUMENT_MEMORY_BYTES', 1024 * 1024 * 1024))
+
+# Extraction results are cached by upload hash in memory and in app.db
+app.config['EXTRACTION_CACHE_BYTES'] = int(os.environ.get('EXTRACTION_CACHE_BYTES', 64 * 1024 * 1024))
+app.config['EXTRACTION_CACHE_TTL'] = int(os.environ.get('EXTRACTION_CACHE_TTL', 7 * 24 * 3600))
+
+# Claim requests (process-claim, process-claim-batch and session uploads)
+# running at once per process; up to CLAIM_MAX_QUEUED more wait at most
+# CLAIM_QUEUE_TIMEOUT seconds for a slot, the rest get 429 with Retry-After.
+# 0 disables the cap
+app.config['CLAIM_MAX_IN_FLIGHT'] = int(os.environ.get('CLAIM_MAX_IN_FLIGHT', 8))
+app.config['CLAIM_MAX_QUEUED'] = int(os.environ.get('CLAIM_MAX_QUEUED', 32))
+app.config['CLAIM_QUEUE_TIMEOUT'] = float(os.environ.get('CLAIM_QUEUE_TIMEOUT', 10))
+
+# Threads running requests under ASGI (python -m src.asgi); queued claim
+# requests wait on the event loop without one
+app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 32))
+
+# Claims processed at a time by /api/process-claim-batch
+app.config['CLAIM_BATCH_CONCURRENCY'] = int(os.environ.get('CLAIM_BATCH_CONCURRENCY', 4))
+
+# Background claim jobs: worker threads, maximum queued jobs (429 beyond it)
+# and the lease after which a job whose process died is queued again
+app.config['CLAIM_JOB_WORKERS'] = int(os.environ.get('CLAIM_JOB_WORKERS', 2))
+app.config['CLAIM_JOB_QUEUE_SIZE'] = int(os.environ.get('CLAIM_JOB_QUEUE_SIZE', 100))
+app.config['CLAIM_JOB_LEASE_SECONDS'] = int(os.environ.get('CLAIM_JOB_LEASE_SECONDS', 60))
+
+# Processed claims are stored in app.db for /api/claims; batches insert
+# CLAIM_STORE_BATCH_SIZE claims per statement
+app.config['CLAIM_STORE_ENABLED'] = os.environ.get('CLAIM_STORE_ENABLED', '1') != '0'
+app.config['CLAIM_STORE_BATCH_SIZE'] = int(os.environ.get('CLAIM_STORE_BATCH_SIZE', 200))
+
+# Claims matching an earlier claim's patient, hospital, service date, amount
+# and ID number (when there is an ID card) are rejected as duplicates. With
+# DUPLICATE_NEAR_MATCHES, so are claims with a bill or discharge summary at
+# least DUPLICATE_SIMILARITY similar in text to an earlier one; it is off by
+# default because bills from the same hospital template can be that similar
+app.config['DUPLICATE_DETECTION'] = os.environ.get('DUPLICATE_DETECTION', '1') != '0'
+app.config['DUPLICATE_NEAR_MATCHES'] = os.environ.get('DUPLICATE_NEAR_MATCHES', '0') != '0'
+app.config['DUPLICATE_SIMILARITY'] = float(os.environ.get('DUPLICATE_SIMILARITY', 0.9))
+
+# /api/users/import inserts USER_IMPORT_BATCH_SIZE rows per statement and
+# lists up to USER_IMPORT_REPORT_ROWS conflicting and invalid rows
+app.config['USER_IMPORT_BATCH_SIZE'] = int(os.environ.get('USER_IMPORT_BATCH_SIZE', 1000))
+app.config['USER_IMPORT_REPORT_ROWS'] = int(os.environ.get('USER_IMPORT_REPORT_ROWS', 1000))
+
+# Uploads: requests above UPLOAD_SPOOL_BYTES are spooled to disk and mapped
+# rather than read into memory. MAX_CONTENT_LENGTH caps one request's body,
+# UPLOAD_MAX_PAGES its PDF pages, and UPLOAD_GLOBAL_BYTES/PAGES what all
+# requests in flight in this process may hold; beyond any of them is a 413
+app.config['UPLOAD_SPOOL_BYTES'] = int(os.environ.get('UPLOAD_SPOOL_BYTES', 1024 * 1024))
+app.config['UPLOAD_SPOOL_DIR'] = os.environ.get('UPLOAD_SPOOL_DIR')
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 256 * 1024 * 1024))
+app.config['UPLOAD_MAX_PAGES'] = int(os.environ.get('UPLOAD_MAX_PAGES', 2000))
+app.config['UPLOAD_GLOBAL_BYTES'] = int(os.environ.get('UPLOAD_GLOBAL_BYTES', 1024 * 1024 * 1024))
+app.config['UPLOAD_GLOBAL_PAGES'] = int(os.environ.get('UPLOAD_GLOBAL_PAGES', 20000))
+
+# In-memory uploads of at least UPLOAD_SHARED_MIN_BYTES go to claim pool
+# workers as files in UPLOAD_SHARED_DIR (default /dev/shm) that they map,
+# rather than pickled through the pipe; below it pickling is faster. 0
+# pickles them all
+app.config['UPLOAD_SHARED_MIN_BYTES'] = int(os.environ.get('UPLOAD_SHARED_MIN_BYTES', 256 * 1024))
+app.config['UPLOAD_SHARED_DIR'] = os.environ.get('UPLOAD_SHARED_DIR')
+
+# JSON is encoded with orjson. Responses of at least
+# RESPONSE_COMPRESSION_MIN_BYTES, and all streamed ones, are compressed with
+# zstd or gzip as the client's Accept-Encoding allows
+app.config['RESPONSE_COMPRESSION'] = os.environ.get('RESPONSE_COMPRESSION', '1') != '0'
+app.config['RESPONSE_COMPRESSION_MIN_BYTES'] = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+app.config['RESPONSE_ZSTD_LEVEL'] = int(os.environ.get('RESPONSE_ZSTD_LEVEL', 3))
+app.config['RESPONSE_GZIP_LEVEL'] = int(os.environ.get('RESPONSE_GZIP_LEVEL', 6))
+
+# Files in src/static are indexed at startup and served with content-hash
+# ETags. Names carrying a content hash (app.3f9a1c2e.js) are cached for
+# STATIC_MAX_AGE seconds, other files are revalidated. Files up to
+# STATIC_MEMORY_BYTES are held in memory with zstd and gzip variants; larger
+# ones are sent from disk, with app.js.zst or app.js.gz when present.
+# STATIC_RELOAD_SECONDS above 0 rescans the folder at most that often
+app.config['STATIC_MAX_AGE'] = int(os.environ.get('STATIC_MAX_AGE', 365 * 24 * 3600))
+app.config['STATIC_MEMORY_BYTES'] = int(os.environ.get('STATIC_MEMORY_BYTES', 1024 * 1024))
+app.config['STATIC_RELOAD_SECONDS'] = float(os.environ.get('STATIC_RELOAD_SECONDS', 0))
+
+# Prometheus metrics at /api/metrics. Servers running several processes set
+# METRICS_DIR to a directory they share so every process is counted
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR')
+
+# One JSON timing line per claim: "-" for stderr, a file path, or empty to disable
+app.config['CLAIM_TIMING_LOG'] = os.environ.get('CLAIM_TIMING_LOG', '-')
+
+# Profiling of /api/process-claim: a CLAIM_PROFILE_RATE fraction of requests,
+# and those whose X-Claim-Profile header equals CLAIM_PROFILE_TOKEN, are
+# profiled in the request and in the claim workers, "sampling" stacks every
+# CLAIM_PROFILE_INTERVAL_MS or "deterministic" with cProfile (one request per
+# process at a time; requests overlapping it are sampled). Profiles go to
+# CLAIM_PROFILE_DIR as .collapsed, .pstats and .json files, the newest
+# CLAIM_PROFILE_KEEP kept. Off unless a rate or token is set
+app.config['CLAIM_PROFILE_RATE'] = float(os.environ.get('CLAIM_PROFILE_RATE', 0))
+app.config['CLAIM_PROFILE_TOKEN'] = os.environ.get('CLAIM_PROFILE_TOKEN')
+app.config['CLAIM_PROFILE_MODE'] = os.environ.get('CLAIM_PROFILE_MODE', 'sampling')
+app.config['CLAIM_PROFILE_INTERVAL_MS'] = float(os.environ.get('CLAIM_PROFILE_INTERVAL_MS', 5))
+app.config['CLAIM_PROFILE_DIR'] = os.environ.get('CLAIM_PROFILE_DIR')
+app.config['CLAIM_PROFILE_KEEP'] = int(os.environ.get('CLAIM_PROFILE_KEEP', 100))
+
+# "lazy" imports pypdf and runs the pipeline's one-time work on the first
+# claim. "warm" does it at startup, so a server that loads the app before
+# forking shares it with every worker, and starts the claim worker pool in
+# the background
+app.config['STARTUP_MODE'] = os.environ.get('STARTUP_MODE', 'lazy')
+
+METRICS.init_app(app)
+PROFILER.init_app(app)
+RESPONSE_COMPRESSION.init_app(app)
+ADMISSION.init_app(app)
+STATIC_FILES.init_app(app)
+UPLOAD_LIMITS.init_app(app)
+SHARED_UPLOADS.init_app(app)
+CLAIM_STORE.init_app(app)
+USER_STORE.init_app(app)
+DUPLICATE_INDEX.init_app(app)
+EXTRACTION_CACHE.init_app(app)
+claim_jobs.init_app(app)
+claim_sessions.init_app(app)
+
+def init_db():
+    """Create missing tables and purge stale extraction cache rows"""
+    with app.app_context():
+        db.create_all()
+        EXTRACTION_CACHE.purge()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the database tables; run once per deployment and after upgrades."""
+    init_db()
+    print("Initialized the database")
+
+def warm_start():
+    """Run the claim pipeline's one-time work now and start its worker pool in the background"""
+    warm_up()
+    options = pipeline_options(app.config)
+    if options["workers"] > 1 or options["document_timeout"] or options["document_memory"]:
+        Thread(target=warm_pool, args=(warm_up, options["workers"], options["document_memory"],
+                                       bool(options["document_timeout"])),
+               name="claim-pool-warm-up", daemon=True).start()
+
+# Claim pool workers re-import the app module; warm_pool warms them instead
+if app.config['STARTUP_MODE'] == 'warm' and not in_worker_process():
+    warm_start()
+
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({"error": f"Upload exceeds the {app.config['MAX_CONTENT_LENGTH']} byte limit per request"}), 413
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    if app.static_folder is None:
+        return "Static folder not configured", 404
+    return STATIC_FILES.serve(path)
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    # Job threads wait for the schema, so they start once init_db created it
+    init_db()
+    claim_jobs.start()
+    app.run(host=os.environ.get('HOST', '0.0.0.0'), port=int(os.environ.get('PORT', 5000)), debug=False)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import json
+
+from src.models.user import db
+
+class ClaimJob(db.Model):
+    """A claim submitted for background processing.
+
+    Uploads are kept on disk under ``storage_path`` until the job finishes;
+    ``filenames`` holds their original names in upload order as JSON.
+    """
+    __tablename__ = 'claim_job'
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(16), nullable=False, index=True)
+    filenames = db.Column(db.Text, nullable=False)
+    storage_path = db.Column(db.String(512), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    lease_expires_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'<ClaimJob {self.id} {self.status}>'
+
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'files': json.loads(self.filenames),
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if self.result is not None:
+            data['result'] = json.loads(self.result)
+        if self.error is not None:
+            data['error'] = self.error
+        return data
@@ -0,0 +1,63 @@
+import json
+
+from src.models.user import db
+
+class ClaimRecord(db.Model):
+    """A processed claim and its decision, kept for reporting.
+
+    The searchable fields are copied out of the claim's documents when it is
+    stored. Ids are SQLite rowids in insertion order, so listings page by id
+    and every single-column index below already returns its matches in that
+    order. ``reference`` is the caller's name for the claim, such as the
+    claim id of a batch.
+    """
+    __tablename__ = 'claim_record'
+    __table_args__ = (
+        db.Index('ix_claim_record_source_reference', 'source', 'reference'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(16), nullable=False)
+    reference = db.Column(db.String(255))
+    status = db.Column(db.String(16), nullable=False, index=True)
+    reason = db.Column(db.Text)
+    patient_name = db.Column(db.String(100, collation='NOCASE'), index=True)
+    id_number = db.Column(db.String(64), index=True)
+    service_date = db.Column(db.Date, index=True)
+    total_amount = db.Column(db.Float)
+    document_count = db.Column(db.Integer, nullable=False, default=0)
+    validation = db.Column(db.Text, nullable=False)
+    failed_documents = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    documents = db.relationship('ClaimDocument', order_by='ClaimDocument.position', lazy='selectin')
+
+    def __repr__(self):
+        return f'<ClaimRecord {self.id} {self.status}>'
+
+    def to_dict(self):
+        data = {
+            'claim_id': self.id,
+            'source': self.source,
+            'reference': self.reference,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'documents': [json.loads(document.data) for document in self.documents],
+            'validation': json.loads(self.validation),
+            'claim_decision': {'status': self.status, 'reason': self.reason},
+        }
+        if self.failed_documents is not None:
+            data['failed_documents'] = json.loads(self.failed_documents)
+        return data
+
+class ClaimDocument(db.Model):
+    """One extracted document of a stored claim, as returned by the pipeline"""
+    __tablename__ = 'claim_document'
+
+    id = db.Column(db.Integer, primary_key=True)
+    claim_id = db.Column(db.Integer, db.ForeignKey('claim_record.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.String(32), nullable=False)
+    data = db.Column(db.Text, nullable=False)
+
+    def __repr__(self):
+        return f'<ClaimDocument {self.claim_id}/{self.position} {self.type}>'
@@ -0,0 +1,65 @@
+import json
+
+from src.models.user import db
+
+class ClaimSession(db.Model):
+    """A claim assembled one upload at a time.
+
+    ``result`` holds the claim's current validation and decision as JSON; it
+    is recomputed from the stored documents whenever one is added or removed.
+    Every such change bumps ``revision``, and ``evaluated_revision`` is the
+    revision ``result`` was computed for.
+    """
+    __tablename__ = 'claim_session'
+
+    id = db.Column(db.String(32), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    evaluated_revision = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.Text, nullable=False)
+
+    files = db.relationship('SessionDocument', order_by='SessionDocument.id', lazy='selectin',
+                            cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<ClaimSession {self.id}>'
+
+    def to_dict(self):
+        return {
+            'session_id': self.id,
+            'files': [file.to_dict() for file in self.files],
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            **json.loads(self.result),
+        }
+
+class SessionDocument(db.Model):
+    """One upload of a claim session and its processed result.
+
+    ``document`` is the agent output as JSON and ``signature`` its packed text
+    signature; both are null when the upload failed or had no text, and
+    ``error`` says why.
+    """
+    __tablename__ = 'session_document'
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(32), db.ForeignKey('claim_session.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    document = db.Column(db.Text)
+    signature = db.Column(db.LargeBinary)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<SessionDocument {self.id} {self.filename}>'
+
+    def to_dict(self):
+        data = {
+            'document_id': self.id,
+            'filename': self.filename,
+            'type': json.loads(self.document).get('type') if self.document is not None else None,
+        }
+        if self.error is not None:
+            data['error'] = self.error
+        return data
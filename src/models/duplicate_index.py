@@ -0,0 +1,42 @@
+from src.models.user import db
+
+class ClaimFingerprint(db.Model):
+    """Hash of a claim's normalized identifying fields, for exact duplicate lookups"""
+    __tablename__ = 'claim_fingerprint'
+
+    id = db.Column(db.Integer, primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False, index=True)
+    reference = db.Column(db.String(255), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<ClaimFingerprint {self.fingerprint[:12]} {self.reference}>'
+
+class DocumentSignature(db.Model):
+    """MinHash signature of one document's text, packed as little-endian uint32s"""
+    __tablename__ = 'document_signature'
+
+    id = db.Column(db.Integer, primary_key=True)
+    reference = db.Column(db.String(255), nullable=False, index=True)
+    doc_type = db.Column(db.String(32), nullable=False)
+    signature = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<DocumentSignature {self.id} {self.reference}>'
+
+class SignatureBand(db.Model):
+    """LSH bucket membership: one row per band of every stored signature.
+
+    Clustered on the band key (no rowid), so the candidates sharing a bucket
+    are one index range.
+    """
+    __tablename__ = 'signature_band'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    band_key = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    signature_id = db.Column(db.Integer, db.ForeignKey('document_signature.id'), primary_key=True,
+                             autoincrement=False, index=True)
+
+    def __repr__(self):
+        return f'<SignatureBand {self.band_key} {self.signature_id}>'
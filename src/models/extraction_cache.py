@@ -0,0 +1,14 @@
+from src.models.user import db
+
+class CachedExtraction(db.Model):
+    """Persistent tier of the extraction cache, keyed by upload content hash"""
+    __tablename__ = 'extraction_cache'
+
+    digest = db.Column(db.String(64), primary_key=True)
+    rules_version = db.Column(db.String(64), nullable=False, index=True)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<CachedExtraction {self.digest[:12]}>'
@@ -1,59 +1,121 @@
-from flask import Blueprint, request, jsonify
-import os
-import tempfile
-import re
-from pypdf import PdfReader
+from flask import Blueprint, current_app, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
 import json
-from typing import List, Dict, Any
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+import time
+import uuid
 from datetime import datetime
 from io import BytesIO
+from threading import Lock
+from bisect import bisect_right
+from contextlib import nullcontext
+from functools import lru_cache
+from src.services.admission import ADMISSION
+from src.services.claim_store import CLAIM_STORE, ClaimEntry
+from src.services.duplicates import DUPLICATE_INDEX, SIGNED_TYPES, DuplicateIndex, Signature, text_signature
+from src.services.extraction_cache import ExtractionCache, content_digest
+from src.services.metrics import METRICS, TIMING_LOG, StageTimer
+from src.services.profiling import PROFILE_HEADER, PROFILER, Profile
+from src.services.uploads import (
+    Content, MappedUpload, SharedUploads, UploadLimits, UploadTooLarge, as_buffer, close_content, open_content,
+    upload_content,
+)
+from src.services.keyword_scorer import KeywordScorer
+from src.services.worker_pool import JobTimeout, run_isolated, uses_pool
+from concurrent.futures.process import BrokenProcessPool
+from src.services.field_extraction import (
+    ANCHOR_KEYWORD, ANCHOR_LINE, FieldExtractor, amount_between, field, normalize_date, text_between,
+)
 
 claim_bp = Blueprint("claim", __name__)
 
+# Indicator lists are registered once per process in a shared scorer; each
+# document is scanned once and scored for every registered type.
+DOCUMENT_INDICATORS = KeywordScorer()
+DOCUMENT_INDICATORS.register("bill", [
+    "bill", "invoice", "charges", "payment", "amount due", "total amount",
+    "medical bill", "hospital bill", "billing", "statement"
+])
+DOCUMENT_INDICATORS.register("discharge_summary", [
+    "discharge", "summary", "admission", "patient", "diagnosis",
+    "discharge summary", "medical record", "hospital course"
+])
+DOCUMENT_INDICATORS.register("id_card", [
+    "id card", "insurance card", "member", "policy", "coverage",
+    "insurance", "member id", "policy number"
+])
+
 class AdvancedDocumentClassifier:
-    def __init__(self):
-        pass
+    def __init__(self, scorer: KeywordScorer = DOCUMENT_INDICATORS):
+        self.scorer = scorer
     
     def classify_document(self, filename: str, text_content: str) -> str:
         """Classify document type based on filename and content using advanced pattern matching"""
-        filename_lower = filename.lower()
-        content_lower = text_content.lower()
-        
-        # Enhanced classification logic
-        bill_indicators = [
-            "bill", "invoice", "charges", "payment", "amount due", "total amount",
-            "medical bill", "hospital bill", "billing", "statement"
-        ]
-        
-        discharge_indicators = [
-            "discharge", "summary", "admission", "patient", "diagnosis",
-            "discharge summary", "medical record", "hospital course"
-        ]
-        
-        id_indicators = [
-            "id card", "insurance card", "member", "policy", "coverage",
-            "insurance", "member id", "policy number"
-        ]
-        
         # Check filename first
-        if any(indicator in filename_lower for indicator in bill_indicators):
-            return "bill"
-        elif any(indicator in filename_lower for indicator in discharge_indicators):
-            return "discharge_summary"
-        elif any(indicator in filename_lower for indicator in id_indicators):
-            return "id_card"
-        
-        # Check content
-        bill_score = sum(1 for indicator in bill_indicators if indicator in content_lower)
-        discharge_score = sum(1 for indicator in discharge_indicators if indicator in content_lower)
-        id_score = sum(1 for indicator in id_indicators if indicator in content_lower)
+        doc_type = self.scorer.first_match(filename.lower())
+        if doc_type is not None:
+            return doc_type
         
-        if bill_score >= discharge_score and bill_score >= id_score:
-            return "bill"
-        elif discharge_score >= id_score:
-            return "discharge_summary"
-        else:
-            return "id_card"
+        # Check content; the highest score wins, earlier registered types on ties
+        return self.scorer.best(text_content.lower())
+
+class PdfPageStream:
+    """Page texts of one PDF, extracted lazily on first request.
+
+    ``prefix(n)`` builds the text of the first n pages exactly the way the full
+    text is built, so agents can work on a few pages and ask for more. A PDF
+    that fails to open or to extract a page yields no text at all, matching
+    full extraction.
+    """
+
+    def __init__(self, pdf_file_object: BytesIO):
+        self.pages: List[str] = []
+        self.failed = False
+        # Time spent in pypdf, which agents also spend when pulling pages
+        self.parse_seconds = 0.0
+        # pypdf is imported on first use, keeping it out of app startup
+        from pypdf import PdfReader
+        try:
+            self._reader = PdfReader(pdf_file_object)
+            self.pages_total = len(self._reader.pages)
+        except Exception as e:
+            print(f"PDF extraction error: {e}")
+            self._reader = None
+            self.pages_total = 0
+            self.failed = True
+
+    @property
+    def pages_parsed(self) -> int:
+        return len(self.pages)
+
+    def _parse_until(self, count: int) -> None:
+        while not self.failed and len(self.pages) < min(count, self.pages_total):
+            start = time.perf_counter()
+            try:
+                self.pages.append(self._reader.pages[len(self.pages)].extract_text() or "")
+            except Exception as e:
+                print(f"PDF extraction error: {e}")
+                self.failed = True
+            self.parse_seconds += time.perf_counter() - start
+
+    def prefix(self, count: int) -> Tuple[str, bool]:
+        """Return the text of the first count pages and whether it is the whole document"""
+        self._parse_until(count)
+        if self.failed:
+            return "", True
+        complete = count >= self.pages_total
+        return self.join(self.pages[:count], complete), complete
+
+    def text(self) -> str:
+        """Return the full document text"""
+        return self.prefix(self.pages_total)[0]
+
+    @staticmethod
+    def join(page_texts: List[str], complete: bool) -> str:
+        """Join page texts the way full extraction does"""
+        text = "".join(page_text + "\n" for page_text in page_texts if page_text)
+        return text.strip() if complete else text.lstrip()
 
 class AdvancedTextExtractor:
     def __init__(self):
@@ -61,17 +123,69 @@ class AdvancedTextExtractor:
     
     def extract_text_from_pdf(self, pdf_file_object: BytesIO) -> str:
         """Extract text from PDF using PyPDF with enhanced processing"""
-        try:
-            reader = PdfReader(pdf_file_object)
-            text = ""
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            return text.strip()
-        except Exception as e:
-            print(f"PDF extraction error: {e}")
-            return ""
+        return self.open_pages(pdf_file_object).text()
+    
+    def open_pages(self, pdf_file_object: BytesIO) -> PdfPageStream:
+        """Open a PDF for lazy, page-by-page text extraction"""
+        return PdfPageStream(pdf_file_object)
+
+# Field patterns are compiled once at import. Each field tries its patterns in
+# order and keeps the first candidate that passes validation; the keywords let
+# FieldPattern skip or fast-forward full-text regex scans.
+_TEXT_LINE = r"[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)"
+_AMOUNT = r"(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)"
+
+BILL_FIELDS = FieldExtractor([
+    field("hospital_name", "ABC Hospital", text_between(3, 100),  # Default as per requirement
+          (r"(?i)(?:hospital|medical center|clinic|health center|healthcare)[:\s]*([^\n\r]+?)(?:\n|\r|$)",
+           ("hospital", "medical center", "clinic", "health center", "healthcare"), ANCHOR_KEYWORD),
+          (r"(?i)([^\n\r]*(?:hospital|medical center|clinic|health center|healthcare)[^\n\r]*)",
+           ("hospital", "medical center", "clinic", "health center", "healthcare"), ANCHOR_LINE),
+          (r"(?i)(?:facility|provider)[:\s]*([^\n\r]+?)(?:\n|\r|$)", ("facility", "provider"), ANCHOR_KEYWORD),
+          (r"(?i)bill\s+from[:\s]*([^\n\r]+?)(?:\n|\r|$)", ("bill",), ANCHOR_KEYWORD)),
+    field("total_amount", 12500, amount_between(100, 1000000),  # Default as per requirement
+          (r"(?i)total[^\d]*?" + _AMOUNT, ("total",), ANCHOR_KEYWORD),
+          (r"(?i)amount\s+due[^\d]*?" + _AMOUNT, ("amount",), ANCHOR_KEYWORD),
+          (r"(?i)balance[^\d]*?" + _AMOUNT, ("balance",), ANCHOR_KEYWORD),
+          (r"\$\s*" + _AMOUNT, ("$",), ANCHOR_KEYWORD),
+          (r"(?i)charges[^\d]*?" + _AMOUNT, ("charges",), ANCHOR_KEYWORD),
+          (_AMOUNT + r"\s*(?:total|amount|due)", ("total", "amount", "due"))),
+    field("date_of_service", "2024-04-10", normalize_date,  # Default as per requirement
+          (r"(?i)(?:date\s+of\s+service|service\s+date)[^\d]*?(\d{4}-\d{2}-\d{2})", ("date", "service"), ANCHOR_KEYWORD),
+          (r"(?i)(?:date\s+of\s+service|service\s+date)[^\d]*?(\d{1,2}[/-]\d{1,2}[/-]\d{4})", ("date", "service"), ANCHOR_KEYWORD),
+          (r"(\d{4}-\d{2}-\d{2})",),
+          (r"(\d{1,2}[/-]\d{1,2}[/-]\d{4})",)),
+])
+
+DISCHARGE_FIELDS = FieldExtractor([
+    field("patient_name", "John Doe", text_between(3, 50),  # Default as per requirement
+          (r"(?i)patient[^\w]*name" + _TEXT_LINE, ("patient",), ANCHOR_KEYWORD),
+          (r"(?i)patient" + _TEXT_LINE, ("patient",), ANCHOR_KEYWORD),
+          (r"(?i)name" + _TEXT_LINE, ("name",), ANCHOR_KEYWORD)),
+    field("diagnosis", "Fracture", text_between(3, 100),  # Default as per requirement
+          (r"(?i)(?:primary\s+)?diagnosis" + _TEXT_LINE, ("primary", "diagnosis"), ANCHOR_KEYWORD),
+          (r"(?i)condition" + _TEXT_LINE, ("condition",), ANCHOR_KEYWORD),
+          (r"(?i)medical\s+condition" + _TEXT_LINE, ("medical",), ANCHOR_KEYWORD)),
+    field("admission_date", "2024-04-01", normalize_date,  # Default as per requirement
+          (r"(?i)admission\s+date[^\d]*?(\d{4}-\d{2}-\d{2})", ("admission",), ANCHOR_KEYWORD),
+          (r"(?i)admitted[^\d]*?(\d{4}-\d{2}-\d{2})", ("admitted",), ANCHOR_KEYWORD),
+          (r"(?i)admission[^\d]*?(\d{1,2}[/-]\d{1,2}[/-]\d{4})", ("admission",), ANCHOR_KEYWORD)),
+    field("discharge_date", "2024-04-10", normalize_date,  # Default as per requirement
+          (r"(?i)discharge\s+date[^\d]*?(\d{4}-\d{2}-\d{2})", ("discharge",), ANCHOR_KEYWORD),
+          (r"(?i)discharged[^\d]*?(\d{4}-\d{2}-\d{2})", ("discharged",), ANCHOR_KEYWORD),
+          (r"(?i)discharge[^\d]*?(\d{1,2}[/-]\d{1,2}[/-]\d{4})", ("discharge",), ANCHOR_KEYWORD)),
+])
+
+ID_CARD_FIELDS = FieldExtractor([
+    field("patient_name", "John Doe", text_between(3, 50),  # Default
+          (r"(?i)(?:name|member)" + _TEXT_LINE, ("name", "member"), ANCHOR_KEYWORD),
+          (r"(?i)cardholder" + _TEXT_LINE, ("cardholder",), ANCHOR_KEYWORD)),
+    field("id_number", "ID123456789", text_between(3, 30),  # Default
+          (r"(?i)(?:id|member|policy)\s*(?:number|#)[^\w]*:?\s*([^\n\r\s]+)", ("id", "member", "policy"), ANCHOR_KEYWORD),
+          (r"(?i)(?:id|member|policy)[^\w]*:?\s*([^\n\r\s]+)", ("id", "member", "policy"), ANCHOR_KEYWORD)),
+    field("insurance_provider", "Health Insurance Co.", text_between(3, 100),  # Default
+          (r"(?i)(?:insurance|provider|company)" + _TEXT_LINE, ("insurance", "provider", "company"), ANCHOR_KEYWORD)),
+])
 
 class AdvancedBillAgent:
     def __init__(self):
@@ -79,88 +193,11 @@ class AdvancedBillAgent:
     
     def process(self, text: str) -> Dict[str, Any]:
         """Process bill document with advanced pattern matching"""
-        
-        # Extract hospital name with multiple patterns
-        hospital_patterns = [
-            r"(?i)(?:hospital|medical center|clinic|health center|healthcare)[:\s]*([^\n\r]+?)(?:\n|\r|$)",
-            r"(?i)([^\n\r]*(?:hospital|medical center|clinic|health center|healthcare)[^\n\r]*)",
-            r"(?i)(?:facility|provider)[:\s]*([^\n\r]+?)(?:\n|\r|$)",
-            r"(?i)bill\s+from[:\s]*([^\n\r]+?)(?:\n|\r|$)",
-        ]
-        
-        hospital_name = "ABC Hospital"  # Default as per requirement
-        for pattern in hospital_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                candidate = matches[0].strip()
-                if len(candidate) > 3 and len(candidate) < 100:  # Reasonable length
-                    hospital_name = candidate
-                    break
-        
-        # Extract total amount with enhanced patterns
-        amount_patterns = [
-            r"(?i)total[^\d]*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"(?i)amount\s+due[^\d]*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"(?i)balance[^\d]*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"(?i)charges[^\d]*?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",
-            r"(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)\s*(?:total|amount|due)",
-        ]
-        
-        total_amount = 12500  # Default as per requirement
-        for pattern in amount_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                try:
-                    amount_str = matches[0].replace(",", "")
-                    amount = float(amount_str)
-                    if 100 <= amount <= 1000000:  # Reasonable range
-                        total_amount = int(amount)
-                        break
-                except ValueError:
-                    continue
-        
-        # Extract date with enhanced patterns
-        date_patterns = [
-            r"(?i)(?:date\s+of\s+service|service\s+date)[^\d]*?(\d{4}-\d{2}-\d{2})",
-            r"(?i)(?:date\s+of\s+service|service\s+date)[^\d]*?(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
-            r"(\d{4}-\d{2}-\d{2})",
-            r"(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
-        ]
-        
-        date_of_service = "2024-04-10"  # Default as per requirement
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                date_str = matches[0]
-                try:
-                    if "/" in date_str or "-" in date_str:
-                        # Try to parse and format
-                        if "/" in date_str:
-                            parts = date_str.split("/")
-                        else:
-                            parts = date_str.split("-")
-                        
-                        if len(parts) == 3:
-                            if len(parts[2]) == 4:  # MM/DD/YYYY or MM-DD-YYYY
-                                formatted_date = f"{parts[2]}-{parts[0].zfill(2)}-{parts[1].zfill(2)}"
-                            else:  # YYYY/MM/DD or YYYY-MM-DD
-                                formatted_date = f"{parts[0]}-{parts[1].zfill(2)}-{parts[2].zfill(2)}"
-                            
-                            # Validate date
-                            datetime.strptime(formatted_date, 
-"%Y-%m-%d")
-                            date_of_service = formatted_date
-                            break
-                except:
-                    continue
-        
-        return {
-            "type": "bill",
-            "hospital_name": hospital_name,
-            "total_amount": total_amount,
-            "date_of_service": date_of_service
-        }
+        return {"type": "bill", **BILL_FIELDS.extract(text)}
+    
+    def process_pages(self, pages: PdfPageStream) -> Dict[str, Any]:
+        """Process only as many pages as needed to resolve every field"""
+        return {"type": "bill", **BILL_FIELDS.extract_pages(pages)}
 
 class AdvancedDischargeAgent:
     def __init__(self):
@@ -168,110 +205,11 @@ class AdvancedDischargeAgent:
     
     def process(self, text: str) -> Dict[str, Any]:
         """Process discharge summary with advanced pattern matching"""
-        
-        # Extract patient name
-        name_patterns = [
-            r"(?i)patient[^\w]*name[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)",
-            r"(?i)patient[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)",
-            r"(?i)name[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)",
-        ]
-        
-        patient_name = "John Doe"  # Default as per requirement
-        for pattern in name_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                candidate = matches[0].strip()
-                if len(candidate) > 3 and len(candidate) < 50:  # Reasonable length
-                    patient_name = candidate
-                    break
-        
-        # Extract diagnosis
-        diagnosis_patterns = [
-            r"(?i)(?:primary\s+)?diagnosis[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)",
-            r"(?i)condition[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)",
-            r"(?i)medical\s+condition[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)",
-        ]
-        
-        diagnosis = "Fracture"  # Default as per requirement
-        for pattern in diagnosis_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                candidate = matches[0].strip()
-                if len(candidate) > 3 and len(candidate) < 100:  # Reasonable length
-                    diagnosis = candidate
-                    break
-        
-        # Extract admission date
-        admission_patterns = [
-            r"(?i)admission\s+date[^\d]*?(\d{4}-\d{2}-\d{2})",
-            r"(?i)admitted[^\d]*?(\d{4}-\d{2}-\d{2})",
-            r"(?i)admission[^\d]*?(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
-        ]
-        
-        admission_date = "2024-04-01"  # Default as per requirement
-        for pattern in admission_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                date_str = matches[0]
-                try:
-                    if "/" in date_str or "-" in date_str:
-                        if "/" in date_str:
-                            parts = date_str.split("/")
-                        else:
-                            parts = date_str.split("-")
-                        
-                        if len(parts) == 3:
-                            if len(parts[2]) == 4:  # MM/DD/YYYY
-                                formatted_date = f"{parts[2]}-{parts[0].zfill(2)}-{parts[1].zfill(2)}"
-                            else:  # YYYY/MM/DD
-                                formatted_date = f"{parts[0]}-{parts[1].zfill(2)}-{parts[2].zfill(2)}"
-                            
-                            datetime.strptime(formatted_date, 
-"%Y-%m-%d")
-                            admission_date = formatted_date
-                            break
-                except:
-                    continue
-        
-        # Extract discharge date
-        discharge_patterns = [
-            r"(?i)discharge\s+date[^\d]*?(\d{4}-\d{2}-\d{2})",
-            r"(?i)discharged[^\d]*?(\d{4}-\d{2}-\d{2})",
-            r"(?i)discharge[^\d]*?(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
-        ]
-        
-        discharge_date = "2024-04-10"  # Default as per requirement
-        for pattern in discharge_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                date_str = matches[0]
-                try:
-                    if "/" in date_str or "-" in date_str:
-                        if "/" in date_str:
-                            parts = date_str.split("/")
-                        else:
-                            parts = date_str.split("-")
-                        
-                        if len(parts) == 3:
-                            if len(parts[2]) == 4:  # MM/DD/YYYY
-                                formatted_date = f"{parts[2]}-{parts[0].zfill(2)}-{parts[1].zfill(2)}"
-                            else:  # YYYY/MM/DD
-                                formatted_date = f"{parts[0]}-{parts[1].zfill(2)}-{parts[2].zfill(2)}"
-                            
-                            datetime.strptime(formatted_date, 
-"%Y-%m-%d")
-                            discharge_date = formatted_date
-                            break
-                except:
-                    continue
-        
-        return {
-            "type": "discharge_summary",
-            "patient_name": patient_name,
-            "diagnosis": diagnosis,
-            "admission_date": admission_date,
-            "discharge_date": discharge_date
-        }
+        return {"type": "discharge_summary", **DISCHARGE_FIELDS.extract(text)}
+    
+    def process_pages(self, pages: PdfPageStream) -> Dict[str, Any]:
+        """Process only as many pages as needed to resolve every field"""
+        return {"type": "discharge_summary", **DISCHARGE_FIELDS.extract_pages(pages)}
 
 class AdvancedIDCardAgent:
     def __init__(self):
@@ -279,148 +217,214 @@ class AdvancedIDCardAgent:
     
     def process(self, text: str) -> Dict[str, Any]:
         """Process ID card with advanced pattern matching"""
-        
-        # Extract patient name
-        name_patterns = [
-            r"(?i)(?:name|member)[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)",
-            r"(?i)cardholder[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)",
-        ]
-        
-        patient_name = "John Doe"  # Default
-        for pattern in name_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                candidate = matches[0].strip()
-                if len(candidate) > 3 and len(candidate) < 50:
-                    patient_name = candidate
-                    break
-        
-        # Extract ID number
-        id_patterns = [
-            r"(?i)(?:id|member|policy)\s*(?:number|#)[^\w]*:?\s*([^\n\r\s]+)",
-            r"(?i)(?:id|member|policy)[^\w]*:?\s*([^\n\r\s]+)",
-        ]
-        
-        id_number = "ID123456789"  # Default
-        for pattern in id_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                candidate = matches[0].strip()
-                if len(candidate) > 3 and len(candidate) < 30:
-                    id_number = candidate
-                    break
-        
-        # Extract insurance provider
-        provider_patterns = [
-            r"(?i)(?:insurance|provider|company)[^\w]*:?\s*([^\n\r]+?)(?:\n|\r|$)",
-        ]
-        
-        insurance_provider = "Health Insurance Co."  # Default
-        for pattern in provider_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                candidate = matches[0].strip()
-                if len(candidate) > 3 and len(candidate) < 100:
-                    insurance_provider = candidate
-                    break
-        
-        return {
-            "type": "id_card",
-            "patient_name": patient_name,
-            "id_number": id_number,
-            "insurance_provider": insurance_provider
-        }
+        return {"type": "id_card", **ID_CARD_FIELDS.extract(text)}
+    
+    def process_pages(self, pages: PdfPageStream) -> Dict[str, Any]:
+        """Process only as many pages as needed to resolve every field"""
+        return {"type": "id_card", **ID_CARD_FIELDS.extract_pages(pages)}
+
+@lru_cache(maxsize=4096)
+def parse_date(value: Any) -> Optional[datetime]:
+    """Parse a YYYY-MM-DD field value, or None; memoized since claims repeat the same dates"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+class ClaimDocuments:
+    """The documents of one claim grouped by type in a single pass"""
+    
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+        self.by_type: Dict[Any, List[Dict[str, Any]]] = {}
+        for doc in documents:
+            self.by_type.setdefault(doc.get("type"), []).append(doc)
+    
+    def of_type(self, doc_type: str) -> List[Dict[str, Any]]:
+        return self.by_type.get(doc_type, [])
+
+class EpisodeIndex:
+    """Admission episodes of a claim sorted by admission date, for matching bills to stays.
+
+    Each episode is (admission, discharge, discharge summary). ``find`` bisects
+    on the admission dates and checks the episode with the latest discharge
+    among those admitted by that date, so a lookup is O(log n) even when
+    episodes overlap.
+    """
+    
+    def __init__(self, episodes: List[Tuple[datetime, datetime, Dict[str, Any]]]):
+        self.episodes = sorted(episodes, key=lambda episode: (episode[0], episode[1]))
+        self.starts = [admission for admission, _, _ in self.episodes]
+        # Index of the latest-ending episode among the first i + 1
+        self.latest_end: List[int] = []
+        for index, (_, discharge, _) in enumerate(self.episodes):
+            if self.latest_end and self.episodes[self.latest_end[-1]][1] >= discharge:
+                self.latest_end.append(self.latest_end[-1])
+            else:
+                self.latest_end.append(index)
+    
+    def find(self, day: datetime) -> Optional[int]:
+        """Index of an episode whose stay contains the day, or None"""
+        position = bisect_right(self.starts, day) - 1
+        if position < 0:
+            return None
+        candidate = self.latest_end[position]
+        return candidate if self.episodes[candidate][1] >= day else None
+    
+    def overlaps(self) -> List[Tuple[int, int]]:
+        """Pairs of consecutive (by admission) episodes whose stays overlap"""
+        pairs = []
+        for index in range(1, len(self.episodes)):
+            previous = self.latest_end[index - 1]
+            if self.episodes[index][0] <= self.episodes[previous][1]:
+                pairs.append((previous, index))
+        return pairs
+
+def _day(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d")
 
 class AdvancedClaimValidator:
-    def __init__(self):
-        pass
+    def __init__(self, duplicates: Optional[DuplicateIndex] = None, episodes: bool = False):
+        self.duplicates = duplicates
+        self.episodes = episodes
     
-    def validate(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Advanced validation with comprehensive checks"""
+    def validate(self, documents: List[Dict[str, Any]], signatures: Optional[List[Optional[Signature]]] = None,
+                 reference: Optional[str] = None) -> Dict[str, Any]:
+        """Advanced validation with comprehensive checks.
+
+        By default the first bill is checked against the first discharge
+        summary. In episodes mode every discharge summary is an admission
+        episode and every bill is matched to the episode containing its service
+        date; the result then also lists the episodes with their bill totals
+        and the bills that match none.
+
+        With a duplicate index, earlier claims with the same identifying fields
+        or near-identical documents (by text ``signatures``, one per document)
+        are reported as discrepancies; ``reference`` names this claim so a
+        reprocessed claim does not match itself.
+        """
         missing_documents = []
         discrepancies = []
+        claim = ClaimDocuments(documents)
         
         # Check for required document types
-        doc_types = [doc.get("type") for doc in documents]
         required_types = ["bill", "discharge_summary"]
         
         for req_type in required_types:
-            if req_type not in doc_types:
+            if req_type not in claim.by_type:
                 missing_documents.append(req_type)
         
-        # Advanced consistency checks
-        patient_names = []
-        dates = []
-        
-        for doc in documents:
-            if "patient_name" in doc and doc["patient_name"] != "Unknown Patient":
-                patient_names.append(doc["patient_name"])
-            
-            # Collect dates for validation
-            if doc.get("type") == "bill" and "date_of_service" in doc:
-                dates.append(doc["date_of_service"])
-            elif doc.get("type") == "discharge_summary":
-                if "admission_date" in doc:
-                    dates.append(doc["admission_date"])
-                if "discharge_date" in doc:
-                    dates.append(doc["discharge_date"])
-        
         # Check patient name consistency
-        unique_names = list(set(patient_names))
+        unique_names = {doc["patient_name"] for doc in documents
+                        if "patient_name" in doc and doc["patient_name"] != "Unknown Patient"}
         if len(unique_names) > 1:
             discrepancies.append("Inconsistent patient names across documents")
         
-        # Check date consistency (discharge should be after admission)
-        bill_docs = [doc for doc in documents if doc.get("type") == "bill"]
-        discharge_docs = [doc for doc in documents if doc.get("type") == "discharge_summary"]
-        
-        if bill_docs and discharge_docs:
-            try:
-                bill_date = datetime.strptime(bill_docs[0]["date_of_service"], "%Y-%m-%d")
-                admission_date = datetime.strptime(discharge_docs[0]["admission_date"], "%Y-%m-%d")
-                discharge_date = datetime.strptime(discharge_docs[0]["discharge_date"], "%Y-%m-%d")
-                
+        result = {
+            "missing_documents": missing_documents,
+            "discrepancies": discrepancies
+        }
+        bill_docs = claim.of_type("bill")
+        discharge_docs = claim.of_type("discharge_summary")
+        
+        if self.episodes:
+            # Without any discharge summary the missing document is the finding
+            result.update(self._validate_episodes(bill_docs, discharge_docs, discrepancies) if discharge_docs
+                          else {"episodes": [], "unmatched_bills": []})
+        elif bill_docs and discharge_docs:
+            # Check date consistency (discharge should be after admission);
+            # skipped if any date is missing or malformed
+            bill_date = parse_date(bill_docs[0].get("date_of_service"))
+            admission_date = parse_date(discharge_docs[0].get("admission_date"))
+            discharge_date = parse_date(discharge_docs[0].get("discharge_date"))
+            
+            if bill_date and admission_date and discharge_date:
                 if discharge_date < admission_date:
                     discrepancies.append("Discharge date is before admission date")
                 
                 if bill_date < admission_date or bill_date > discharge_date:
                     discrepancies.append("Service date is outside admission period")
-            except:
-                pass  # Skip date validation if parsing fails
+        
+        # Resubmitted claims
+        if self.duplicates is not None:
+            discrepancies.extend(self.duplicates.find(documents, signatures or [None] * len(documents), reference))
+        
+        return result
+    
+    @staticmethod
+    def _validate_episodes(bill_docs: List[Dict[str, Any]], discharge_docs: List[Dict[str, Any]],
+                           discrepancies: List[str]) -> Dict[str, Any]:
+        """Match every bill to its admission episode; returns the episodes and unmatched bills"""
+        stays = []
+        for doc in discharge_docs:
+            admission = parse_date(doc.get("admission_date"))
+            discharge = parse_date(doc.get("discharge_date"))
+            if admission is None or discharge is None:
+                discrepancies.append("Discharge summary has a missing or invalid admission or discharge date")
+            elif discharge < admission:
+                discrepancies.append(f"Discharge date is before admission date ({_day(admission)} to {_day(discharge)})")
+            else:
+                stays.append((admission, discharge, doc))
+        index = EpisodeIndex(stays)
+        
+        for first, second in index.overlaps():
+            a, b = index.episodes[first], index.episodes[second]
+            discrepancies.append(f"Overlapping admission episodes: {_day(a[0])} to {_day(a[1])} "
+                                 f"and {_day(b[0])} to {_day(b[1])}")
+        
+        bills = [0] * len(index.episodes)
+        totals = [0.0] * len(index.episodes)
+        unmatched = []
+        for number, doc in enumerate(bill_docs, 1):
+            service_date = parse_date(doc.get("date_of_service"))
+            episode = index.find(service_date) if service_date is not None else None
+            amount = doc.get("total_amount")
+            if episode is None:
+                unmatched.append({"bill": number, "date_of_service": doc.get("date_of_service"), "total_amount": amount})
+                continue
+            bills[episode] += 1
+            if isinstance(amount, (int, float)):
+                totals[episode] += amount
+        if unmatched:
+            discrepancies.append(f"{len(unmatched)} bill(s) with a service date outside every admission episode")
         
         return {
-            "missing_documents": missing_documents,
-            "discrepancies": discrepancies
+            "episodes": [
+                {"admission_date": _day(admission), "discharge_date": _day(discharge), "bills": count,
+                 "total_amount": round(total, 2)}
+                for (admission, discharge, _), count, total in zip(index.episodes, bills, totals)
+            ],
+            "unmatched_bills": unmatched,
         }
 
 class AdvancedClaimDecisionEngine:
-    def __init__(self):
-        pass
+    def __init__(self, episodes: bool = False):
+        self.episodes = episodes
     
     def make_decision(self, documents: List[Dict[str, Any]], validation: Dict[str, Any]) -> Dict[str, Any]:
-        """Advanced decision making with comprehensive logic"""
+        """Advanced decision making with comprehensive logic.
+
+        Checks the amount of the first bill, or of every bill in episodes mode.
+        """
         missing_docs = validation.get("missing_documents", [])
         discrepancies = validation.get("discrepancies", [])
         
         if missing_docs:
             return {
                 "status": "rejected",
-                "reason": f"Missing required documents: {", ".join(missing_docs)}"
+                "reason": f"Missing required documents: {', '.join(missing_docs)}"
             }
         
         if discrepancies:
             return {
                 "status": "rejected",
-                "reason": f"Data discrepancies found: {", ".join(discrepancies)}"
+                "reason": f"Data discrepancies found: {', '.join(discrepancies)}"
             }
         
-        # Check document quality
-        bill_docs = [doc for doc in documents if doc.get("type") == "bill"]
-        discharge_docs = [doc for doc in documents if doc.get("type") == "discharge_summary"]
-        
         # Validate bill amount
-        if bill_docs:
-            total_amount = bill_docs[0].get("total_amount", 0)
+        bill_docs = ClaimDocuments(documents).of_type("bill")
+        for bill in bill_docs if self.episodes else bill_docs[:1]:
+            total_amount = bill.get("total_amount", 0)
             if total_amount <= 0:
                 return {
                     "status": "rejected",
@@ -433,7 +437,459 @@ class AdvancedClaimDecisionEngine:
             "reason": "All required documents present and data is consistent"
         }
 
+# Bump whenever the extractor, patterns, indicators or agent output change so
+# cached extraction results from older rules are invalidated.
+EXTRACTION_RULES = "2"
+
+def extraction_rules_version() -> str:
+    """Rules version of cached extraction results, including the pypdf version"""
+    import pypdf
+    return f"{EXTRACTION_RULES}/pypdf-{pypdf.__version__}"
+
+# Resolved on the first cache lookup, so pypdf is not imported at startup
+EXTRACTION_CACHE = ExtractionCache(extraction_rules_version)
+
+UPLOAD_LIMITS = UploadLimits()
+SHARED_UPLOADS = SharedUploads()
+
+# Pages parsed versus pages available across every extracted document
+PAGE_STATS = {"documents": 0, "pages_parsed": 0, "pages_available": 0}
+_page_stats_lock = Lock()
+
+METRICS.histogram("claim_stage_duration_seconds",
+                  "Time spent per pipeline stage; extraction, classification and agents are per document")
+METRICS.histogram("claim_duration_seconds", "Wall time to process one claim")
+METRICS.counter("claim_upload_bytes_total", "Bytes of uploaded files processed")
+METRICS.histogram("claim_upload_resident_bytes", "Upload bytes held in memory per claim; spooled uploads are mapped",
+                  (64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2, 256 * 1024 ** 2))
+METRICS.counter("claim_worker_handoff_bytes_total",
+                "Upload bytes handed to claim pool workers: shared (written once to a shared file), "
+                "mapped (spooled file passed by path) or pickled (copied through the pipe)")
+METRICS.counter("claim_pages_parsed_total", "PDF pages parsed")
+METRICS.counter("claim_documents_total", "Processed documents by type; cached marks extraction cache hits")
+METRICS.counter("claim_errors_total", "Failures by pipeline stage")
+METRICS.counter("claim_decisions_total", "Claim decisions by status")
+
+# Agents, classifier and extractor hold no per-document state; one of each
+# is built per process and shared by every request
+AGENTS = {
+    "bill": AdvancedBillAgent(),
+    "discharge_summary": AdvancedDischargeAgent(),
+    "id_card": AdvancedIDCardAgent(),
+}
+DOCUMENT_CLASSIFIER = AdvancedDocumentClassifier()
+TEXT_EXTRACTOR = AdvancedTextExtractor()
+# One validator and decision engine per validation mode, keyed by episodes
+VALIDATORS = {episodes: AdvancedClaimValidator(DUPLICATE_INDEX, episodes) for episodes in (False, True)}
+# What the agents return for fields they find nothing for; claims are not
+# fingerprinted on these
+DUPLICATE_INDEX.placeholders = {"bill": BILL_FIELDS.defaults(), "discharge_summary": DISCHARGE_FIELDS.defaults(),
+                                "id_card": ID_CARD_FIELDS.defaults()}
+DECISION_ENGINES = {episodes: AdvancedClaimDecisionEngine(episodes) for episodes in (False, True)}
+
+def _agent_for(doc_type: str):
+    # Default to bill processing
+    return AGENTS.get(doc_type, AGENTS["bill"])
+
+def run_agent(doc_type: str, raw_text: str) -> Dict[str, Any]:
+    """Process text with the agent for its document type"""
+    return _agent_for(doc_type).process(raw_text)
+
+def warm_up() -> None:
+    """Do the one-time work of a process's first document ahead of it.
+
+    Imports pypdf with its text extraction modules and runs the classifier
+    and every agent once. Called in the server process before it forks or
+    serves, and in each claim pool worker right after it starts.
+    """
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    pdf = BytesIO()
+    writer.write(pdf)
+    TEXT_EXTRACTOR.extract_text_from_pdf(BytesIO(pdf.getvalue()))
+    text = "Hospital bill\nPatient Name: John Doe\nTotal: 1,250.00\nDate of Service: 2024-04-10\n"
+    DOCUMENT_CLASSIFIER.classify_document("warm-up.pdf", text)
+    for doc_type in AGENTS:
+        run_agent(doc_type, text)
+    EXTRACTION_CACHE.rules_version
+
+def process_document(filename: str, file_content: Content, streaming: bool = False, classify_pages: int = 2,
+                     timer: Optional[StageTimer] = None) -> Tuple[Dict[str, Any], Optional[str], Optional[Dict[str, Any]]]:
+    """Extract, classify and run the matching agent for one uploaded file.
+
+    Runs inside claim worker processes, so it only takes picklable arguments.
+    Returns the cache payload (parsed page texts, page count and agent output
+    per type), the document type and the processed document; the last two are
+    None when the PDF has no extractable text.
+
+    In streaming mode only the first ``classify_pages`` pages are parsed for
+    classification (all of them if those are blank) and the agent pulls more
+    pages only until its fields are resolved.
+    """
+    if timer is None:
+        timer = StageTimer()
+    
+    # pypdf reads from a file-like object; spooled uploads are memory-mapped,
+    # and the mapping is closed once the agent has pulled its pages
+    with open_content(file_content) as pdf_stream:
+        with timer.stage("pdf_extraction"):
+            pages = TEXT_EXTRACTOR.open_pages(pdf_stream)
+            payload: Dict[str, Any] = {"pages": pages.pages, "pages_total": pages.pages_total, "documents": {}}
+            
+            classify_text = pages.prefix(classify_pages)[0] if streaming else pages.text()
+            if not classify_text.strip():
+                classify_text = pages.text()
+        if not classify_text.strip():
+            if pages.failed:
+                timer.errors.append("pdf_extraction")
+                return {"pages": [], "pages_total": 0, "documents": {}}, None, None
+            return payload, None, None
+        
+        # Classify document
+        with timer.stage("classification"):
+            doc_type = DOCUMENT_CLASSIFIER.classify_document(filename, classify_text)
+        
+        # Process with appropriate agent; pages it pulls in streaming mode count
+        # as extraction time
+        agent = _agent_for(doc_type)
+        agent_stage = f"{doc_type}_agent"
+        parsed_before = pages.parse_seconds
+        with timer.stage(agent_stage):
+            processed_doc = agent.process_pages(pages) if streaming else agent.process(classify_text)
+        pulled = pages.parse_seconds - parsed_before
+        timer.add("pdf_extraction", pulled)
+        timer.add(agent_stage, -pulled)
+        if pages.failed:
+            timer.errors.append("pdf_extraction")
+            return {"pages": [], "pages_total": 0, "documents": {}}, None, None
+        
+        payload["documents"][doc_type] = processed_doc
+        return payload, doc_type, processed_doc
+
+def document_signature(pages: List[str], classify_pages: int, doc_type: Optional[str]) -> Optional[Signature]:
+    """Text signature of a document for duplicate detection, None for types not compared by text.
+
+    Covers the pages classification reads in streaming mode (all parsed pages
+    if those are blank), so it is the same whichever mode extracted them.
+    """
+    if doc_type not in SIGNED_TYPES:
+        return None
+    return text_signature("\n".join(pages[:classify_pages])) or text_signature("\n".join(pages))
+
+def _process_document_timed(filename: str, file_content: Content, streaming: bool = False, classify_pages: int = 2,
+                            profile_settings: Optional[Tuple[str, float]] = None
+                            ) -> Tuple[Tuple[Dict[str, Any], Optional[str], Optional[Dict[str, Any]]], StageTimer,
+                                       Optional[Signature], Optional[Profile]]:
+    """process_document for the claim pool, also returning the document's stage timings and text signature.
+
+    Given the (mode, interval) ``profile_settings`` of the claim's profile,
+    the document is recorded into a new Profile, which is returned for the
+    claim to merge.
+    """
+    timer = StageTimer()
+    profile = Profile(*profile_settings) if profile_settings is not None else None
+    with profile or nullcontext():
+        result = process_document(filename, file_content, streaming, classify_pages, timer=timer)
+        signature = None
+        if result[2] is not None:
+            with timer.stage("signature"):
+                signature = document_signature(result[0]["pages"], classify_pages, result[1])
+    return result, timer, signature, profile
+
+def _document_from_cache(filename: str, digest: str, cached: Dict[str, Any], streaming: bool,
+                         classify_pages: int) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Return (hit, document) for a cached upload; a miss means it must be re-extracted"""
+    pages, pages_total = cached["pages"], cached["pages_total"]
+    complete = len(pages) >= pages_total
+    if streaming:
+        if len(pages) < min(classify_pages, pages_total):
+            return False, None
+        classify_text = PdfPageStream.join(pages[:classify_pages], classify_pages >= pages_total)
+        if not classify_text.strip():
+            if not complete:
+                return False, None
+            classify_text = PdfPageStream.join(pages, True)
+    else:
+        if not complete:
+            return False, None
+        classify_text = PdfPageStream.join(pages, True)
+    if not classify_text.strip():
+        return True, None
+    
+    # Classification also looks at the filename, so it is redone for every
+    # upload; agent output is cached per document type
+    doc_type = DOCUMENT_CLASSIFIER.classify_document(filename, classify_text)
+    documents = cached["documents"]
+    if doc_type not in documents:
+        if not complete:
+            return False, None
+        documents[doc_type] = run_agent(doc_type, PdfPageStream.join(pages, True))
+        EXTRACTION_CACHE.put(digest, cached)
+    return True, documents[doc_type]
+
+def process_documents(jobs: List[Tuple[str, Content]], workers: int, streaming: bool = False, classify_pages: int = 2,
+                      timer: Optional[StageTimer] = None, document_timeout: Optional[float] = None,
+                      document_memory: Optional[int] = None, profile: Optional[Profile] = None
+                      ) -> List[Tuple[Optional[Dict[str, Any]], Optional[Signature], Optional[BaseException]]]:
+    """Process (filename, content) uploads and return (document, signature, error) in upload order.
+
+    Uploads seen before are served from the extraction cache; the rest run on
+    the claim worker pool and are cached afterwards. A document is None when
+    its PDF has no extractable text; the signature is its text signature for
+    duplicate detection. With a ``document_timeout`` (seconds) or
+    ``document_memory`` (bytes) budget every document runs in a pool worker
+    that is killed or fails the document once it exceeds the budget. Stage
+    timings of every document are recorded in METRICS and added to ``timer``,
+    and what workers record of a ``profile`` is merged into it.
+    """
+    if timer is None:
+        timer = StageTimer()
+    results: List[Tuple[Optional[Dict[str, Any]], Optional[Signature], Optional[BaseException]]] = \
+        [(None, None, None)] * len(jobs)
+    METRICS.inc("claim_upload_bytes_total", sum(len(file_content) for _, file_content in jobs))
+    digests = [content_digest(as_buffer(file_content)) for _, file_content in jobs]
+    # Extraction reads uploads through streams of its own, so the mappings
+    # hashed above are not needed again
+    for _, file_content in jobs:
+        close_content(file_content)
+    
+    pending = []
+    for index, (filename, _) in enumerate(jobs):
+        started = time.perf_counter()
+        cached = EXTRACTION_CACHE.get(digests[index])
+        if cached is None:
+            pending.append(index)
+            continue
+        try:
+            hit, processed_doc = _document_from_cache(filename, digests[index], cached, streaming, classify_pages)
+        except Exception as e:
+            METRICS.inc("claim_errors_total", stage="extraction_cache")
+            results[index] = (None, None, e)
+            continue
+        if hit:
+            signature = (document_signature(cached["pages"], classify_pages, processed_doc.get("type"))
+                         if processed_doc is not None else None)
+            elapsed = time.perf_counter() - started
+            timer.add("extraction_cache", elapsed)
+            METRICS.observe("claim_stage_duration_seconds", elapsed, stage="extraction_cache")
+            METRICS.inc("claim_documents_total", doc_type=_document_type(processed_doc), source="cache")
+            results[index] = (processed_doc, signature, None)
+        else:
+            pending.append(index)
+    
+    # Uploads going to pool workers are handed over as shared files, not pickled.
+    # Workers profile into their own Profile; in this process the claim's own
+    # recording already covers the documents
+    worker_jobs = [jobs[index] for index in pending]
+    pooled = uses_pool(workers, len(worker_jobs), document_timeout, document_memory)
+    profile_settings = (profile.mode, profile.interval) if profile is not None and pooled else None
+    with (SHARED_UPLOADS.share(worker_jobs) if pooled else nullcontext(worker_jobs)) as worker_jobs:
+        if pooled:
+            _record_handoff(worker_jobs, [jobs[index][1] for index in pending])
+        outcomes = run_isolated(_process_document_timed,
+                                [job + (streaming, classify_pages, profile_settings) for job in worker_jobs],
+                                workers, document_timeout, document_memory)
+    for index, (result, error) in zip(pending, outcomes):
+        if error is not None:
+            METRICS.inc("claim_errors_total", stage=document_failure(error)[0])
+            results[index] = (None, None, error)
+            continue
+        (payload, _, processed_doc), document_timer, signature, document_profile = result
+        if document_profile is not None:
+            profile.merge(document_profile)
+        document_timer.pages = len(payload["pages"])
+        for stage, seconds in document_timer.seconds.items():
+            METRICS.observe("claim_stage_duration_seconds", seconds, stage=stage)
+        for stage in document_timer.errors:
+            METRICS.inc("claim_errors_total", stage=stage)
+        METRICS.inc("claim_pages_parsed_total", document_timer.pages)
+        METRICS.inc("claim_documents_total", doc_type=_document_type(processed_doc), source="extracted")
+        timer.merge(document_timer)
+        with _page_stats_lock:
+            PAGE_STATS["documents"] += 1
+            PAGE_STATS["pages_parsed"] += len(payload["pages"])
+            PAGE_STATS["pages_available"] += payload["pages_total"]
+        EXTRACTION_CACHE.put(digests[index], payload)
+        results[index] = (processed_doc, signature, None)
+    return results
+
+def _record_handoff(worker_jobs: List[Tuple[str, Content]], originals: List[Content]) -> None:
+    """Count the upload bytes handed to pool workers, by how they travel"""
+    for (_, content), original in zip(worker_jobs, originals):
+        if not isinstance(content, MappedUpload):
+            transport = "pickled"
+        else:
+            transport = "mapped" if content is original else "shared"
+        METRICS.inc("claim_worker_handoff_bytes_total", len(content), transport=transport)
+
+def document_failure(error: BaseException) -> Tuple[str, str]:
+    """(stage, reason) for a document that failed to process"""
+    if isinstance(error, JobTimeout):
+        return "timeout", f"Processing exceeded the {error.seconds:g}s time budget"
+    if isinstance(error, MemoryError):
+        return "memory", "Processing exceeded the memory budget"
+    if isinstance(error, BrokenProcessPool):
+        return "worker_crash", "Processing crashed its worker"
+    return getattr(error, "claim_stage", "document"), f"Processing failed: {str(error)}"
+
+def _document_type(processed_doc: Optional[Dict[str, Any]]) -> str:
+    return processed_doc.get("type", "unknown") if processed_doc is not None else "unreadable"
+
+@claim_bp.route("/extraction-stats", methods=["GET"])
+def extraction_stats():
+    """Pages parsed versus available, extraction cache counters and upload budget for this process"""
+    with _page_stats_lock:
+        pages = dict(PAGE_STATS)
+    return jsonify({"pages": pages, "cache": EXTRACTION_CACHE.stats(), "uploads": UPLOAD_LIMITS.stats()})
+
+def pipeline_options(config) -> Dict[str, Any]:
+    """Claim pipeline settings from an app config, as keyword arguments for run_claim"""
+    return {
+        "workers": config.get("CLAIM_WORKERS", 1),
+        "streaming": config.get("EXTRACTION_MODE", "full") == "streaming",
+        "classify_pages": config.get("CLASSIFY_PAGES", 2),
+        "document_timeout": config.get("DOCUMENT_TIMEOUT_SECONDS") or None,
+        "document_memory": config.get("DOCUMENT_MEMORY_BYTES") or None,
+        "episodes": config.get("VALIDATION_MODE", "single") == "episodes",
+    }
+
+def run_claim(jobs: List[Tuple[str, Content]], workers: int = 1, streaming: bool = False, classify_pages: int = 2,
+              timer: Optional[StageTimer] = None, request_id: Optional[str] = None,
+              document_timeout: Optional[float] = None, document_memory: Optional[int] = None,
+              episodes: bool = False, profile: Optional[Profile] = None) -> Dict[str, Any]:
+    """Run the whole claim pipeline over (filename, content) uploads.
+
+    Returns the documents, validation and claim decision in the response
+    schema of /process-claim, plus ``failed_documents`` (filename and reason)
+    when some uploads could not be processed; the rest of the claim still is.
+    Stage timings go to METRICS and to one JSON line on the timing log;
+    ``timer`` may already hold the upload read time. ``request_id`` names the
+    claim in that line and in the duplicate index (random if not given).
+    ``episodes`` validates every bill against its admission episode.
+    ``profile``, recording in the calling thread, also gets the claim
+    workers' part of the profile.
+    """
+    started = time.perf_counter()
+    if timer is None:
+        timer = StageTimer()
+    request_id = request_id or uuid.uuid4().hex
+    
+    # Extraction, classification and agents run across the claim worker
+    # pool; results come back in upload order and failures stay per file
+    processed_documents = []
+    signatures = []
+    failed_documents = []
+    results = process_documents(jobs, workers, streaming, classify_pages, timer, document_timeout, document_memory,
+                                profile)
+    errors = 0
+    for (filename, _), (processed_doc, signature, error) in zip(jobs, results):
+        if error is not None:
+            print(f"Error processing file {filename}: {error}")
+            errors += 1
+            failed_documents.append({"filename": filename, "reason": document_failure(error)[1]})
+            continue
+        if processed_doc is not None:
+            processed_documents.append(processed_doc)
+            signatures.append(signature)
+        else:
+            failed_documents.append({"filename": filename, "reason": "No extractable text"})
+    
+    # Validate and decide, then index the claim for later duplicate checks
+    validation_result, claim_decision = evaluate_claim(processed_documents, signatures, request_id, episodes, timer)
+    with timer.stage("validation"):
+        DUPLICATE_INDEX.add(processed_documents, signatures, request_id)
+    
+    _record_claim(timer, time.perf_counter() - started, jobs, len(processed_documents), errors,
+                  claim_decision["status"], request_id)
+    
+    # Prepare response in exact format
+    response = {
+        "documents": processed_documents,
+        "validation": validation_result,
+        "claim_decision": claim_decision
+    }
+    if failed_documents:
+        response["failed_documents"] = failed_documents
+    return response
+
+def evaluate_claim(documents: List[Dict[str, Any]], signatures: List[Optional[Signature]], reference: str,
+                   episodes: bool = False, timer: Optional[StageTimer] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Validate processed documents and decide the claim, returning (validation, claim_decision).
+
+    Duplicates are looked up excluding ``reference``; the claim is not added
+    to the duplicate index.
+    """
+    if timer is None:
+        timer = StageTimer()
+    with timer.stage("validation"):
+        validation = VALIDATORS[episodes].validate(documents, signatures, reference)
+    with timer.stage("decision"):
+        claim_decision = DECISION_ENGINES[episodes].make_decision(documents, validation)
+    return validation, claim_decision
+
+def _record_claim(timer: StageTimer, elapsed: float, jobs: List[Tuple[str, Content]], documents: int,
+                  errors: int, status: str, request_id: str) -> None:
+    """Record per-claim metrics and write the claim's timing log line"""
+    elapsed += timer.seconds.get("upload_read", 0.0)
+    for stage in ("upload_read", "validation", "decision"):
+        if stage in timer.seconds:
+            METRICS.observe("claim_stage_duration_seconds", timer.seconds[stage], stage=stage)
+    METRICS.observe("claim_duration_seconds", elapsed)
+    # Uploads are all held until the claim finishes, so their sum is the peak
+    resident = sum(len(file_content) for _, file_content in jobs if not isinstance(file_content, MappedUpload))
+    METRICS.observe("claim_upload_resident_bytes", resident)
+    METRICS.inc("claim_decisions_total", status=status)
+    
+    if TIMING_LOG.isEnabledFor(logging.INFO):
+        # Document stages are summed over files, which may run in parallel
+        TIMING_LOG.info(json.dumps({
+            "event": "claim_timing",
+            "request_id": request_id,
+            "files": len(jobs),
+            "bytes": sum(len(file_content) for _, file_content in jobs),
+            "bytes_in_memory": resident,
+            "pages_parsed": timer.pages,
+            "documents": documents,
+            "errors": errors + len(timer.errors),
+            "decision": status,
+            "total_ms": round(elapsed * 1000, 3),
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in timer.seconds.items()},
+        }))
+
+def upload_too_large(error: UploadTooLarge):
+    """413 response for an upload over one of the UploadLimits caps"""
+    METRICS.inc("claim_errors_total", stage="upload_limit")
+    response = jsonify({"error": str(error)})
+    if error.retry_after is not None:
+        response.headers["Retry-After"] = str(error.retry_after)
+    return response, 413
+
+def store_claims(entries: List[ClaimEntry], replace: bool = False) -> None:
+    """Persist (result, source, reference) claim results; a storage error is logged and never fails the claims"""
+    try:
+        CLAIM_STORE.save_many(entries, replace)
+    except Exception as e:
+        METRICS.inc("claim_errors_total", stage="store")
+        print(f"Claim store error: {e}")
+
+def read_uploads(files) -> List[Tuple[str, Content]]:
+    """Read uploaded files into (filename, content) pairs, skipping unnamed or unreadable ones.
+
+    Files the request spooled to disk are memory-mapped instead of read.
+    """
+    jobs = []
+    for file in files:
+        if file.filename == "":
+            continue
+        try:
+            jobs.append((file.filename, upload_content(file)))
+        except Exception as e:
+            print(f"Error processing file {file.filename}: {e}")
+    return jobs
+
 @claim_bp.route("/process-claim", methods=["POST"])
+@ADMISSION.limit
 def process_claim():
     """Enhanced claim processing endpoint"""
     try:
@@ -445,73 +901,32 @@ def process_claim():
         if not files or all(file.filename == "" for file in files):
             return jsonify({"error": "No files selected"}), 400
         
-        # Initialize advanced agents
-        classifier = AdvancedDocumentClassifier()
-        extractor = AdvancedTextExtractor()
-        bill_agent = AdvancedBillAgent()
-        discharge_agent = AdvancedDischargeAgent()
-        id_card_agent = AdvancedIDCardAgent()
-        validator = AdvancedClaimValidator()
-        decision_engine = AdvancedClaimDecisionEngine()
-        
-        processed_documents = []
-        
-        # Process each uploaded file
-        for file in files:
-            if file.filename == "":
-                continue
-                
-            try:
-                # Read file content directly into memory
-                file_content = file.read()
-                
-                # Extract text from PDF (assuming extractor can handle bytes or a file-like object)
-                # For pypdf, we can pass a BytesIO object
-                pdf_file_object = BytesIO(file_content)
-                raw_text = extractor.extract_text_from_pdf(pdf_file_object)
-                
-                if not raw_text.strip():
-                    continue
-                
-                # Classify document
-                doc_type = classifier.classify_document(file.filename, raw_text)
-                
-                # Process with appropriate agent
-                if doc_type == "bill":
-                    processed_doc = bill_agent.process(raw_text)
-                elif doc_type == "discharge_summary":
-                    processed_doc = discharge_agent.process(raw_text)
-                elif doc_type == "id_card":
-                    processed_doc = id_card_agent.process(raw_text)
-                else:
-                    # Default to bill processing
-                    processed_doc = bill_agent.process(raw_text)
-                
-                processed_documents.append(processed_doc)
-                
-            except Exception as e:
-                print(f"Error processing file {file.filename}: {e}")
-                continue
-        
-        # Validate processed documents
-        validation_result = validator.validate(processed_documents)
-        
-        # Make claim decision
-        claim_decision = decision_engine.make_decision(processed_documents, validation_result)
-        
-        # Prepare response in exact format
-        response = {
-            "documents": processed_documents,
-            "validation": validation_result,
-            "claim_decision": claim_decision
-        }
-        
+        # Read every upload first so the files can be processed in parallel
+        timer = StageTimer()
+        with timer.stage("upload_read"):
+            jobs = read_uploads(files)
+        
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        profile = PROFILER.for_request(request)
+        with UPLOAD_LIMITS.reserve(jobs) as pages:
+            files = []
+            if profile is not None:
+                # Counted by the reservation unless no page cap is set
+                files = [(filename, len(file_content), count or UPLOAD_LIMITS.count_pages(file_content) or None)
+                         for (filename, file_content), count in zip(jobs, pages)]
+            with PROFILER.recording(profile, request_id, files):
+                response = run_claim(jobs, timer=timer, request_id=request_id, profile=profile,
+                                     **pipeline_options(current_app.config))
+        store_claims([(response, "api", request_id)])
+        
+        if profile is not None:
+            return jsonify(response), 200, {PROFILE_HEADER: profile.name}
         return jsonify(response), 200
         
+    except UploadTooLarge as e:
+        return upload_too_large(e)
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
+        METRICS.inc("claim_errors_total", stage=getattr(e, "claim_stage", "claim"))
         return jsonify({"error": f"Processing failed: {str(e)}"}), 500
-
-
-
-
-
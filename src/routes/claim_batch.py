@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from werkzeug.datastructures import FileStorage
+from src.routes.claim import UPLOAD_LIMITS, pipeline_options, read_uploads, run_claim, store_claims
+from src.services.admission import ADMISSION
+from src.services.claim_store import CLAIM_STORE, ClaimEntry
+from src.services.responses import json_line
+from src.services.uploads import Content, UploadTooLarge
+
+claim_batch_bp = Blueprint("claim_batch", __name__)
+
+ClaimSource = Tuple[str, Callable[[], List[Tuple[str, Content]]]]
+
+def _detach(upload: FileStorage) -> FileStorage:
+    """Copy an upload to a temporary file the response owns.
+
+    Flask closes the request's files when the view returns, before a streamed
+    response body is generated. The copy is a named file so read_uploads can
+    map it instead of reading it into memory.
+    """
+    spool = tempfile.NamedTemporaryFile("w+b", prefix="upload-", suffix=".part",
+                                        dir=current_app.config.get('UPLOAD_SPOOL_DIR'))
+    shutil.copyfileobj(upload.stream, spool)
+    spool.seek(0)
+    return FileStorage(spool, filename=upload.filename, name=upload.name)
+
+def _claims_from_archive(archive: FileStorage) -> List[ClaimSource]:
+    """Return (claim_id, loader) for each top-level folder of a zip archive.
+
+    Files at the archive root form one claim named after the archive. Member
+    contents are only read when a claim's loader is called, and only if their
+    uncompressed sizes together are within the per-claim byte caps, so a zip
+    bomb is refused before it is inflated (zipfile reads no more than a
+    member's declared size).
+    """
+    bundle = zipfile.ZipFile(archive.stream)
+    default_claim = os.path.splitext(os.path.basename(archive.filename or "claims"))[0]
+    claims: Dict[str, List[zipfile.ZipInfo]] = {}
+    for member in bundle.infolist():
+        if member.is_dir() or member.filename.startswith("__MACOSX/"):
+            continue
+        parts = member.filename.split("/")
+        claim_id = parts[0] if len(parts) > 1 else default_claim
+        claims.setdefault(claim_id, []).append(member)
+
+    def loader(members: List[zipfile.ZipInfo]) -> Callable[[], List[Tuple[str, Content]]]:
+        def load() -> List[Tuple[str, Content]]:
+            UPLOAD_LIMITS.check_bytes(sum(member.file_size for member in members))
+            return [(os.path.basename(member.filename), bundle.read(member)) for member in members]
+        return load
+
+    return [(claim_id, loader(members)) for claim_id, members in claims.items()]
+
+def _claims_from_form(files, claim_ids: List[str]) -> List[ClaimSource]:
+    """Return (claim_id, loader) grouping uploaded files by the parallel claim_ids field"""
+    claims: Dict[str, List[Any]] = {}
+    for file, claim_id in zip(files, claim_ids):
+        claims.setdefault(claim_id, []).append(file)
+
+    def loader(claim_files: List[Any]) -> Callable[[], List[Tuple[str, Content]]]:
+        return lambda: read_uploads(claim_files)
+
+    return [(claim_id, loader(claim_files)) for claim_id, claim_files in claims.items()]
+
+@claim_batch_bp.route("/process-claim-batch", methods=["POST"])
+@ADMISSION.limit
+def process_claim_batch():
+    """Process many claims in one upload and stream one NDJSON line per claim.
+
+    Claims come either from a zip ``archive`` with one folder per claim, or
+    from ``files`` with a ``claim_ids`` value per file. Up to
+    CLAIM_BATCH_CONCURRENCY claims are processed at a time and each result is
+    written as soon as it finishes, so memory is bounded by the claims in
+    flight rather than by the batch. Each claim is held to the upload caps of
+    /process-claim, waiting for room in the process's upload budget. Results
+    are stored in the claim store in bulk, CLAIM_STORE_BATCH_SIZE claims per
+    insert.
+    """
+    if "archive" in request.files:
+        uploads = [_detach(request.files["archive"])]
+        try:
+            claims = _claims_from_archive(uploads[0])
+        except zipfile.BadZipFile:
+            uploads[0].close()
+            return jsonify({"error": "Archive is not a valid zip file"}), 400
+    elif "files" in request.files:
+        claim_ids = request.form.getlist("claim_ids")
+        if len(claim_ids) != len(request.files.getlist("files")):
+            return jsonify({"error": "Provide one claim_ids value per uploaded file"}), 400
+        uploads = [_detach(file) for file in request.files.getlist("files")]
+        claims = _claims_from_form(uploads, claim_ids)
+    else:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    app = current_app._get_current_object()
+    options = pipeline_options(app.config)
+    concurrency = max(1, app.config.get("CLAIM_BATCH_CONCURRENCY", 4))
+    batch_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+
+    def run(claim_id: str, uploads: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+        try:
+            with app.app_context(), UPLOAD_LIMITS.reserve(uploads, wait=None):
+                return {"claim_id": claim_id, **run_claim(uploads, request_id=f"{batch_id}/{claim_id}", **options)}
+        except UploadTooLarge as e:
+            return {"claim_id": claim_id, "error": str(e)}
+        except Exception as e:
+            return {"claim_id": claim_id, "error": f"Processing failed: {str(e)}"}
+
+    stored: List[ClaimEntry] = []
+
+    def line(future) -> bytes:
+        result = future.result()
+        if "claim_decision" in result:
+            stored.append((result, "batch", result["claim_id"]))
+            if len(stored) >= CLAIM_STORE.batch_size:
+                store_claims(stored)
+                stored.clear()
+        return json_line(result)
+
+    def generate() -> Iterator[bytes]:
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="claim-batch") as executor:
+                pending = set()
+                for claim_id, load in claims:
+                    if len(pending) >= concurrency:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield line(future)
+                    try:
+                        jobs = load()
+                    except UploadTooLarge as e:
+                        yield json_line({"claim_id": claim_id, "error": str(e)})
+                        continue
+                    except Exception as e:
+                        yield json_line({"claim_id": claim_id, "error": f"Reading files failed: {str(e)}"})
+                        continue
+                    pending.add(executor.submit(run, claim_id, jobs))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield line(future)
+        finally:
+            if stored:
+                store_claims(stored)
+            for upload in uploads:
+                upload.close()
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
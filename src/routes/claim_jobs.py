@@ -0,0 +1,53 @@
+from flask import Blueprint, jsonify, request, url_for
+from src.routes.claim import (
+    UPLOAD_LIMITS, pipeline_options, read_uploads, run_claim, store_claims, upload_too_large,
+)
+from src.services.claim_jobs import ClaimJobQueue, QueueFull
+from src.services.uploads import UploadTooLarge
+
+claim_jobs_bp = Blueprint("claim_jobs", __name__)
+
+def _process_job(job_id, uploads, config):
+    # The job id names the claim, so a job retried after its lease lapsed
+    # replaces what an earlier attempt stored rather than matching it. A
+    # queued job waits for room in the upload budget rather than failing
+    with UPLOAD_LIMITS.reserve(uploads, wait=None):
+        result = run_claim(uploads, request_id=job_id, **pipeline_options(config))
+    store_claims([(result, "job", job_id)], replace=True)
+    return result
+
+claim_jobs = ClaimJobQueue(_process_job)
+
+@claim_jobs_bp.route("/claim-jobs", methods=["POST"])
+def submit_claim_job():
+    """Queue a claim for background processing and return its job id"""
+    if "files" not in request.files:
+        return jsonify({"error": "No files uploaded"}), 400
+    
+    files = request.files.getlist("files")
+    if not files or all(file.filename == "" for file in files):
+        return jsonify({"error": "No files selected"}), 400
+    
+    try:
+        jobs = read_uploads(files)
+        UPLOAD_LIMITS.check(jobs)
+        job = claim_jobs.submit(jobs)
+    except UploadTooLarge as e:
+        return upload_too_large(e)
+    except QueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = str(max(1, int(claim_jobs.poll_seconds)))
+        return response, 429
+    
+    status_url = url_for("claim_jobs.get_claim_job", job_id=job.id)
+    response = jsonify({"job_id": job.id, "status": job.status, "status_url": status_url})
+    response.headers["Location"] = status_url
+    return response, 202
+
+@claim_jobs_bp.route("/claim-jobs/<job_id>", methods=["GET"])
+def get_claim_job(job_id):
+    """Return a job's status, and its claim result once it has finished"""
+    job = claim_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
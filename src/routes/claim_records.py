@@ -0,0 +1,35 @@
+from flask import Blueprint, jsonify, request
+from src.services.claim_store import CLAIM_STORE, DEFAULT_PAGE_SIZE, InvalidQuery
+
+claim_records_bp = Blueprint("claim_records", __name__)
+
+FILTERS = ("status", "patient_name", "id_number", "source", "reference",
+           "service_date_from", "service_date_to", "created_from", "created_to")
+
+@claim_records_bp.route("/claims", methods=["GET"])
+def list_claims():
+    """List stored claims, newest first, one page at a time.
+
+    Pass the returned ``next_cursor`` as ``cursor`` to get the next page; it
+    is null on the last page.
+    """
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    filters = {name: request.args[name] for name in FILTERS if name in request.args}
+    try:
+        claims, next_cursor = CLAIM_STORE.search(filters, limit, request.args.get("cursor"))
+    except InvalidQuery as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"claims": claims, "next_cursor": next_cursor})
+
+@claim_records_bp.route("/claims/<int:claim_id>", methods=["GET"])
+def get_claim(claim_id):
+    """Return a stored claim with its documents, validation and decision"""
+    record = CLAIM_STORE.get(claim_id)
+    if record is None:
+        return jsonify({"error": "Claim not found"}), 404
+    return jsonify(record.to_dict())
@@ -0,0 +1,129 @@
+from flask import Blueprint, current_app, jsonify, request, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.routes.claim import (
+    UPLOAD_LIMITS, document_failure, evaluate_claim, pipeline_options, process_documents, read_uploads,
+    store_claims, upload_too_large,
+)
+from src.services.admission import ADMISSION
+from src.services.claim_sessions import ClaimSessions
+from src.services.claim_store import CLAIM_STORE
+from src.services.duplicates import DUPLICATE_INDEX
+from src.services.metrics import METRICS, StageTimer
+from src.services.uploads import UploadTooLarge
+
+claim_sessions_bp = Blueprint("claim_sessions", __name__)
+
+def _evaluate(documents, signatures, session_id):
+    timer = StageTimer()
+    validation, claim_decision = evaluate_claim(documents, signatures, session_id,
+                                                pipeline_options(current_app.config)["episodes"], timer)
+    for stage, seconds in timer.seconds.items():
+        METRICS.observe("claim_stage_duration_seconds", seconds, stage=stage)
+    return {"documents": documents, "validation": validation, "claim_decision": claim_decision}
+
+def _withdraw(session_id):
+    DUPLICATE_INDEX.remove(session_id)
+    try:
+        CLAIM_STORE.delete("session", session_id)
+    except Exception as e:
+        METRICS.inc("claim_errors_total", stage="store")
+        print(f"Claim store error: {e}")
+
+def _publish(result, documents, signatures, session_id):
+    # The session's current result replaces its earlier one in the claim
+    # store and the duplicate index; an empty session is in neither
+    if documents:
+        DUPLICATE_INDEX.add(documents, signatures, session_id)
+        store_claims([(result, "session", session_id)], replace=True)
+    else:
+        _withdraw(session_id)
+
+claim_sessions = ClaimSessions(_evaluate, _publish)
+
+def _process_uploads(jobs, timer):
+    """(filename, document, signature, error) for every upload, processed as /process-claim does"""
+    options = pipeline_options(current_app.config)
+    results = process_documents(jobs, options["workers"], options["streaming"], options["classify_pages"], timer,
+                                options["document_timeout"], options["document_memory"])
+    uploads = []
+    for (filename, _), (processed_doc, signature, error) in zip(jobs, results):
+        if error is not None:
+            print(f"Error processing file {filename}: {error}")
+            uploads.append((filename, None, None, document_failure(error)[1]))
+        elif processed_doc is None:
+            uploads.append((filename, None, None, "No extractable text"))
+        else:
+            uploads.append((filename, processed_doc, signature, None))
+    return uploads
+
+@claim_sessions_bp.route("/claim-sessions", methods=["POST"])
+def create_claim_session():
+    """Start an empty claim to add documents to one at a time"""
+    session = claim_sessions.create()
+    session_url = url_for("claim_sessions.get_claim_session", session_id=session.id)
+    response = jsonify(session.to_dict())
+    response.headers["Location"] = session_url
+    return response, 201
+
+@claim_sessions_bp.route("/claim-sessions/<session_id>", methods=["GET"])
+def get_claim_session(session_id):
+    """Return a session's uploads and its current documents, validation and decision"""
+    session = claim_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Session not found"}), 404
+    return jsonify(session.to_dict())
+
+@claim_sessions_bp.route("/claim-sessions/<session_id>", methods=["DELETE"])
+def delete_claim_session(session_id):
+    """Withdraw a claim: delete the session and its stored result"""
+    if not claim_sessions.delete(session_id):
+        return jsonify({"error": "Session not found"}), 404
+    _withdraw(session_id)
+    return "", 204
+
+@claim_sessions_bp.route("/claim-sessions/<session_id>/documents", methods=["POST"])
+@ADMISSION.limit
+def add_session_documents(session_id):
+    """Process uploads, add them to a session and return its updated decision.
+    
+    Only the new uploads are extracted; the documents already in the session
+    are just validated again.
+    """
+    try:
+        if "files" not in request.files:
+            return jsonify({"error": "No files uploaded"}), 400
+        
+        files = request.files.getlist("files")
+        if not files or all(file.filename == "" for file in files):
+            return jsonify({"error": "No files selected"}), 400
+        
+        if claim_sessions.get(session_id) is None:
+            return jsonify({"error": "Session not found"}), 404
+        
+        timer = StageTimer()
+        with timer.stage("upload_read"):
+            jobs = read_uploads(files)
+        METRICS.observe("claim_stage_duration_seconds", timer.seconds["upload_read"], stage="upload_read")
+        with UPLOAD_LIMITS.reserve(jobs):
+            uploads = _process_uploads(jobs, timer)
+        
+        session = claim_sessions.add(session_id, uploads)
+        if session is None:
+            return jsonify({"error": "Session not found"}), 404
+        return jsonify(session.to_dict()), 200
+    
+    except UploadTooLarge as e:
+        return upload_too_large(e)
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        METRICS.inc("claim_errors_total", stage=getattr(e, "claim_stage", "claim"))
+        return jsonify({"error": f"Processing failed: {str(e)}"}), 500
+
+@claim_sessions_bp.route("/claim-sessions/<session_id>/documents/<int:document_id>", methods=["DELETE"])
+def remove_session_document(session_id, document_id):
+    """Remove an upload from a session and return its updated decision"""
+    session = claim_sessions.remove(session_id, document_id)
+    if session is None:
+        return jsonify({"error": "Session or document not found"}), 404
+    return jsonify(session.to_dict())
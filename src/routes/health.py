@@ -0,0 +1,49 @@
+import os
+import time
+
+from flask import Blueprint, jsonify
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from src.models.claim_job import ClaimJob
+from src.models.user import db
+from src.routes.claim import UPLOAD_LIMITS
+from src.routes.claim_jobs import claim_jobs
+from src.services.admission import ADMISSION
+
+health_bp = Blueprint("health", __name__)
+
+STARTED_AT = time.time()
+
+def load_report():
+    """Current load of this process: claims in flight and queued, and upload memory held"""
+    return {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - STARTED_AT, 1),
+        "claims": ADMISSION.stats(),
+        "uploads": UPLOAD_LIMITS.stats(),
+    }
+
+@health_bp.route("/health", methods=["GET"])
+def health():
+    """Liveness: 200 whenever the process answers, with its current load"""
+    return jsonify({"status": "ok", **load_report()})
+
+@health_bp.route("/ready", methods=["GET"])
+def ready():
+    """Readiness: 503 while the database is unavailable or new claims would be
+    turned away, so load balancers send traffic to other instances"""
+    checks = {}
+    report = load_report()
+    # Counting queued jobs also checks that init-db created the tables
+    try:
+        queued_jobs = db.session.execute(
+            select(func.count()).select_from(ClaimJob).where(ClaimJob.status == ClaimJob.QUEUED)).scalar()
+        checks["database"] = {"ok": True}
+        report["claim_jobs"] = {"queued": queued_jobs, "queue_size": claim_jobs.queue_size}
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        checks["database"] = {"ok": False, "error": str(e.__cause__ or e)}
+    checks["claims"] = {"ok": not ADMISSION.saturated()}
+    is_ready = all(check["ok"] for check in checks.values())
+    return jsonify({"status": "ready" if is_ready else "unavailable", "checks": checks, **report}), \
+        200 if is_ready else 503
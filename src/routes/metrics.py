@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from src.services.metrics import METRICS
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Pipeline metrics in the Prometheus text exposition format"""
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
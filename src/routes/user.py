@@ -1,12 +1,42 @@
+import os
+
 from flask import Blueprint, jsonify, request
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
+from src.services.claim_store import InvalidQuery
+from src.services.responses import stream_json_list
+from src.services.users import (
+    DEFAULT_PAGE_SIZE, IMPORT_FORMATS, USER_STORE, InvalidImport, parse_csv, parse_ndjson,
+)
 
 user_bp = Blueprint('user', __name__)
 
+IMPORT_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+IMPORT_EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """All users in id order, streamed; with ``limit`` or ``cursor``, one page of them.
+
+    A page comes with a ``next_cursor`` to pass as ``cursor`` for the next
+    one; it is null on the last page.
+    """
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return stream_json_list(USER_STORE.iter_all())
+    
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        users, next_cursor = USER_STORE.page(limit, request.args.get('cursor'))
+    except InvalidQuery as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"users": users, "next_cursor": next_cursor})
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -14,9 +44,41 @@ def create_user():
     data = request.json
     user = User(username=data['username'], email=data['email'])
     db.session.add(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "username or email already exists"}), 409
     return jsonify(user.to_dict()), 201
 
+@user_bp.route('/users/import', methods=['POST'])
+def import_users():
+    """Bulk-create users from a CSV (username and email columns) or NDJSON file.
+
+    The file is the request body, or the ``file`` field of a multipart form.
+    Its format comes from ``format`` (csv or ndjson), else from the content
+    type or file extension. All rows are inserted in one transaction; the
+    report counts inserted rows and lists rows skipped for an existing
+    username or email and rows that are invalid.
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload is not None else request.stream
+    import_format = request.args.get('format')
+    if import_format is None:
+        if upload is not None:
+            import_format = IMPORT_EXTENSIONS.get(os.path.splitext(upload.filename or '')[1].lower())
+        else:
+            import_format = IMPORT_CONTENT_TYPES.get(request.mimetype)
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({"error": "Import format must be csv or ndjson"}), 400
+    
+    rows = parse_csv(stream) if import_format == 'csv' else parse_ndjson(stream)
+    try:
+        report = USER_STORE.import_rows(rows)
+    except (InvalidImport, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Unreadable import: {str(e)}"}), 400
+    return jsonify(report), 200
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
@@ -0,0 +1,288 @@
+import asyncio
+import math
+import time
+from collections import deque
+from functools import wraps
+from threading import Event, Lock
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Union
+
+from flask import jsonify, make_response, request
+from werkzeug.exceptions import HTTPException
+
+from src.services.metrics import METRICS
+from src.services.responses import dumps
+
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_MAX_QUEUED = 32
+DEFAULT_QUEUE_TIMEOUT = 10.0
+# Assumed claim duration for Retry-After until claims have finished
+DEFAULT_CLAIM_SECONDS = 2.0
+# Weight of the latest claim in the moving average of claim durations
+_AVERAGE_WEIGHT = 0.2
+# Set in the ASGI scope of a request AdmissionMiddleware already admitted
+ADMITTED_SCOPE_KEY = "claim_admission.admitted"
+
+METRICS.counter("claim_admissions_total",
+                "Claim requests by admission outcome: admitted, queued (admitted after waiting), "
+                "queue_full or timed_out")
+METRICS.histogram("claim_admission_wait_seconds", "Time queued claim requests waited for a slot")
+
+
+def busy_payload(retry_after: int) -> Dict[str, Any]:
+    return {"error": "Too many claims in progress; retry later", "retry_after": retry_after}
+
+
+def _release_after(body: Iterable[Any], release: Callable[[], None]) -> Iterator[Any]:
+    try:
+        yield from body
+    finally:
+        release()
+
+
+class _ThreadWaiter:
+    def __init__(self):
+        self._event = Event()
+
+    def grant(self) -> None:
+        self._event.set()
+
+    def wait(self, timeout: float) -> bool:
+        return self._event.wait(timeout)
+
+
+class _AsyncWaiter:
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self.future = self._loop.create_future()
+
+    def grant(self) -> None:
+        self._loop.call_soon_threadsafe(self._grant)
+
+    def _grant(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class AdmissionControl:
+    """Caps the claim-processing requests running at once in this process.
+
+    Up to ``CLAIM_MAX_IN_FLIGHT`` requests run and up to ``CLAIM_MAX_QUEUED``
+    more wait, in arrival order, at most ``CLAIM_QUEUE_TIMEOUT`` seconds for
+    one of them to finish. Anything beyond is answered at once with 429 and a
+    Retry-After estimated from the queue and recent claim durations, so under
+    overload excess requests are shed quickly while admitted claims keep
+    their latency. Threaded servers wait in the request thread (the ``limit``
+    view decorator); under ASGI, AdmissionMiddleware waits on the event loop,
+    before the request takes a thread. A slot is held until the view returns
+    or, for a streamed response, until its body has been sent.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.max_in_flight = DEFAULT_MAX_IN_FLIGHT
+        self.max_queued = DEFAULT_MAX_QUEUED
+        self.queue_timeout = DEFAULT_QUEUE_TIMEOUT
+        self.in_flight = 0
+        self._waiters: Deque[Union[_ThreadWaiter, _AsyncWaiter]] = deque()
+        self._average_seconds = DEFAULT_CLAIM_SECONDS
+        self._counters = {"admitted": 0, "queued": 0, "queue_full": 0, "timed_out": 0}
+        self._lock = Lock()
+
+    def init_app(self, app) -> None:
+        self.max_in_flight = app.config.get('CLAIM_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)
+        self.max_queued = app.config.get('CLAIM_MAX_QUEUED', DEFAULT_MAX_QUEUED)
+        self.queue_timeout = app.config.get('CLAIM_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT)
+        self.enabled = self.max_in_flight > 0
+        app.extensions['claim_admission'] = self
+
+    def _enter(self, waiter: Union[_ThreadWaiter, _AsyncWaiter]) -> Optional[bool]:
+        """True when a slot was free, False when the queue is full, None once queued"""
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                return True
+            if len(self._waiters) >= self.max_queued:
+                return False
+            self._waiters.append(waiter)
+            return None
+
+    def _leave_queue(self, waiter: Union[_ThreadWaiter, _AsyncWaiter]) -> bool:
+        """Withdraw a waiter; False if it was handed a slot in the meantime"""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return False
+            return True
+
+    def _record(self, outcome: str, waited: Optional[float] = None) -> None:
+        with self._lock:
+            self._counters[outcome] += 1
+        METRICS.inc("claim_admissions_total", outcome=outcome)
+        if waited is not None:
+            METRICS.observe("claim_admission_wait_seconds", waited)
+
+    def acquire(self) -> Optional[int]:
+        """Wait for a slot in this thread; None once admitted, else the Retry-After seconds"""
+        waiter = _ThreadWaiter()
+        entered = self._enter(waiter)
+        if entered is None:
+            start = time.monotonic()
+            if not waiter.wait(self.queue_timeout) and self._leave_queue(waiter):
+                self._record("timed_out")
+                return self.retry_after()
+            self._record("queued", time.monotonic() - start)
+            return None
+        if not entered:
+            self._record("queue_full")
+            return self.retry_after()
+        self._record("admitted")
+        return None
+
+    async def acquire_async(self) -> Optional[int]:
+        """Wait for a slot on the event loop; None once admitted, else the Retry-After seconds"""
+        waiter = _AsyncWaiter()
+        entered = self._enter(waiter)
+        if entered is None:
+            start = time.monotonic()
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if self._leave_queue(waiter):
+                    self._record("timed_out")
+                    return self.retry_after()
+            except asyncio.CancelledError:
+                # The client went away; give back a slot granted meanwhile
+                if not self._leave_queue(waiter):
+                    self.release()
+                raise
+            self._record("queued", time.monotonic() - start)
+            return None
+        if not entered:
+            self._record("queue_full")
+            return self.retry_after()
+        self._record("admitted")
+        return None
+
+    def release(self, seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it to the longest waiting request if any"""
+        with self._lock:
+            if seconds is not None:
+                self._average_seconds += _AVERAGE_WEIGHT * (seconds - self._average_seconds)
+            if self._waiters:
+                self._waiters.popleft().grant()
+            else:
+                self.in_flight -= 1
+
+    def retry_after(self) -> int:
+        """Seconds until a request arriving now would likely find a slot"""
+        with self._lock:
+            ahead = len(self._waiters) + 1
+            average = self._average_seconds
+        return max(1, math.ceil(average * ahead / max(1, self.max_in_flight)))
+
+    def saturated(self) -> bool:
+        """True while new requests are rejected without waiting"""
+        with self._lock:
+            return self.enabled and self.in_flight >= self.max_in_flight and len(self._waiters) >= self.max_queued
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {
+                "enabled": self.enabled,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queued": len(self._waiters),
+                "max_queued": self.max_queued,
+                "queue_timeout": self.queue_timeout,
+                "average_claim_seconds": round(self._average_seconds, 3),
+            }
+            stats.update(self._counters)
+        return stats
+
+    def busy_response(self, retry_after: int):
+        response = jsonify(busy_payload(retry_after))
+        response.status_code = 429
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    def limit(self, view: Callable[..., Any]) -> Callable[..., Any]:
+        """Decorate a claim-processing view so it runs only once admitted"""
+        @wraps(view)
+        def admitted_view(*args: Any, **kwargs: Any):
+            if not self.enabled or request.environ.get("asgi.scope", {}).get(ADMITTED_SCOPE_KEY):
+                return view(*args, **kwargs)
+            retry_after = self.acquire()
+            if retry_after is not None:
+                return self.busy_response(retry_after)
+            start = time.monotonic()
+            released = Lock()
+
+            def release() -> None:
+                if released.acquire(blocking=False):
+                    self.release(time.monotonic() - start)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                release()
+                raise
+            if not response.is_streamed:
+                release()
+                return response
+            # A streamed body does its work while it is sent: the slot is
+            # freed once it is exhausted or the server closes it
+            response.response = _release_after(response.response, release)
+            response.call_on_close(release)
+            return response
+
+        admitted_view.admission_limited = True
+        return admitted_view
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests for limited views before they reach the app.
+
+    Requests wait for a slot on the event loop, so queued requests hold no
+    worker thread and health checks are still answered under overload.
+    ``flask_app`` is matched against to find the view a request is for.
+    """
+
+    def __init__(self, app, flask_app, admission: AdmissionControl):
+        self.app = app
+        self.admission = admission
+        self._urls = flask_app.url_map.bind("localhost")
+        self._views = flask_app.view_functions
+
+    def _limited(self, scope) -> bool:
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        try:
+            endpoint, _ = self._urls.match(path, scope["method"])
+        except HTTPException:
+            return False
+        return getattr(self._views.get(endpoint), "admission_limited", False)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self.admission.enabled or not self._limited(scope):
+            await self.app(scope, receive, send)
+            return
+        retry_after = await self.admission.acquire_async()
+        if retry_after is not None:
+            body = dumps(busy_payload(retry_after)) + b"\n"
+            await send({"type": "http.response.start", "status": 429, "headers": [
+                (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        start = time.monotonic()
+        try:
+            await self.app(dict(scope, **{ADMITTED_SCOPE_KEY: True}), receive, send)
+        finally:
+            self.admission.release(time.monotonic() - start)
+
+
+ADMISSION = AdmissionControl()
@@ -0,0 +1,271 @@
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import click
+from sqlalchemy import func, insert, inspect, literal, select, update
+
+from src.models.claim_job import ClaimJob
+from src.models.user import db
+from src.services.uploads import Content, MappedUpload, as_buffer, close_content
+from src.services.worker_pool import in_worker_process
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_SECONDS = 1.0
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _serving() -> bool:
+    """False where the app is imported but serves nothing: claim pool workers
+    and flask CLI commands other than ``run`` (init-db, shell, ...)"""
+    if in_worker_process():
+        return False
+    if os.environ.get("FLASK_RUN_FROM_CLI") != "true":
+        return True
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.command.name == "run"
+
+
+class ClaimJobQueue:
+    """Background claim processing backed by the ``claim_job`` table.
+
+    The table is the queue: submitting inserts a queued row (atomically
+    refused once ``CLAIM_JOB_QUEUE_SIZE`` jobs are waiting), and worker
+    threads claim the oldest queued row with a conditional update, so several
+    server processes can share one queue. Running jobs hold a lease that a
+    heartbeat renews; jobs whose lease lapses because their process died are
+    put back in the queue, up to ``CLAIM_JOB_MAX_ATTEMPTS`` times.
+
+    ``process(job_id, uploads, config)`` runs one claim and returns its
+    result dict.
+    """
+
+    def __init__(self, process: Callable[[str, List[Tuple[str, Content]], Dict[str, Any]], Dict[str, Any]]):
+        self.process = process
+        self.app = None
+        self.workers = DEFAULT_WORKERS
+        self.queue_size = DEFAULT_QUEUE_SIZE
+        self.lease = timedelta(seconds=DEFAULT_LEASE_SECONDS)
+        self.max_attempts = DEFAULT_MAX_ATTEMPTS
+        self.poll_seconds = DEFAULT_POLL_SECONDS
+        self.storage_dir = None
+        self._threads: List[Thread] = []
+        self._start_lock = Lock()
+        self._running: Set[str] = set()
+        self._running_lock = Lock()
+        self._wakeup = Event()
+        self._stopping = Event()
+
+    def init_app(self, app) -> None:
+        """Configure from app.config and start the worker threads in serving processes"""
+        self.app = app
+        self.workers = app.config.get('CLAIM_JOB_WORKERS', DEFAULT_WORKERS)
+        self.queue_size = app.config.get('CLAIM_JOB_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+        self.lease = timedelta(seconds=app.config.get('CLAIM_JOB_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+        self.max_attempts = app.config.get('CLAIM_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        self.poll_seconds = app.config.get('CLAIM_JOB_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+        self.storage_dir = app.config.get(
+            'CLAIM_JOB_STORAGE', os.path.join(app.root_path, 'database', 'claim_jobs'))
+        app.extensions['claim_jobs'] = self
+
+        # Threads do not survive a fork, so a server that loads the app before
+        # forking its workers gets fresh ones in each of them
+        os.register_at_fork(after_in_child=self._after_fork)
+        if _serving():
+            self.start()
+
+    def start(self) -> None:
+        """Start the worker threads, unless the claim_job table does not exist yet"""
+        if self._threads or self.workers <= 0:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            with self.app.app_context():
+                if not inspect(db.engine).has_table(ClaimJob.__tablename__):
+                    print(f"Claim job workers not started: no {ClaimJob.__tablename__} table, run `flask init-db`")
+                    return
+            os.makedirs(self.storage_dir, exist_ok=True)
+            self._stopping.clear()
+            for index in range(self.workers):
+                thread = Thread(target=self._work, name=f"claim-job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = Thread(target=self._heartbeat, name="claim-job-heartbeat", daemon=True)
+            heartbeat.start()
+            self._threads.append(heartbeat)
+
+    def _after_fork(self) -> None:
+        if not self._threads:
+            return
+        # The parent's threads, and any lock they held, are gone
+        self._threads = []
+        self._running = set()
+        self._start_lock = Lock()
+        self._running_lock = Lock()
+        self.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, uploads: List[Tuple[str, Content]]) -> ClaimJob:
+        """Store the uploads and queue a job for them; raises QueueFull at capacity"""
+        job_id = uuid.uuid4().hex
+        storage_path = os.path.join(self.storage_dir, job_id)
+        os.makedirs(storage_path)
+        for index, (_, content) in enumerate(uploads):
+            with open(os.path.join(storage_path, f"{index:04d}"), "wb") as handle:
+                handle.write(as_buffer(content))
+            close_content(content)
+
+        # The capacity check and the insert are one statement, so concurrent
+        # submitters (in any process) cannot overfill the queue
+        queued = select(func.count()).select_from(ClaimJob).where(
+            ClaimJob.status == ClaimJob.QUEUED).scalar_subquery()
+        row = select(
+            literal(job_id), literal(ClaimJob.QUEUED), literal(json.dumps([name for name, _ in uploads])),
+            literal(storage_path), literal(0), literal(_now()),
+        ).where(queued < self.queue_size)
+        statement = insert(ClaimJob).from_select(
+            ["id", "status", "filenames", "storage_path", "attempts", "created_at"], row)
+        try:
+            inserted = db.session.execute(statement).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            shutil.rmtree(storage_path, ignore_errors=True)
+            raise
+        if not inserted:
+            shutil.rmtree(storage_path, ignore_errors=True)
+            raise QueueFull(f"claim job queue is full ({self.queue_size} jobs waiting)")
+
+        self._wakeup.set()
+        return db.session.get(ClaimJob, job_id)
+
+    def get(self, job_id: str) -> Optional[ClaimJob]:
+        return db.session.get(ClaimJob, job_id)
+
+    def depth(self) -> int:
+        """Number of jobs waiting to be picked up"""
+        return ClaimJob.query.filter_by(status=ClaimJob.QUEUED).count()
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    self._requeue_expired()
+                    job_id = self._claim_next()
+            except Exception as e:
+                print(f"Claim job queue error: {e}")
+                job_id = None
+            if job_id is None:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+                continue
+            self._run(job_id)
+
+    def _claim_next(self) -> Optional[str]:
+        """Mark the oldest queued job as running in this process and return its id"""
+        while True:
+            job_id = db.session.execute(
+                select(ClaimJob.id).where(ClaimJob.status == ClaimJob.QUEUED)
+                .order_by(ClaimJob.created_at).limit(1)
+            ).scalar()
+            if job_id is None:
+                return None
+            now = _now()
+            # Only one worker's update can match while the row is still queued
+            claimed = db.session.execute(
+                update(ClaimJob)
+                .where(ClaimJob.id == job_id, ClaimJob.status == ClaimJob.QUEUED)
+                .values(status=ClaimJob.RUNNING, started_at=now, lease_expires_at=now + self.lease,
+                        attempts=ClaimJob.attempts + 1)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                with self._running_lock:
+                    self._running.add(job_id)
+                return job_id
+
+    def _requeue_expired(self) -> None:
+        """Return jobs whose worker stopped renewing the lease to the queue,
+        failing (and deleting the uploads of) those out of attempts"""
+        now = _now()
+        expired = (ClaimJob.status == ClaimJob.RUNNING) & (ClaimJob.lease_expires_at < now)
+        db.session.execute(
+            update(ClaimJob).where(expired, ClaimJob.attempts < self.max_attempts)
+            .values(status=ClaimJob.QUEUED, lease_expires_at=None))
+        # Only the process whose update fails a job gets its storage path back
+        failed = db.session.execute(
+            update(ClaimJob).where(expired, ClaimJob.attempts >= self.max_attempts)
+            .values(status=ClaimJob.FAILED, finished_at=now, lease_expires_at=None,
+                    error="Job was interrupted too many times")
+            .returning(ClaimJob.storage_path)).scalars().all()
+        db.session.commit()
+        for storage_path in failed:
+            shutil.rmtree(storage_path, ignore_errors=True)
+
+    def _heartbeat(self) -> None:
+        interval = self.lease.total_seconds() / 3
+        while not self._stopping.wait(interval):
+            with self._running_lock:
+                running = list(self._running)
+            if not running:
+                continue
+            try:
+                with self.app.app_context():
+                    db.session.execute(
+                        update(ClaimJob)
+                        .where(ClaimJob.id.in_(running), ClaimJob.status == ClaimJob.RUNNING)
+                        .values(lease_expires_at=_now() + self.lease))
+                    db.session.commit()
+            except Exception as e:
+                print(f"Claim job heartbeat error: {e}")
+
+    def _run(self, job_id: str) -> None:
+        try:
+            with self.app.app_context():
+                job = db.session.get(ClaimJob, job_id)
+                uploads = [
+                    (name, self._read_upload(job.storage_path, index))
+                    for index, name in enumerate(json.loads(job.filenames))
+                ]
+                try:
+                    result = self.process(job_id, uploads, self.app.config)
+                    job.status = ClaimJob.SUCCEEDED
+                    job.result = json.dumps(result)
+                except Exception as e:
+                    job.status = ClaimJob.FAILED
+                    job.error = f"Processing failed: {str(e)}"
+                job.finished_at = _now()
+                job.lease_expires_at = None
+                db.session.commit()
+                shutil.rmtree(job.storage_path, ignore_errors=True)
+        except Exception as e:
+            # The lease lapses and the job is retried by a later worker
+            print(f"Claim job {job_id} error: {e}")
+        finally:
+            with self._running_lock:
+                self._running.discard(job_id)
+
+    @staticmethod
+    def _read_upload(storage_path: str, index: int) -> MappedUpload:
+        return MappedUpload(os.path.join(storage_path, f"{index:04d}"))
@@ -0,0 +1,145 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select, update
+
+from src.models.claim_session import ClaimSession, SessionDocument
+from src.models.user import db
+from src.services.duplicates import Signature, pack_signature, unpack_signature
+
+# (filename, document, text signature, error) for one processed upload; the
+# document is None when the upload failed (error says why) or had no text
+SessionUpload = Tuple[str, Optional[Dict[str, Any]], Optional[Signature], Optional[str]]
+
+Evaluate = Callable[[List[Dict[str, Any]], List[Optional[Signature]], str], Dict[str, Any]]
+Publish = Callable[[Dict[str, Any], List[Dict[str, Any]], List[Optional[Signature]], str], None]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ClaimSessions:
+    """Claims assembled one upload at a time, kept in the ``claim_session`` and
+    ``session_document`` tables.
+
+    Uploads are processed once, when they are added, and their documents and
+    text signatures stored. Adding or removing an upload only re-runs
+    ``evaluate(documents, signatures, session_id)``, which validates the
+    stored documents and returns the claim result, and hands a saved result to
+    ``publish`` with the same arguments. Every change bumps the session's
+    revision and a result is only saved over one for an older revision, so
+    concurrent changes, from any process, settle on the result of the latest.
+    Database errors are raised after rolling back.
+    """
+
+    def __init__(self, evaluate: Evaluate, publish: Publish):
+        self.evaluate = evaluate
+        self.publish = publish
+
+    def init_app(self, app) -> None:
+        app.extensions['claim_sessions'] = self
+
+    def create(self) -> ClaimSession:
+        session_id = uuid.uuid4().hex
+        now = _now()
+        result = self.evaluate([], [], session_id)
+        try:
+            db.session.execute(insert(ClaimSession).values(
+                id=session_id, created_at=now, updated_at=now, revision=0, evaluated_revision=0,
+                result=json.dumps(result)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return self.get(session_id)
+
+    def get(self, session_id: str) -> Optional[ClaimSession]:
+        return db.session.get(ClaimSession, session_id, populate_existing=True)
+
+    def add(self, session_id: str, uploads: Sequence[SessionUpload]) -> Optional[ClaimSession]:
+        """Store processed uploads in a session and re-evaluate it; None if there is no such session"""
+        now = _now()
+        rows = [{
+            "session_id": session_id,
+            "filename": filename,
+            "document": json.dumps(document) if document is not None else None,
+            "signature": pack_signature(signature) if signature is not None else None,
+            "error": error,
+            "created_at": now,
+        } for filename, document, signature, error in uploads]
+
+        def apply() -> bool:
+            if rows:
+                db.session.execute(insert(SessionDocument), rows)
+            return True
+        return self._change(session_id, apply)
+
+    def remove(self, session_id: str, document_id: int) -> Optional[ClaimSession]:
+        """Remove an upload from a session and re-evaluate it; None if there is no such session or upload"""
+        def apply() -> bool:
+            return bool(db.session.execute(delete(SessionDocument).where(
+                SessionDocument.session_id == session_id, SessionDocument.id == document_id)).rowcount)
+        return self._change(session_id, apply)
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session and its uploads; False if there is no such session"""
+        try:
+            db.session.execute(delete(SessionDocument).where(SessionDocument.session_id == session_id))
+            deleted = db.session.execute(delete(ClaimSession).where(ClaimSession.id == session_id)).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return bool(deleted)
+
+    def _change(self, session_id: str, apply: Callable[[], bool]) -> Optional[ClaimSession]:
+        # The revision bump and the change commit together, so every change
+        # is followed by an evaluation that reads at least that revision
+        try:
+            bumped = db.session.execute(update(ClaimSession).where(ClaimSession.id == session_id).values(
+                revision=ClaimSession.revision + 1, updated_at=_now())).rowcount
+            if not bumped or not apply():
+                db.session.rollback()
+                return None
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self._refresh(session_id)
+        return self.get(session_id)
+
+    def _refresh(self, session_id: str) -> None:
+        # Read the revision before the documents: they are then at least as
+        # new as the revision the result is saved for
+        revision = db.session.execute(select(ClaimSession.revision).where(ClaimSession.id == session_id)).scalar()
+        if revision is None:
+            return
+        rows = db.session.execute(
+            select(SessionDocument.filename, SessionDocument.document, SessionDocument.signature,
+                   SessionDocument.error)
+            .where(SessionDocument.session_id == session_id).order_by(SessionDocument.id)
+        ).all()
+        documents, signatures, failed_documents = [], [], []
+        for filename, document, signature, error in rows:
+            if document is not None:
+                documents.append(json.loads(document))
+                signatures.append(unpack_signature(signature) if signature is not None else None)
+            else:
+                failed_documents.append({"filename": filename, "reason": error})
+
+        result = self.evaluate(documents, signatures, session_id)
+        if failed_documents:
+            result["failed_documents"] = failed_documents
+        try:
+            saved = db.session.execute(update(ClaimSession).where(
+                ClaimSession.id == session_id, ClaimSession.evaluated_revision < revision
+            ).values(result=json.dumps(result), evaluated_revision=revision)).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if saved:
+            self.publish(result, documents, signatures, session_id)
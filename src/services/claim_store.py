@@ -0,0 +1,228 @@
+import base64
+import json
+from datetime import date, datetime, timezone
+from operator import ge, le
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+
+from src.models.claim_record import ClaimDocument, ClaimRecord
+from src.models.user import db
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# (result, source, reference) for one claim to store
+ClaimEntry = Tuple[Dict[str, Any], str, Optional[str]]
+
+# Columns returned by listings; documents and validation are only loaded for
+# a single claim
+SUMMARY_COLUMNS = (
+    ClaimRecord.id, ClaimRecord.source, ClaimRecord.reference, ClaimRecord.status, ClaimRecord.patient_name,
+    ClaimRecord.id_number, ClaimRecord.service_date, ClaimRecord.total_amount, ClaimRecord.document_count,
+    ClaimRecord.created_at,
+)
+
+
+class InvalidQuery(ValueError):
+    """Raised for a malformed filter or cursor; answered with 400"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def claim_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The searchable fields of a claim result.
+
+    The patient name comes from the discharge summary, else the ID card; the
+    ID number from the ID card; the service date and amount from the bill.
+    """
+    first: Dict[str, Dict[str, Any]] = {}
+    for document in result.get("documents", []):
+        first.setdefault(document.get("type"), document)
+    bill = first.get("bill", {})
+    id_card = first.get("id_card", {})
+    amount = bill.get("total_amount")
+    return {
+        "patient_name": first.get("discharge_summary", {}).get("patient_name") or id_card.get("patient_name"),
+        "id_number": id_card.get("id_number"),
+        "service_date": _parse_date(bill.get("date_of_service")),
+        "total_amount": float(amount) if isinstance(amount, (int, float)) else None,
+    }
+
+
+def encode_cursor(claim_id: int) -> str:
+    return base64.urlsafe_b64encode(str(claim_id).encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise InvalidQuery("Invalid cursor")
+
+
+class ClaimStore:
+    """Processed claims in the ``claim_record`` and ``claim_document`` tables.
+
+    Claims are written in bulk: one multi-row insert for the claims and one
+    for all their documents, so callers storing many claims (the batch
+    endpoint and CLI) should pass them together, ``batch_size`` at a time.
+    Listings are newest first and paged with a cursor on the claim id rather
+    than an offset, and select only the summary columns, so a page costs the
+    same at any depth of a large table.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.batch_size = DEFAULT_BATCH_SIZE
+
+    def init_app(self, app) -> None:
+        self.enabled = app.config.get('CLAIM_STORE_ENABLED', True) and 'sqlalchemy' in app.extensions
+        self.batch_size = max(1, app.config.get('CLAIM_STORE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+        app.extensions['claim_store'] = self
+
+    def save(self, result: Dict[str, Any], source: str, reference: Optional[str] = None) -> Optional[int]:
+        ids = self.save_many([(result, source, reference)])
+        return ids[0] if ids else None
+
+    def save_many(self, entries: Sequence[ClaimEntry], replace: bool = False) -> List[int]:
+        """Store claim results in one transaction and return their ids.
+
+        With ``replace``, claims stored earlier under the same source and
+        reference are deleted first, so re-running a batch does not duplicate
+        its claims. Raises SQLAlchemyError after rolling back.
+        """
+        if not self.enabled or not entries:
+            return []
+        now = _now()
+        rows = []
+        for result, source, reference in entries:
+            decision = result.get("claim_decision", {})
+            failed = result.get("failed_documents")
+            rows.append({
+                "source": source,
+                "reference": reference,
+                "status": decision.get("status", "unknown"),
+                "reason": decision.get("reason"),
+                "document_count": len(result.get("documents", [])),
+                "validation": json.dumps(result.get("validation", {})),
+                "failed_documents": json.dumps(failed) if failed else None,
+                "created_at": now,
+                **claim_summary(result),
+            })
+
+        try:
+            if replace:
+                self._delete_references(entries)
+            ids = db.session.execute(
+                insert(ClaimRecord).returning(ClaimRecord.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            documents = [
+                {"claim_id": claim_id, "position": position, "type": document.get("type", "unknown"),
+                 "data": json.dumps(document)}
+                for claim_id, (result, _, _) in zip(ids, entries)
+                for position, document in enumerate(result.get("documents", []))
+            ]
+            if documents:
+                db.session.execute(insert(ClaimDocument), documents)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return list(ids)
+
+    @staticmethod
+    def _delete_references(entries: Sequence[ClaimEntry]) -> None:
+        by_source: Dict[str, List[str]] = {}
+        for _, source, reference in entries:
+            if reference is not None:
+                by_source.setdefault(source, []).append(reference)
+        for source, references in by_source.items():
+            stale = select(ClaimRecord.id).where(ClaimRecord.source == source, ClaimRecord.reference.in_(references))
+            db.session.execute(delete(ClaimDocument).where(ClaimDocument.claim_id.in_(stale)))
+            db.session.execute(delete(ClaimRecord).where(ClaimRecord.id.in_(stale)))
+
+    def delete(self, source: str, reference: str) -> None:
+        """Delete the claims stored under a source and reference; raises SQLAlchemyError after rolling back"""
+        if not self.enabled:
+            return
+        try:
+            self._delete_references([({}, source, reference)])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def get(self, claim_id: int) -> Optional[ClaimRecord]:
+        return db.session.get(ClaimRecord, claim_id)
+
+    def search(self, filters: Dict[str, str], limit: int = DEFAULT_PAGE_SIZE,
+               cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of claim summaries matching the filters and the cursor of the next page.
+
+        Filters: status, patient_name (case-insensitive), id_number, source,
+        reference, service_date_from/_to (YYYY-MM-DD) and created_from/_to
+        (ISO timestamps, UTC). Raises InvalidQuery for malformed values.
+        """
+        limit = min(max(1, limit), MAX_PAGE_SIZE)
+        statement = select(*SUMMARY_COLUMNS).order_by(ClaimRecord.id.desc()).limit(limit + 1)
+        if cursor:
+            statement = statement.where(ClaimRecord.id < decode_cursor(cursor))
+
+        for name, column in (("status", ClaimRecord.status), ("patient_name", ClaimRecord.patient_name),
+                             ("id_number", ClaimRecord.id_number), ("source", ClaimRecord.source),
+                             ("reference", ClaimRecord.reference)):
+            if filters.get(name):
+                statement = statement.where(column == filters[name])
+        for name, column, parse in (("service_date", ClaimRecord.service_date, _parse_date),
+                                    ("created", ClaimRecord.created_at, _parse_timestamp)):
+            for suffix, compare in (("_from", ge), ("_to", le)):
+                value = filters.get(name + suffix)
+                if not value:
+                    continue
+                parsed = parse(value)
+                if parsed is None:
+                    raise InvalidQuery(f"Invalid {name + suffix}: {value}")
+                statement = statement.where(compare(column, parsed))
+
+        rows = db.session.execute(statement).mappings().all()
+        next_cursor = encode_cursor(rows[limit - 1]["id"]) if len(rows) > limit else None
+        return [_summary_dict(row) for row in rows[:limit]], next_cursor
+
+
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _summary_dict(row) -> Dict[str, Any]:
+    return {
+        "claim_id": row["id"],
+        "source": row["source"],
+        "reference": row["reference"],
+        "status": row["status"],
+        "patient_name": row["patient_name"],
+        "id_number": row["id_number"],
+        "service_date": row["service_date"].isoformat() if row["service_date"] else None,
+        "total_amount": row["total_amount"],
+        "document_count": row["document_count"],
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+    }
+
+
+CLAIM_STORE = ClaimStore()
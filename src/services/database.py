@@ -0,0 +1,55 @@
+from typing import Any, Dict
+
+from sqlalchemy import event
+
+from src.models.user import db
+
+DEFAULT_JOURNAL_MODE = "wal"
+DEFAULT_BUSY_TIMEOUT = 30.0
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 20
+
+
+def engine_options(config) -> Dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS for the app database, to set before ``db.init_app``.
+
+    A SQLite connection waits up to ``SQLITE_BUSY_TIMEOUT`` seconds for
+    another connection's write lock instead of failing with "database is
+    locked". Connections are pooled per process, ``SQLITE_POOL_SIZE`` kept
+    open, so request threads, claim job workers and batch threads do not
+    reopen the file.
+    """
+    uri = config.get('SQLALCHEMY_DATABASE_URI', '')
+    if not uri.startswith('sqlite'):
+        return {}
+    options: Dict[str, Any] = {"connect_args": {"timeout": config.get('SQLITE_BUSY_TIMEOUT', DEFAULT_BUSY_TIMEOUT)}}
+    # In-memory databases keep their own single-connection pool
+    if uri not in ('sqlite://', 'sqlite:///:memory:') and 'mode=memory' not in uri:
+        options["pool_size"] = config.get('SQLITE_POOL_SIZE', DEFAULT_POOL_SIZE)
+        options["max_overflow"] = config.get('SQLITE_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW)
+    return options
+
+
+def init_sqlite(app) -> None:
+    """Set the journal mode of every new SQLite connection, after ``db.init_app``.
+
+    In WAL mode readers never block the writer or each other, so listings and
+    claim lookups keep running during bulk imports and batch stores; commits
+    only sync the log (synchronous=NORMAL), which stays durable across
+    process crashes.
+    """
+    journal_mode = app.config.get('SQLITE_JOURNAL_MODE', DEFAULT_JOURNAL_MODE)
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != "sqlite" or not journal_mode:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _configure(connection, _):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+            if journal_mode.lower() == "wal":
+                cursor.execute("PRAGMA synchronous=NORMAL")
+        finally:
+            cursor.close()
@@ -0,0 +1,330 @@
+import operator
+import sys
+from array import array
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import compress
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Column type codes of DocumentBatch.types
+BILL, DISCHARGE_SUMMARY, ID_CARD, OTHER = 0, 1, 2, 3
+TYPE_NAMES = ("bill", "discharge_summary", "id_card")
+_TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+# Fields of each type, in the agents' order, and the columns holding them
+FIELDS = {
+    BILL: ("hospital_name", "total_amount", "date_of_service"),
+    DISCHARGE_SUMMARY: ("patient_name", "diagnosis", "admission_date", "discharge_date"),
+    ID_CARD: ("patient_name", "id_number", "insurance_provider"),
+}
+STRING_COLUMNS = ("hospital_name", "patient_name", "diagnosis", "id_number", "insurance_provider")
+DATE_COLUMNS = ("date_of_service", "admission_date", "discharge_date")
+# Per type: the string columns, whether the amount column, and the date
+# columns it has no field for
+_PADDING = {
+    doc_type: (tuple(column for column in STRING_COLUMNS if column not in FIELDS.get(doc_type, ())),
+               "total_amount" not in FIELDS.get(doc_type, ()),
+               tuple(column for column in DATE_COLUMNS if column not in FIELDS.get(doc_type, ())))
+    for doc_type in (BILL, DISCHARGE_SUMMARY, ID_CARD, OTHER)
+}
+
+# Marks a cell whose value is not representable in its column; the value
+# itself is kept in DocumentBatch.raw
+_MISSING = -1
+
+
+def _interned(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+@lru_cache(maxsize=4096)
+def _day_ordinal(value: str) -> Tuple[int, bool]:
+    """Day ordinal of a YYYY-MM-DD value, 0 where the claim validator's
+    parse_date gives None, and whether the ordinal gives the value back"""
+    try:
+        ordinal = datetime.strptime(value, "%Y-%m-%d").toordinal()
+    except ValueError:
+        return 0, False
+    return ordinal, date.fromordinal(ordinal).isoformat() == value
+
+
+class BillRecord:
+    """A bill as the bill agent extracts it, without a per-document dict"""
+
+    __slots__ = ("hospital_name", "total_amount", "date_of_service")
+    TYPE = "bill"
+
+    def __init__(self, hospital_name: Any, total_amount: Any, date_of_service: Any):
+        self.hospital_name = _interned(hospital_name)
+        self.total_amount = total_amount
+        self.date_of_service = date_of_service
+
+
+class DischargeSummaryRecord:
+    """A discharge summary as the discharge agent extracts it"""
+
+    __slots__ = ("patient_name", "diagnosis", "admission_date", "discharge_date")
+    TYPE = "discharge_summary"
+
+    def __init__(self, patient_name: Any, diagnosis: Any, admission_date: Any, discharge_date: Any):
+        self.patient_name = patient_name
+        self.diagnosis = _interned(diagnosis)
+        self.admission_date = admission_date
+        self.discharge_date = discharge_date
+
+
+class IdCardRecord:
+    """An ID card as the ID card agent extracts it"""
+
+    __slots__ = ("patient_name", "id_number", "insurance_provider")
+    TYPE = "id_card"
+
+    def __init__(self, patient_name: Any, id_number: Any, insurance_provider: Any):
+        self.patient_name = patient_name
+        self.id_number = id_number
+        self.insurance_provider = _interned(insurance_provider)
+
+
+RECORD_TYPES = {record.TYPE: record for record in (BillRecord, DischargeSummaryRecord, IdCardRecord)}
+
+
+def _record_type(document: Dict[str, Any]) -> Optional[type]:
+    """The record class of a document with exactly its type's fields, in the agents' order"""
+    record = RECORD_TYPES.get(document.get("type"))
+    if record is None or tuple(document) != ("type",) + record.__slots__:
+        return None
+    return record
+
+
+def compact(document: Dict[str, Any]) -> Any:
+    """The document as a slotted record, or the dict itself when it is not
+    exactly in its type's schema, so converting back is always lossless"""
+    record = _record_type(document)
+    if record is None:
+        return document
+    return record(*(document[field] for field in record.__slots__))
+
+
+def expand(record: Any) -> Dict[str, Any]:
+    """The current JSON schema's dict for a record made by ``compact``"""
+    if isinstance(record, dict):
+        return record
+    return {"type": record.TYPE, **{field: getattr(record, field) for field in record.__slots__}}
+
+
+class _Categories:
+    """Interned strings of a categorical column and their codes"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+
+class DocumentBatch:
+    """Extracted documents of many claims held column by column.
+
+    Each document is one row: its type and claim as small integers, string
+    fields as codes into per-column category lists (hospitals, diagnoses and
+    providers repeat across claims; names and IDs repeat within one), amounts
+    as int64 and dates as day ordinals, all in ``array`` buffers. The columns
+    take 45 bytes a row; with the names and IDs, which are distinct per claim,
+    a document takes about 170 bytes against about 410 for an agent's dict
+    and its strings (benchmarks/bench_documents.py).
+
+    Conversion back to the JSON schema is lossless: a value its column cannot
+    hold exactly (a float amount, a date that is not YYYY-MM-DD, a missing
+    field) is kept as is in ``raw``, and a document that does not have
+    exactly its type's fields is also kept whole in ``extras``.
+
+    Checks run a column at a time with map and operator, looping in C rather
+    than over dicts: ``date_discrepancies`` gives the date discrepancies
+    AdvancedClaimValidator reports in single mode, ``invalid_bill_amounts``
+    the claims AdvancedClaimDecisionEngine rejects for their bill amount.
+    """
+
+    def __init__(self):
+        self.types = array("b")
+        self.claims = array("i")
+        self.strings = {column: array("i") for column in STRING_COLUMNS}
+        self.categories = {column: _Categories() for column in STRING_COLUMNS}
+        self.amounts = array("q")
+        self.dates = {column: array("i") for column in DATE_COLUMNS}
+        # (row, field) -> value for cells their column cannot hold exactly
+        self.raw: Dict[Tuple[int, str], Any] = {}
+        # row -> the whole document, for documents not in their type's schema
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        # First bill and first discharge summary row of every claim, or -1
+        self.first_bill = array("i")
+        self.first_discharge = array("i")
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    @property
+    def claim_count(self) -> int:
+        return len(self.first_bill)
+
+    @classmethod
+    def from_claims(cls, claims: Iterable[List[Dict[str, Any]]]) -> "DocumentBatch":
+        batch = cls()
+        for documents in claims:
+            batch.add_claim(documents)
+        return batch
+
+    def add_claim(self, documents: Iterable[Dict[str, Any]]) -> int:
+        """Append one claim's documents; returns the claim's index"""
+        claim = len(self.first_bill)
+        self.first_bill.append(_MISSING)
+        self.first_discharge.append(_MISSING)
+        for document in documents:
+            self._append(document, claim)
+        return claim
+
+    def _append(self, document: Dict[str, Any], claim: int) -> None:
+        row = len(self.types)
+        doc_type = _TYPE_CODES.get(document.get("type"), OTHER)
+        fields = FIELDS.get(doc_type, ())
+        strings, amounts, dates = _PADDING[doc_type]
+        if _record_type(document) is None:
+            self.extras[row] = document
+        self.types.append(doc_type)
+        self.claims.append(claim)
+        if doc_type == BILL and self.first_bill[claim] == _MISSING:
+            self.first_bill[claim] = row
+        elif doc_type == DISCHARGE_SUMMARY and self.first_discharge[claim] == _MISSING:
+            self.first_discharge[claim] = row
+
+        # Columns the type has no field for
+        for column in strings:
+            self.strings[column].append(_MISSING)
+        if amounts:
+            self.amounts.append(0)
+        for column in dates:
+            self.dates[column].append(0)
+
+        for field in fields:
+            value = document.get(field)
+            if field in self.strings:
+                if type(value) is str:
+                    self.strings[field].append(self.categories[field].code(value))
+                    continue
+                self.strings[field].append(_MISSING)
+            elif field in self.dates:
+                ordinal, exact = _day_ordinal(value) if type(value) is str else (0, False)
+                self.dates[field].append(ordinal)
+                if exact:
+                    continue
+            elif type(value) is int and -2 ** 63 <= value < 2 ** 63:
+                self.amounts.append(value)
+                continue
+            else:
+                self.amounts.append(0)
+            self.raw[row, field] = value
+
+    def document(self, row: int) -> Dict[str, Any]:
+        """The row as the agent's dict, field order included"""
+        extra = self.extras.get(row)
+        if extra is not None:
+            return extra
+        doc_type = self.types[row]
+        document: Dict[str, Any] = {"type": TYPE_NAMES[doc_type]}
+        for field in FIELDS[doc_type]:
+            if (row, field) in self.raw:
+                document[field] = self.raw[row, field]
+            elif field in self.strings:
+                document[field] = self.categories[field].values[self.strings[field][row]]
+            elif field in self.dates:
+                document[field] = date.fromordinal(self.dates[field][row]).isoformat()
+            else:
+                document[field] = self.amounts[row]
+        return document
+
+    def record(self, row: int) -> Any:
+        """The row as a slotted record (or the kept dict for documents outside the schema)"""
+        return compact(self.document(row))
+
+    def documents(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self.types)):
+            yield self.document(row)
+
+    def claim_documents(self) -> Iterator[List[Dict[str, Any]]]:
+        """The documents of every claim in claim order, empty claims included"""
+        documents: List[List[Dict[str, Any]]] = [[] for _ in range(self.claim_count)]
+        for row, claim in enumerate(self.claims):
+            documents[claim].append(self.document(row))
+        return iter(documents)
+
+    def nbytes(self) -> int:
+        """Bytes held by the column buffers, category strings and raw values"""
+        buffers = [self.types, self.claims, self.amounts, self.first_bill, self.first_discharge,
+                   *self.strings.values(), *self.dates.values()]
+        size = sum(column.buffer_info()[1] * column.itemsize for column in buffers)
+        size += sum(sys.getsizeof(value) for categories in self.categories.values() for value in categories.values)
+        return size
+
+    def _amount_column(self, rows: List[int]) -> List[Any]:
+        """Amounts of the rows, raw values where the column holds none"""
+        amounts = [self.amounts[row] for row in rows]
+        if self.raw:
+            for position, row in enumerate(rows):
+                if (row, "total_amount") in self.raw:
+                    amounts[position] = self.raw[row, "total_amount"]
+        return amounts
+
+    def amount_out_of_range(self, low: float, high: float, rows: Optional[List[int]] = None) -> List[int]:
+        """Bill rows (of ``rows``, or all bills) whose amount is not a number within [low, high]"""
+        if rows is None:
+            rows = list(compress(range(len(self.types)), map(BILL.__eq__, self.types)))
+        amounts = self._amount_column(rows)
+        return [row for row, amount in zip(rows, amounts)
+                if not isinstance(amount, (int, float)) or not low <= amount <= high]
+
+    def discharge_before_admission(self) -> List[int]:
+        """Discharge summary rows with both dates whose discharge precedes admission"""
+        admission, discharge = self.dates["admission_date"], self.dates["discharge_date"]
+        valid = map(operator.and_, map(bool, admission), map(bool, discharge))
+        return list(compress(range(len(self.types)),
+                             map(operator.and_, valid, map(operator.lt, discharge, admission))))
+
+    def date_discrepancies(self) -> Dict[int, List[str]]:
+        """Claims with date discrepancies, as the single-mode validator words them.
+
+        For every claim, its first bill is checked against its first
+        discharge summary when all three dates are valid.
+        """
+        claims = list(compress(range(self.claim_count),
+                               map(operator.and_, map((_MISSING).__ne__, self.first_bill),
+                                   map((_MISSING).__ne__, self.first_discharge))))
+        if not claims:
+            return {}
+        bills = [self.first_bill[claim] for claim in claims]
+        stays = [self.first_discharge[claim] for claim in claims]
+        service = [self.dates["date_of_service"][row] for row in bills]
+        admission = [self.dates["admission_date"][row] for row in stays]
+        discharge = [self.dates["discharge_date"][row] for row in stays]
+        # 0 is no valid date; the validator skips such claims
+        valid = list(map(all, zip(service, admission, discharge)))
+        reversed_stay = map(operator.and_, valid, map(operator.lt, discharge, admission))
+        outside = map(operator.and_, valid, map(operator.or_, map(operator.lt, service, admission),
+                                                  map(operator.gt, service, discharge)))
+        found: Dict[int, List[str]] = {}
+        for claim, is_reversed, is_outside in zip(claims, reversed_stay, outside):
+            if is_reversed:
+                found[claim] = ["Discharge date is before admission date"]
+            if is_outside:
+                found.setdefault(claim, []).append("Service date is outside admission period")
+        return found
+
+    def invalid_bill_amounts(self) -> List[int]:
+        """Claims whose first bill has an amount the decision engine rejects (not above 0)"""
+        claims = [claim for claim, row in enumerate(self.first_bill) if row != _MISSING]
+        amounts = self._amount_column([self.first_bill[claim] for claim in claims])
+        return [claim for claim, amount in zip(claims, amounts)
+                if not isinstance(amount, (int, float)) or not amount > 0]
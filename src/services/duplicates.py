@@ -0,0 +1,265 @@
+import hashlib
+import re
+import struct
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.models.duplicate_index import ClaimFingerprint, DocumentSignature, SignatureBand
+from src.models.user import db
+
+# MinHash signatures have NUM_HASHES values, split into BANDS bands of
+# ROWS values for LSH. Two documents share a band with probability s**ROWS
+# for Jaccard similarity s, so 8 bands of 8 rows find nearly every pair above
+# ~0.85 and almost none below ~0.6
+NUM_HASHES = 64
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+SHINGLE_WORDS = 3
+# Only the start of a document is signed, bounding the cost for long PDFs
+MAX_SIGNATURE_WORDS = 5000
+DEFAULT_SIMILARITY = 0.9
+DEFAULT_MAX_CANDIDATES = 50
+# Document types signed for near-duplicate detection. ID cards are left out:
+# a member sends the same card with every claim
+SIGNED_TYPES = ("bill", "discharge_summary")
+
+Signature = Tuple[int, ...]
+
+_WORD = re.compile(r"[a-z0-9]+")
+_EMPTY = 1 << 32
+_PACK = struct.Struct(f"<{NUM_HASHES}I")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def text_signature(text: str) -> Optional[Signature]:
+    """MinHash signature of the word 3-shingles of a text, or None if it has no words.
+
+    Uses one-permutation hashing: every shingle is hashed once and the hash
+    picks both the signature slot and the value competing for its minimum.
+    Empty slots borrow the value of the next filled slot, mixed with the
+    distance, so short documents still give full signatures.
+    """
+    words = _WORD.findall(text.lower())[:MAX_SIGNATURE_WORDS]
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    slots = [_EMPTY] * NUM_HASHES
+    for shingle in shingles:
+        value = _hash64(shingle.encode("utf-8"))
+        slot = value % NUM_HASHES
+        value = (value // NUM_HASHES) & 0xFFFFFFFF
+        if value < slots[slot]:
+            slots[slot] = value
+    signature = []
+    for slot in range(NUM_HASHES):
+        distance = 0
+        while slots[(slot + distance) % NUM_HASHES] == _EMPTY:
+            distance += 1
+        signature.append((slots[(slot + distance) % NUM_HASHES] + distance * 0x9E3779B1) & 0xFFFFFFFF)
+    return tuple(signature)
+
+
+def similarity(first: Signature, second: Signature) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return sum(a == b for a, b in zip(first, second)) / NUM_HASHES
+
+
+def pack_signature(signature: Signature) -> bytes:
+    """Signature as the little-endian uint32s stored in the database"""
+    return _PACK.pack(*signature)
+
+
+def unpack_signature(packed: bytes) -> Signature:
+    return _PACK.unpack(packed)
+
+
+def band_keys(signature: Signature) -> List[int]:
+    """One LSH bucket key per band, as signed 64-bit integers SQLite can index"""
+    return [
+        _hash64(struct.pack(f"<B{ROWS}I", band, *signature[band * ROWS:(band + 1) * ROWS])) & 0x7FFFFFFFFFFFFFFF
+        for band in range(BANDS)
+    ]
+
+
+def _normalize(value: Any) -> str:
+    if isinstance(value, (int, float)):
+        return f"{float(value):.2f}"
+    return " ".join(_WORD.findall(str(value or "").lower()))
+
+
+def claim_fingerprint(documents: Sequence[Dict[str, Any]],
+                      placeholders: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[str]:
+    """SHA-256 of the normalized patient name, hospital, service date and amount
+    of a claim, and its ID number when an ID card gives one.
+
+    A field counts as missing when it is empty or holds the value
+    ``placeholders`` gives for its document type and field (what an agent
+    returns when it finds nothing). None without a bill or when any field but
+    the ID number is missing: unrelated claims missing the same fields would
+    otherwise share a fingerprint.
+    """
+    placeholders = placeholders or {}
+    first: Dict[str, Dict[str, Any]] = {}
+    for document in documents:
+        first.setdefault(document.get("type"), document)
+    if "bill" not in first:
+        return None
+    name_type = "discharge_summary" if first.get("discharge_summary", {}).get("patient_name") else "id_card"
+    keys = ((name_type, "patient_name"), ("bill", "hospital_name"), ("bill", "date_of_service"),
+            ("bill", "total_amount"), ("id_card", "id_number"))
+    fields = []
+    for doc_type, name in keys:
+        value = first.get(doc_type, {}).get(name)
+        if value is None or value == "" or value == placeholders.get(doc_type, {}).get(name):
+            if name != "id_number":
+                return None
+            value = ""
+        fields.append(value)
+    return hashlib.sha256("\x1f".join(_normalize(field) for field in fields).encode("utf-8")).hexdigest()
+
+
+class DuplicateIndex:
+    """Finds earlier claims a new claim duplicates, by fields or by document text.
+
+    Two indexes live in the app database and are shared by every server
+    process: claim fingerprints (exact match on the normalized identifying
+    fields) and MinHash signatures of document text bucketed by LSH band
+    (near-duplicate PDFs, such as a re-scanned or re-exported document). A
+    lookup is one indexed query for the fingerprint and one per document for
+    its buckets, so its cost does not grow with the number of claims indexed,
+    and new claims are visible to the next lookup in any process. Claims are
+    identified by a reference; adding a reference again replaces its entries,
+    and a claim never matches its own reference. Index errors are logged and
+    never fail the claim.
+
+    Only documents of SIGNED_TYPES are compared by text, each with earlier
+    documents of its type, and only when ``near_duplicates`` is set: bills
+    printed from one hospital's template share most of their text, so
+    different patients' bills can pass the similarity threshold. Signatures
+    are indexed either way. ``placeholders`` holds the agents' default field
+    values by document type, which claims are not fingerprinted on.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.near_duplicates = False
+        self.similarity = DEFAULT_SIMILARITY
+        self.max_candidates = DEFAULT_MAX_CANDIDATES
+        self.placeholders: Dict[str, Dict[str, Any]] = {}
+
+    def init_app(self, app) -> None:
+        self.enabled = app.config.get('DUPLICATE_DETECTION', True) and 'sqlalchemy' in app.extensions
+        self.near_duplicates = app.config.get('DUPLICATE_NEAR_MATCHES', False)
+        self.similarity = app.config.get('DUPLICATE_SIMILARITY', DEFAULT_SIMILARITY)
+        self.max_candidates = app.config.get('DUPLICATE_MAX_CANDIDATES', DEFAULT_MAX_CANDIDATES)
+        app.extensions['duplicate_index'] = self
+
+    def find(self, documents: Sequence[Dict[str, Any]], signatures: Sequence[Optional[Signature]],
+             reference: Optional[str]) -> List[str]:
+        """Return a discrepancy message for every earlier claim this one duplicates"""
+        if not self.enabled:
+            return []
+        messages = []
+        matched = set()
+        try:
+            fingerprint = claim_fingerprint(documents, self.placeholders)
+            if fingerprint is not None:
+                statement = select(ClaimFingerprint.reference).where(ClaimFingerprint.fingerprint == fingerprint)
+                if reference is not None:
+                    statement = statement.where(ClaimFingerprint.reference != reference)
+                earlier = db.session.execute(statement.order_by(ClaimFingerprint.id).limit(1)).scalar()
+                if earlier is not None:
+                    matched.add(earlier)
+                    messages.append(f"Duplicate of claim {earlier}: same patient, hospital, "
+                                    f"service date and amount")
+
+            signed = self._signed(documents, signatures) if self.near_duplicates else []
+            for document, signature in signed:
+                statement = (
+                    select(DocumentSignature.id, DocumentSignature.reference, DocumentSignature.signature)
+                    .join(SignatureBand, SignatureBand.signature_id == DocumentSignature.id)
+                    .where(SignatureBand.band_key.in_(band_keys(signature)),
+                           DocumentSignature.doc_type == document.get("type"))
+                    .distinct().limit(self.max_candidates)
+                )
+                if reference is not None:
+                    statement = statement.where(DocumentSignature.reference != reference)
+                best, earlier = 0.0, None
+                for _, candidate, packed in db.session.execute(statement):
+                    score = similarity(signature, unpack_signature(packed))
+                    if score > best:
+                        best, earlier = score, candidate
+                if earlier is not None and best >= self.similarity and earlier not in matched:
+                    matched.add(earlier)
+                    messages.append(f"Document {document.get('type', 'unknown')} is a near-duplicate "
+                                    f"({best:.0%} similar) of a document in claim {earlier}")
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Duplicate index read error: {e}")
+        return messages
+
+    def add(self, documents: Sequence[Dict[str, Any]], signatures: Sequence[Optional[Signature]],
+            reference: str) -> None:
+        """Index a claim under its reference, replacing earlier entries for it"""
+        if not self.enabled or not documents:
+            return
+        now = _now()
+        try:
+            self._delete(reference)
+            fingerprint = claim_fingerprint(documents, self.placeholders)
+            if fingerprint is not None:
+                db.session.execute(insert(ClaimFingerprint).values(
+                    fingerprint=fingerprint, reference=reference, created_at=now))
+            signed = self._signed(documents, signatures)
+            if signed:
+                ids = db.session.execute(
+                    insert(DocumentSignature).returning(DocumentSignature.id, sort_by_parameter_order=True),
+                    [{"reference": reference, "doc_type": document.get("type", "unknown"),
+                      "signature": pack_signature(signature), "created_at": now} for document, signature in signed],
+                ).scalars().all()
+                db.session.execute(insert(SignatureBand), [
+                    {"band_key": key, "signature_id": signature_id}
+                    for signature_id, (_, signature) in zip(ids, signed) for key in set(band_keys(signature))
+                ])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Duplicate index write error: {e}")
+
+    def remove(self, reference: str) -> None:
+        """Drop a claim from the index, as when it is withdrawn"""
+        if not self.enabled:
+            return
+        try:
+            self._delete(reference)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Duplicate index write error: {e}")
+
+    @staticmethod
+    def _signed(documents: Sequence[Dict[str, Any]],
+                signatures: Sequence[Optional[Signature]]) -> List[Tuple[Dict[str, Any], Signature]]:
+        """(document, signature) of the documents compared by text"""
+        return [(document, signature) for document, signature in zip(documents, signatures)
+                if signature is not None and document.get("type") in SIGNED_TYPES]
+
+    @staticmethod
+    def _delete(reference: str) -> None:
+        stale = select(DocumentSignature.id).where(DocumentSignature.reference == reference)
+        db.session.execute(delete(SignatureBand).where(SignatureBand.signature_id.in_(stale)))
+        db.session.execute(delete(DocumentSignature).where(DocumentSignature.reference == reference))
+        db.session.execute(delete(ClaimFingerprint).where(ClaimFingerprint.reference == reference))
+
+
+DUPLICATE_INDEX = DuplicateIndex()
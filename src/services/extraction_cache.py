@@ -0,0 +1,210 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Union
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.models.extraction_cache import CachedExtraction
+from src.models.user import db
+
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# Expired rows are purged from SQLite every this many writes
+_PURGE_EVERY_PUTS = 256
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class _MemoryTier:
+    """Per-process LRU of encoded payloads bounded by their total size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+            return encoded
+
+    def put(self, key: str, encoded: bytes) -> int:
+        """Store an entry and return how many entries were evicted for it"""
+        if len(encoded) > self.max_bytes:
+            return 0
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= len(previous)
+            self._entries[key] = encoded
+            self.bytes_used += len(encoded)
+            while self.bytes_used > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self.bytes_used -= len(dropped)
+                evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ExtractionCache:
+    """Two-tier cache of extraction results keyed by a hash of the upload.
+
+    The first tier is an in-process LRU with a byte budget, the second the
+    ``extraction_cache`` table in the app database with TTL eviction, shared
+    by every worker process. Entries are tagged with the extraction rules
+    version and entries from any other version are treated as misses and
+    purged; a callable rules version is resolved on first use. Payloads are
+    JSON-serializable dicts; cache errors are logged and never fail the caller.
+    """
+
+    def __init__(self, rules_version: Union[str, Callable[[], str]], max_bytes: int = DEFAULT_MEMORY_BYTES,
+                 ttl: float = DEFAULT_TTL_SECONDS):
+        self._rules_version = rules_version
+        self.ttl = ttl
+        self.enabled = True
+        self.persistent = False
+        self._memory = _MemoryTier(max_bytes)
+        self._counters = {
+            "memory_hits": 0, "persistent_hits": 0, "misses": 0,
+            "memory_evictions": 0, "persistent_evictions": 0, "errors": 0,
+        }
+        self._counters_lock = Lock()
+        self._puts = 0
+
+    @property
+    def rules_version(self) -> str:
+        if callable(self._rules_version):
+            self._rules_version = self._rules_version()
+        return self._rules_version
+
+    @rules_version.setter
+    def rules_version(self, rules_version: str) -> None:
+        self._rules_version = rules_version
+
+    def init_app(self, app) -> None:
+        """Configure from app.config; stale rows are purged by ``flask init-db``"""
+        self.enabled = app.config.get('EXTRACTION_CACHE_ENABLED', True)
+        self._memory.max_bytes = app.config.get('EXTRACTION_CACHE_BYTES', DEFAULT_MEMORY_BYTES)
+        self.ttl = app.config.get('EXTRACTION_CACHE_TTL', DEFAULT_TTL_SECONDS)
+        self.persistent = 'sqlalchemy' in app.extensions
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        if amount:
+            with self._counters_lock:
+                self._counters[name] += amount
+
+    def _key(self, digest: str) -> str:
+        return f"{self.rules_version}:{digest}"
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Return the cached payload for a content digest, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        encoded = self._memory.get(self._key(digest))
+        if encoded is not None:
+            self._count("memory_hits")
+            return json.loads(encoded)
+
+        if self.persistent:
+            try:
+                row = db.session.get(CachedExtraction, digest)
+                if (row is not None and row.rules_version == self.rules_version
+                        and row.created_at >= time.time() - self.ttl):
+                    self._count("persistent_hits")
+                    self._count("memory_evictions", self._memory.put(self._key(digest), row.payload))
+                    return json.loads(row.payload)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                self._count("errors")
+                print(f"Extraction cache read error: {e}")
+
+        self._count("misses")
+        return None
+
+    def put(self, digest: str, payload: Dict[str, Any]) -> None:
+        """Store a payload in both tiers, replacing any previous entry"""
+        if not self.enabled:
+            return
+
+        encoded = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self._count("memory_evictions", self._memory.put(self._key(digest), encoded))
+
+        if not self.persistent:
+            return
+        values = {
+            "digest": digest,
+            "rules_version": self.rules_version,
+            "payload": encoded,
+            "size": len(encoded),
+            "created_at": time.time(),
+        }
+        # An upsert keeps concurrent writers from different processes from
+        # racing on the primary key
+        statement = insert(CachedExtraction).values(**values)
+        statement = statement.on_conflict_do_update(index_elements=["digest"], set_=values)
+        try:
+            db.session.execute(statement)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self._count("errors")
+            print(f"Extraction cache write error: {e}")
+            return
+
+        self._puts += 1
+        if self._puts % _PURGE_EVERY_PUTS == 0:
+            self.purge()
+
+    def purge(self) -> int:
+        """Delete expired rows and rows from other rules versions"""
+        if not self.persistent:
+            return 0
+        try:
+            deleted = CachedExtraction.query.filter(
+                (CachedExtraction.created_at < time.time() - self.ttl)
+                | (CachedExtraction.rules_version != self.rules_version)
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self._count("errors")
+            print(f"Extraction cache purge error: {e}")
+            return 0
+        self._count("persistent_evictions", deleted)
+        return deleted
+
+    def invalidate(self, rules_version: Optional[str] = None) -> None:
+        """Switch to a new rules version (if given) and drop every stale entry"""
+        if rules_version is not None:
+            self.rules_version = rules_version
+        self._memory.clear()
+        self.purge()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counters_lock:
+            stats = dict(self._counters)
+        stats.update({
+            "rules_version": self.rules_version,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory.bytes_used,
+            "memory_max_bytes": self._memory.max_bytes,
+        })
+        return stats
@@ -0,0 +1,258 @@
+import re
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Protocol, Sequence, Tuple
+
+# Where a pattern's match can start relative to its keywords:
+#   ANCHOR_KEYWORD - the match begins with one of the keywords
+#   ANCHOR_LINE    - the match begins on the same line as one of the keywords
+#   None           - no positional hint, keywords are only a presence check
+ANCHOR_KEYWORD = "keyword"
+ANCHOR_LINE = "line"
+
+_LINE_BREAK = re.compile(r"[\n\r]")
+_WORD_CHAR = re.compile(r"\w")
+
+
+class DocumentText:
+    """One normalized view of a document shared by every field extractor.
+
+    Holds the lowercased copy and a lazily built line index, and memoizes the
+    first position of every keyword looked up so that fields sharing keywords
+    ("patient", "total", ...) only scan the text once.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower()
+        # Prefiltering and matching on the lowercased copy are only exact when it
+        # is ASCII; otherwise unicode case folding can make (?i) match characters
+        # that str.lower() maps differently, so we fall back to plain regex.
+        self.prefilter = self.lower.isascii()
+        self._line_starts: Optional[List[int]] = None
+        self._keyword_pos: Dict[str, int] = {}
+        self._word_end: Optional[int] = None
+
+    def first(self, keyword: str) -> int:
+        """Return the first offset of keyword in the lowercased text or -1"""
+        pos = self._keyword_pos.get(keyword)
+        if pos is None:
+            pos = self.lower.find(keyword)
+            self._keyword_pos[keyword] = pos
+        return pos
+
+    @property
+    def word_end(self) -> int:
+        """Offset just past the last word character of the text"""
+        if self._word_end is None:
+            end = len(self.text)
+            while end and not _WORD_CHAR.match(self.text, end - 1):
+                end -= 1
+            self._word_end = end
+        return self._word_end
+
+    def line_start(self, pos: int) -> int:
+        """Return the offset of the start of the line containing pos"""
+        if self._line_starts is None:
+            self._line_starts = [0] + [m.end() for m in _LINE_BREAK.finditer(self.text)]
+        return self._line_starts[bisect_right(self._line_starts, pos) - 1]
+
+
+class PageSource(Protocol):
+    """Anything that can hand out a document's text a few pages at a time"""
+
+    pages_parsed: int
+
+    def prefix(self, count: int) -> Tuple[str, bool]:
+        """Return the text of the first count pages and whether that is the whole document"""
+        ...
+
+
+class FieldPattern:
+    """A compiled pattern plus the literal keywords any match must contain"""
+
+    def __init__(self, pattern: str, keywords: Sequence[str] = (), anchor: Optional[str] = None):
+        self.regex = re.compile(pattern)
+        # Case-insensitive patterns written in lowercase can run case-sensitively
+        # over the lowercased copy, which lets sre use its fast literal scans.
+        body = pattern[len("(?i)"):] if pattern.startswith("(?i)") else None
+        self.folded = re.compile(body) if body is not None and body == body.lower() else None
+        self.keywords = tuple(keyword.lower() for keyword in keywords)
+        self.anchor = anchor if self.keywords else None
+
+    def search(self, doc: DocumentText) -> Optional[str]:
+        """Return the first capture of the first match, as re.findall(...)[0] would"""
+        found = self.find(doc)
+        return found[0] if found is not None else None
+
+    def find(self, doc: DocumentText) -> Optional[Tuple[str, int]]:
+        """Return the first capture of the first match and the offset where it ends"""
+        pos = 0
+        if self.keywords and doc.prefilter:
+            hits = [hit for hit in (doc.first(keyword) for keyword in self.keywords) if hit >= 0]
+            if not hits:
+                return None
+            if self.anchor == ANCHOR_KEYWORD:
+                pos = min(hits)
+            elif self.anchor == ANCHOR_LINE:
+                pos = doc.line_start(min(hits))
+
+        if self.folded is not None and doc.prefilter:
+            # Offsets line up because an ASCII lowercased copy has the same length
+            match = self.folded.search(doc.lower, pos)
+            if match is None:
+                return None
+            return doc.text[match.start(1):match.end(1)], match.end(1)
+
+        match = self.regex.search(doc.text, pos)
+        if match is None:
+            return None
+        return match.group(1), match.end(1)
+
+
+class FieldSpec:
+    """An ordered list of patterns for one output field.
+
+    Patterns are tried in order and only the first match of each pattern is
+    considered; the first one that ``coerce`` accepts wins, otherwise the
+    field keeps its default.
+    """
+
+    def __init__(self, name: str, patterns: Sequence[FieldPattern], default: Any,
+                 coerce: Callable[[str], Optional[Any]]):
+        self.name = name
+        self.patterns = list(patterns)
+        self.default = default
+        self.coerce = coerce
+
+    def extract(self, doc: DocumentText) -> Any:
+        for pattern in self.patterns:
+            candidate = pattern.search(doc)
+            if candidate is None:
+                continue
+            value = self.coerce(candidate)
+            if value is not None:
+                return value
+        return self.default
+
+    def resolve(self, doc: DocumentText, complete: bool) -> Tuple[bool, Any]:
+        """Extract from a prefix of a document, if the prefix already decides the field.
+
+        Returns (resolved, value). When the prefix is not the complete text the
+        field is only resolved if every pattern tried up to the accepted one
+        matched inside the prefix, because a pattern without a match could
+        still match further on and take precedence. A capture ending after
+        the last word character of the prefix also counts as unresolved:
+        separators and whitespace at the end of a page can continue on the
+        next one and change what greedy quantifiers consume.
+        """
+        if complete:
+            return True, self.extract(doc)
+        for pattern in self.patterns:
+            found = pattern.find(doc)
+            if found is None:
+                return False, None
+            candidate, end = found
+            if end > doc.word_end:
+                return False, None
+            value = self.coerce(candidate)
+            if value is not None:
+                return True, value
+        # Every pattern's first match is known and none was accepted
+        return True, self.default
+
+
+class FieldExtractor:
+    """Extracts a fixed set of fields from a document in declaration order"""
+
+    def __init__(self, fields: Sequence[FieldSpec]):
+        self.fields = list(fields)
+
+    def defaults(self) -> Dict[str, Any]:
+        """The value of every field when nothing is found for it"""
+        return {field.name: field.default for field in self.fields}
+
+    def extract(self, text: str, doc: Optional[DocumentText] = None) -> Dict[str, Any]:
+        if doc is None:
+            doc = DocumentText(text)
+        return {field.name: field.extract(doc) for field in self.fields}
+
+    def extract_pages(self, pages: "PageSource") -> Dict[str, Any]:
+        """Extract fields while pulling as few pages from pages as possible.
+
+        Starts from the pages already parsed (at least one) and doubles the
+        prefix until every field is resolved or the document is exhausted, so
+        the total scanning work stays within about twice a full extraction.
+        The result equals ``extract`` on the complete text.
+        """
+        values: Dict[str, Any] = {}
+        unresolved = list(self.fields)
+        count = max(1, pages.pages_parsed)
+        while True:
+            text, complete = pages.prefix(count)
+            doc = DocumentText(text)
+            still_unresolved = []
+            for spec in unresolved:
+                resolved, value = spec.resolve(doc, complete)
+                if resolved:
+                    values[spec.name] = value
+                else:
+                    still_unresolved.append(spec)
+            unresolved = still_unresolved
+            if not unresolved:
+                break
+            count *= 2
+        return {spec.name: values[spec.name] for spec in self.fields}
+
+
+def text_between(min_len: int, max_len: int) -> Callable[[str], Optional[str]]:
+    """Accept stripped text whose length is strictly between the bounds"""
+    def coerce(candidate: str) -> Optional[str]:
+        candidate = candidate.strip()
+        if min_len < len(candidate) < max_len:
+            return candidate
+        return None
+    return coerce
+
+
+def amount_between(low: float, high: float) -> Callable[[str], Optional[int]]:
+    """Accept a comma-grouped amount within [low, high], truncated to int"""
+    def coerce(candidate: str) -> Optional[int]:
+        try:
+            amount = float(candidate.replace(",", ""))
+        except ValueError:
+            return None
+        if low <= amount <= high:
+            return int(amount)
+        return None
+    return coerce
+
+
+def normalize_date(date_str: str) -> Optional[str]:
+    """Normalize MM/DD/YYYY, MM-DD-YYYY or YYYY-MM-DD to YYYY-MM-DD"""
+    if "/" in date_str:
+        parts = date_str.split("/")
+    elif "-" in date_str:
+        parts = date_str.split("-")
+    else:
+        return None
+
+    if len(parts) != 3:
+        return None
+
+    if len(parts[2]) == 4:  # MM/DD/YYYY or MM-DD-YYYY
+        formatted_date = f"{parts[2]}-{parts[0].zfill(2)}-{parts[1].zfill(2)}"
+    else:  # YYYY/MM/DD or YYYY-MM-DD
+        formatted_date = f"{parts[0]}-{parts[1].zfill(2)}-{parts[2].zfill(2)}"
+
+    try:
+        datetime.strptime(formatted_date, "%Y-%m-%d")
+    except ValueError:
+        return None
+    return formatted_date
+
+
+def field(name: str, default: Any, coerce: Callable[[str], Optional[Any]],
+          *patterns: Tuple) -> FieldSpec:
+    """Shorthand for a FieldSpec from (pattern, keywords[, anchor]) tuples"""
+    return FieldSpec(name, [FieldPattern(*spec) for spec in patterns], default, coerce)
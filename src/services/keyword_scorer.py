@@ -0,0 +1,113 @@
+from threading import Lock
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Registries with at least this many distinct indicators are matched in one
+# Aho-Corasick pass over the text; smaller ones with one C-level substring
+# search per indicator, which is faster up to about this size
+# (see benchmarks/bench_keyword_scorer.py)
+AUTOMATON_MIN_INDICATORS = 250
+
+
+class AhoCorasick:
+    """Reports every keyword in a text in one left-to-right pass"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail = [0]
+        self.output: List[FrozenSet[str]] = [frozenset()]
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(frozenset())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state] |= {keyword}
+        # Breadth first, so every state's failure link is set before its children's
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] |= self.output[self.fail[child]]
+
+    def find(self, text: str) -> Set[str]:
+        goto, fail, output = self.goto, self.fail, self.output
+        found: Set[str] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class KeywordScorer:
+    """Scores texts against labelled indicator lists.
+
+    Labels keep their registration order, which is also the tie-break order
+    used by ``best``. Every distinct indicator is looked for once per text,
+    however many labels share it: with CPython's substring search for small
+    registries such as the document types, and with an Aho-Corasick automaton
+    once there are ``automaton_min_indicators`` of them.
+    """
+
+    def __init__(self, automaton_min_indicators: int = AUTOMATON_MIN_INDICATORS):
+        self.automaton_min_indicators = automaton_min_indicators
+        self._labels: Dict[str, Tuple[str, ...]] = {}
+        self._keywords: FrozenSet[str] = frozenset()
+        self._automaton: Optional[AhoCorasick] = None
+        self._lock = Lock()
+
+    def register(self, label: str, indicators: Iterable[str]) -> None:
+        """Add or replace the indicator list for a label"""
+        with self._lock:
+            self._labels[label] = tuple(indicator.lower() for indicator in indicators if indicator)
+            keywords = frozenset(indicator for values in self._labels.values() for indicator in values)
+            automaton = AhoCorasick(keywords) if len(keywords) >= self.automaton_min_indicators else None
+            self._keywords, self._automaton = keywords, automaton
+
+    @property
+    def labels(self) -> List[str]:
+        return list(self._labels)
+
+    def indicators(self, label: str) -> Tuple[str, ...]:
+        return self._labels[label]
+
+    def find(self, text_lower: str) -> Set[str]:
+        """Return the registered indicators present in already lowercased text"""
+        automaton = self._automaton
+        if automaton is not None:
+            return automaton.find(text_lower)
+        return {keyword for keyword in self._keywords if keyword in text_lower}
+
+    def score(self, text_lower: str) -> Dict[str, int]:
+        """Return, per label, how many of its indicators appear in the text"""
+        found = self.find(text_lower)
+        return {
+            label: sum(1 for indicator in indicators if indicator in found)
+            for label, indicators in self._labels.items()
+        }
+
+    def first_match(self, text_lower: str) -> Optional[str]:
+        """Return the first label (in registration order) with any indicator present"""
+        for label, score in self.score(text_lower).items():
+            if score:
+                return label
+        return None
+
+    def best(self, text_lower: str) -> Optional[str]:
+        """Return the highest scoring label, earliest registered on ties"""
+        scores = self.score(text_lower)
+        best_label = None
+        for label, score in scores.items():
+            if best_label is None or score > scores[best_label]:
+                best_label = label
+        return best_label
@@ -0,0 +1,289 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.services.worker_pool import in_worker_process, process_alive
+
+# Latency buckets in seconds, from sub-millisecond regex work to long PDFs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_FLUSH_SECONDS = 1.0
+
+# One JSON line per processed claim
+TIMING_LOG = logging.getLogger("claim.timing")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class StageTimer:
+    """Wall time per pipeline stage and pages parsed for one document or claim.
+
+    Picklable, so claim pool workers can send their timings back. An exception
+    leaving ``stage()`` is tagged with the stage name as ``claim_stage``.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.errors: List[str] = []
+        self.pages = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            if not hasattr(e, "claim_stage"):
+                e.claim_stage = name
+            raise
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def merge(self, other: "StageTimer") -> None:
+        for name, seconds in other.seconds.items():
+            self.add(name, seconds)
+        self.errors.extend(other.errors)
+        self.pages += other.pages
+
+
+class Metrics:
+    """Process-local counters and histograms rendered in Prometheus text format.
+
+    Updates take one lock and touch a dict entry, cheap enough to leave on in
+    production. When ``METRICS_DIR`` is configured every server process also
+    writes its totals to its own file there (from a background thread, within
+    ``METRICS_FLUSH_SECONDS`` of any change, and on exit), and rendering sums
+    the files of all processes, so a multi-process server reports one
+    consistent set of counters whichever process answers the scrape, however
+    long the others have been idle. Files of processes that
+    are gone are swept when the next process starts; their totals drop out
+    of the sums, which Prometheus reads as a counter reset.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.flush_seconds = DEFAULT_FLUSH_SECONDS
+        self._path = None
+        # Updates made, and how many of them the metrics file holds
+        self._changes = 0
+        self._flushed_changes = 0
+        self._publisher: Optional[Thread] = None
+        self._stopping = Event()
+        self._meta: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], List[Any]] = {}
+        self._lock = Lock()
+        self._flush_lock = Lock()
+
+    def init_app(self, app) -> None:
+        """Configure from app.config: the shared metrics directory and the timing log"""
+        self.directory = app.config.get('METRICS_DIR')
+        self.flush_seconds = app.config.get('METRICS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        app.extensions['metrics'] = self
+
+        # Claim pool workers re-import the app module; they report through
+        # their parent and must not publish files or log of their own
+        if in_worker_process():
+            return
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self.sweep()
+            self._start_publishing()
+            atexit.register(self.flush)
+            # A forked server worker publishes its own totals, not a copy of its parent's
+            os.register_at_fork(after_in_child=self._after_fork)
+        configure_timing_log(app.config.get('CLAIM_TIMING_LOG'))
+
+    def _start_publishing(self) -> None:
+        self._path = os.path.join(self.directory, f"metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+        self._stopping.clear()
+        self._publisher = Thread(target=self._publish, name="metrics-publisher", daemon=True)
+        self._publisher.start()
+
+    def _publish(self) -> None:
+        while not self._stopping.wait(self.flush_seconds):
+            if self._changes != self._flushed_changes:
+                self.flush()
+
+    def _after_fork(self) -> None:
+        if self._path is None:
+            return
+        self._counters, self._histograms = {}, {}
+        self._changes = self._flushed_changes = 0
+        self._lock, self._flush_lock = Lock(), Lock()
+        self._start_publishing()
+
+    def stop(self) -> None:
+        """Stop the background publishing and write the file a last time"""
+        self._stopping.set()
+        if self._publisher is not None:
+            self._publisher.join()
+            self._publisher = None
+        self.flush()
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._meta[name] = ("counter", help_text, ())
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self._meta[name] = ("histogram", help_text, tuple(buckets))
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._changes += 1
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        buckets = self._meta[name][2]
+        index = bisect_left(buckets, value)
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+            self._changes += 1
+
+    def snapshot(self) -> Dict[str, List[Any]]:
+        """This process's totals in a JSON-serialisable form"""
+        with self._lock:
+            return {
+                "counters": [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                "histograms": [[name, dict(labels), list(counts), total]
+                               for (name, labels), (counts, total) in self._histograms.items()],
+            }
+
+    def flush(self) -> None:
+        """Write this process's totals to its metrics file"""
+        if not self._path:
+            return
+        with self._flush_lock:
+            changes = self._changes
+            temporary = f"{self._path}.tmp"
+            try:
+                with open(temporary, "w", encoding="utf-8") as handle:
+                    json.dump(self.snapshot(), handle)
+                os.replace(temporary, self._path)
+                self._flushed_changes = changes
+            except OSError as e:
+                print(f"Metrics flush error: {e}")
+
+    def sweep(self) -> int:
+        """Remove metrics files of processes that are gone; returns how many"""
+        if not self.directory or os.name != "posix":
+            # Probing a pid with os.kill would terminate it on Windows
+            return 0
+        removed = 0
+        for path in glob.glob(os.path.join(self.directory, "metrics-*")):
+            pid = os.path.basename(path)[len("metrics-"):].split("-", 1)[0]
+            if not pid.isdigit() or process_alive(int(pid)):
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def collect(self) -> Dict[str, List[Any]]:
+        """Totals of this process plus every other process publishing to the metrics directory"""
+        snapshots = [self.snapshot()]
+        if self.directory:
+            self.flush()
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+                if path == self._path:
+                    continue
+                try:
+                    with open(path, "r", encoding="utf-8") as handle:
+                        snapshots.append(json.load(handle))
+                except (OSError, ValueError) as e:
+                    print(f"Metrics read error for {path}: {e}")
+
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[Any]] = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total in snapshot["histograms"]:
+                key = (name, tuple(sorted(labels.items())))
+                entry = histograms.get(key)
+                if entry is None:
+                    histograms[key] = [list(counts), total]
+                elif len(entry[0]) == len(counts):
+                    entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                    entry[1] += total
+        return {"counters": counters, "histograms": histograms}
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        collected = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in sorted(self._meta.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (sample, labels), value in sorted(collected["counters"].items()):
+                    if sample == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            for (sample, labels), (counts, total) in sorted(collected["histograms"].items()):
+                if sample != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def configure_timing_log(target: Optional[str]) -> None:
+    """Send timing lines to stderr ('-'), to a file path, or nowhere (empty).
+
+    File output is opened in append mode and every line is a single write, so
+    several server processes can share one log file.
+    """
+    for handler in list(TIMING_LOG.handlers):
+        TIMING_LOG.removeHandler(handler)
+        handler.close()
+    TIMING_LOG.propagate = False
+    if not target:
+        TIMING_LOG.disabled = True
+        return
+    handler = logging.StreamHandler(sys.stderr) if target == "-" else logging.FileHandler(target, mode="a")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    TIMING_LOG.addHandler(handler)
+    TIMING_LOG.setLevel(logging.INFO)
+    TIMING_LOG.disabled = False
+
+
+METRICS = Metrics()
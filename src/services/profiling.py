@@ -0,0 +1,322 @@
+import cProfile
+import glob
+import hmac
+import json
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.services.metrics import METRICS
+
+MODES = ("sampling", "deterministic")
+DEFAULT_INTERVAL_MS = 5.0
+DEFAULT_KEEP = 100
+PROFILE_HEADER = "X-Claim-Profile"
+# Call-graph branches below this share of a root's time are left out of
+# stacks derived from a deterministic profile
+_MIN_BRANCH_SHARE = 0.0005
+
+# (filename, first line, function name), as cProfile keys functions
+Function = Tuple[str, int, str]
+
+# Held while a deterministic profile runs. From Python 3.12 cProfile is the
+# process's one sys.monitoring profiler, so a second one cannot be enabled
+_cprofile_lock = threading.Lock()
+
+METRICS.counter("claim_profiles_total", "Profiled claim requests by trigger: sampled or header")
+
+
+def _function(code) -> Function:
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class _Sampler(threading.Thread):
+    """Records the stack of one thread every ``interval`` seconds, weighted by the time since the last sample"""
+
+    def __init__(self, thread_id: int, interval: float, stacks: Counter):
+        super().__init__(name="claim-profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = stacks
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_function(frame.f_code))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += now - last
+            last = now
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class Profile:
+    """A profile of one claim, recorded in the request thread and in every claim
+    worker that processed one of its documents.
+
+    "sampling" records the stack of the profiled thread every ``interval``
+    seconds, cheap enough for production traffic. "deterministic" runs
+    cProfile, which counts every call but slows call-heavy code such as pypdf
+    several times. Either mode is written in both formats: sampled stacks are
+    summed per function for pstats, and cProfile's call graph is unrolled into
+    stacks, splitting a function's time between its callers in proportion.
+    Picklable, so workers send their part back with their results.
+
+    One deterministic profile runs per process at a time; a profile entered
+    while another runs (or while a debugger holds the profiler) samples
+    instead, and its ``mode`` says so.
+    """
+
+    def __init__(self, mode: str = "sampling", interval: float = DEFAULT_INTERVAL_MS / 1000):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.interval = interval
+        self.name: Optional[str] = None
+        self.stacks: Counter = Counter()
+        self.stats: Dict[Function, Tuple] = {}
+        self._sampler: Optional[_Sampler] = None
+        self._profiler: Optional[cProfile.Profile] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "interval": self.interval, "name": self.name,
+                "stacks": self.stacks, "stats": self.stats}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state, _sampler=None, _profiler=None)
+
+    def __enter__(self) -> "Profile":
+        if self.mode == "deterministic":
+            self._profiler = self._start_cprofile()
+            if self._profiler is None:
+                self.mode = "sampling"
+        if self.mode == "sampling":
+            self._sampler = _Sampler(threading.get_ident(), self.interval, self.stacks)
+            self._sampler.start()
+        return self
+
+    @staticmethod
+    def _start_cprofile() -> Optional[cProfile.Profile]:
+        if not _cprofile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is already active
+            _cprofile_lock.release()
+            return None
+        return profiler
+
+    def __exit__(self, *exc_info) -> None:
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            _cprofile_lock.release()
+            self._profiler.create_stats()
+            self.merge_stats(self._profiler.stats)
+            self._profiler = None
+
+    def merge_stats(self, stats: Dict[Function, Tuple]) -> None:
+        for function, entry in stats.items():
+            if function in self.stats:
+                self.stats[function] = pstats.add_func_stats(self.stats[function], entry)
+            else:
+                self.stats[function] = entry[:4] + (dict(entry[4]),)
+
+    def merge(self, other: "Profile") -> None:
+        """Add a worker's part of the profile"""
+        self.stacks.update(other.stacks)
+        self.merge_stats(other.stats)
+
+    def pstats(self) -> Dict[Function, Tuple]:
+        """The profile as cProfile stats, as pstats.Stats loads them"""
+        if self.mode == "deterministic":
+            return self.stats
+        # Call counts are sample counts
+        totals: Dict[Function, List[Any]] = {}
+        for stack, seconds in self.stacks.items():
+            seen = set()
+            for depth, function in enumerate(stack):
+                entry = totals.setdefault(function, [0, 0, 0.0, 0.0, {}])
+                if depth == len(stack) - 1:
+                    entry[2] += seconds
+                if function in seen:
+                    continue
+                seen.add(function)
+                entry[0] += 1
+                entry[1] += 1
+                entry[3] += seconds
+                if depth:
+                    caller = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                    caller[0] += 1
+                    caller[1] += 1
+                    caller[2] += seconds if depth == len(stack) - 1 else 0.0
+                    caller[3] += seconds
+        return {function: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+                for function, (cc, nc, tt, ct, callers) in totals.items()}
+
+    def collapsed(self) -> Counter:
+        """Seconds per call stack (root first)"""
+        if self.mode == "sampling":
+            return self.stacks
+        callees: Dict[Function, Dict[Function, float]] = {}
+        for function, (_, _, _, _, callers) in self.stats.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, {})[function] = edge[3]
+        stacks: Counter = Counter()
+
+        def unroll(function: Function, seconds: float, path: Tuple[Function, ...], floor: float) -> None:
+            _, _, own, cumulative, _ = self.stats.get(function, (0, 0, 0.0, 0.0, {}))
+            share = seconds / cumulative if cumulative else 0.0
+            path = path + (function,)
+            if own * share > 0:
+                stacks[path] += own * share
+            for callee, edge_seconds in callees.get(function, {}).items():
+                if callee not in path and edge_seconds * share >= floor:
+                    unroll(callee, edge_seconds * share, path, floor)
+
+        for function, (_, _, _, cumulative, callers) in self.stats.items():
+            if not callers:
+                unroll(function, cumulative, (), cumulative * _MIN_BRANCH_SHARE)
+        return stacks
+
+
+def _short_path(filename: str) -> str:
+    for prefix in sorted((entry for entry in sys.path if entry), key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def collapsed_lines(stacks: Counter) -> Iterator[str]:
+    """Stacks in the collapsed format of flamegraph.pl and speedscope, weighted in microseconds"""
+    for stack, seconds in sorted(stacks.items()):
+        microseconds = round(seconds * 1_000_000)
+        if microseconds:
+            frames = ";".join(f"{name} ({_short_path(filename)}:{line})" for filename, line, name in stack)
+            yield f"{frames} {microseconds}\n"
+
+
+class ClaimProfiler:
+    """Opt-in profiling of /api/process-claim requests.
+
+    A request is profiled when it draws under ``CLAIM_PROFILE_RATE`` or sends
+    an ``X-Claim-Profile`` header equal to ``CLAIM_PROFILE_TOKEN``. Its
+    profile is written to ``CLAIM_PROFILE_DIR`` as ``<name>.collapsed``,
+    ``<name>.pstats`` and ``<name>.json`` (request id, mode, duration, and the
+    size and page count of every file); the newest ``CLAIM_PROFILE_KEEP``
+    profiles are kept. With neither trigger configured, checking a request
+    costs one attribute read.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.rate = 0.0
+        self.token = ""
+        self.mode = "sampling"
+        self.interval = DEFAULT_INTERVAL_MS / 1000
+        self.directory: Optional[str] = None
+        self.keep = DEFAULT_KEEP
+        self._write_lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.rate = app.config.get('CLAIM_PROFILE_RATE', 0.0)
+        self.token = app.config.get('CLAIM_PROFILE_TOKEN') or ""
+        self.mode = app.config.get('CLAIM_PROFILE_MODE', "sampling")
+        if self.mode not in MODES:
+            raise ValueError(f"CLAIM_PROFILE_MODE must be one of {', '.join(MODES)}, not {self.mode!r}")
+        self.interval = app.config.get('CLAIM_PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS) / 1000
+        self.directory = app.config.get('CLAIM_PROFILE_DIR') or os.path.join(app.root_path, 'database', 'profiles')
+        self.keep = app.config.get('CLAIM_PROFILE_KEEP', DEFAULT_KEEP)
+        self.enabled = self.rate > 0 or bool(self.token)
+        app.extensions['claim_profiler'] = self
+
+    def for_request(self, request) -> Optional[Profile]:
+        """A new Profile if this request is to be profiled, else None"""
+        if not self.enabled:
+            return None
+        supplied = request.headers.get(PROFILE_HEADER)
+        if self.token and supplied and hmac.compare_digest(supplied.encode(), self.token.encode()):
+            trigger = "header"
+        elif self.rate > 0 and random.random() < self.rate:
+            trigger = "sampled"
+        else:
+            return None
+        METRICS.inc("claim_profiles_total", trigger=trigger)
+        return Profile(self.mode, self.interval)
+
+    @contextmanager
+    def recording(self, profile: Optional[Profile], request_id: str,
+                  files: List[Tuple[str, int, Optional[int]]]) -> Iterator[None]:
+        """Record ``profile`` in this thread for the block, then write it.
+
+        ``files`` holds (filename, bytes, pages) of the uploads; writing
+        errors are logged and never fail the request.
+        """
+        if profile is None:
+            yield
+            return
+        profile.name = f"{time.strftime('%Y%m%dT%H%M%S')}-{re.sub(r'[^A-Za-z0-9_.-]', '_', request_id)[:80]}"
+        started = time.perf_counter()
+        try:
+            with profile:
+                yield
+        finally:
+            try:
+                self.write(profile, {
+                    "request_id": request_id,
+                    "mode": profile.mode,
+                    "interval_ms": profile.interval * 1000 if profile.mode == "sampling" else None,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "files": [{"filename": filename, "bytes": size, "pages": pages} for filename, size, pages in files],
+                })
+            except Exception as e:
+                print(f"Claim profile error: {e}")
+
+    def write(self, profile: Profile, metadata: Dict[str, Any]) -> str:
+        """Write the profile's three files and return their path without extension"""
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile.name)
+        with open(base + ".collapsed", "w") as f:
+            f.writelines(collapsed_lines(profile.collapsed()))
+        with open(base + ".pstats", "wb") as f:
+            marshal.dump(profile.pstats(), f)
+        with open(base + ".json", "w") as f:
+            json.dump(dict(metadata, pid=os.getpid()), f, indent=2)
+        self._prune()
+        return base
+
+    def _prune(self) -> None:
+        if self.keep <= 0:
+            return
+        with self._write_lock:
+            profiles = sorted(glob.glob(os.path.join(self.directory, "*.json")), key=os.path.getmtime)
+            for path in profiles[:-self.keep]:
+                for extension in (".collapsed", ".pstats", ".json"):
+                    try:
+                        os.remove(path[:-len(".json")] + extension)
+                    except OSError:
+                        pass
+
+
+PROFILER = ClaimProfiler()
@@ -0,0 +1,205 @@
+import dataclasses
+import decimal
+import gzip
+import json
+import uuid
+import zlib
+from datetime import date
+from typing import Any, Iterable, Iterator, Optional
+
+import orjson
+import zstandard
+from flask import Response, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+DEFAULT_MIN_BYTES = 1024
+DEFAULT_ZSTD_LEVEL = 3
+DEFAULT_GZIP_LEVEL = 6
+# Items encoded per chunk of a streamed list, so compressor flushes stay rare
+STREAM_CHUNK_ITEMS = 500
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/x-ndjson", "application/javascript", "image/svg+xml",
+}
+
+
+def _default(value: Any) -> Any:
+    # The types Flask's default provider encodes beyond plain JSON, encoded
+    # the same way; dates reach it through OPT_PASSTHROUGH_DATETIME
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, sort_keys: bool = True, indent: bool = False) -> bytes:
+    """Encode JSON with orjson, falling back to the json module for what orjson
+    rejects (integers beyond 64 bits, non-string keys)"""
+    option = orjson.OPT_PASSTHROUGH_DATETIME
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    try:
+        return orjson.dumps(obj, default=_default, option=option)
+    except orjson.JSONEncodeError:
+        return json.dumps(obj, default=_default, sort_keys=sort_keys, indent=2 if indent else None,
+                          separators=None if indent else (",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def json_line(obj: Any) -> bytes:
+    """One NDJSON line"""
+    return dumps(obj, sort_keys=False) + b"\n"
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Output decodes to the same values as the default provider's: sorted keys,
+    compact unless the app is in debug mode, and the same encoding of dates,
+    Decimal and UUID. It is not byte-identical: non-ASCII text is written as
+    UTF-8 rather than ``\\u`` escapes, and floats in exponent form are spelled
+    ``1e20`` rather than ``1e+20``. It is typically several times faster on
+    large claim results.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj, kwargs.get("sort_keys", self.sort_keys), bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(dumps(obj, self.sort_keys, indent) + b"\n", mimetype=self.mimetype)
+
+
+def stream_json_list(items: Iterable[Any], status: int = 200) -> Response:
+    """Stream a JSON array, encoding its items as they are iterated.
+
+    ``items`` is consumed while the response is sent, inside the request's
+    context, and never held in memory at once; a generator that runs its
+    database query when first iterated streams a table of any size.
+    """
+    def generate() -> Iterator[bytes]:
+        yield b"["
+        chunk = []
+        first = True
+        for item in items:
+            chunk.append(dumps(item))
+            if len(chunk) >= STREAM_CHUNK_ITEMS:
+                yield (b"" if first else b",") + b",".join(chunk)
+                chunk, first = [], False
+        if chunk:
+            yield (b"" if first else b",") + b",".join(chunk)
+        yield b"]\n"
+    return Response(stream_with_context(generate()), status=status, mimetype="application/json")
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def end(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _ZstdStream:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def end(self) -> bytes:
+        return self._compressor.flush()
+
+
+class ResponseCompression:
+    """Compresses responses with zstd or gzip, whichever the client prefers.
+
+    Applies to JSON, NDJSON and text responses of at least
+    ``RESPONSE_COMPRESSION_MIN_BYTES``; streamed responses are compressed
+    chunk by chunk and flushed after each, so NDJSON lines still reach the
+    client as they are produced. Files sent by ``send_file`` are left alone.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.min_bytes = DEFAULT_MIN_BYTES
+        self.zstd_level = DEFAULT_ZSTD_LEVEL
+        self.gzip_level = DEFAULT_GZIP_LEVEL
+
+    def init_app(self, app) -> None:
+        self.enabled = app.config.get('RESPONSE_COMPRESSION', True)
+        self.min_bytes = app.config.get('RESPONSE_COMPRESSION_MIN_BYTES', DEFAULT_MIN_BYTES)
+        self.zstd_level = app.config.get('RESPONSE_ZSTD_LEVEL', DEFAULT_ZSTD_LEVEL)
+        self.gzip_level = app.config.get('RESPONSE_GZIP_LEVEL', DEFAULT_GZIP_LEVEL)
+        app.json = OrjsonProvider(app)
+        app.after_request(self.compress)
+        app.extensions['response_compression'] = self
+
+    def negotiate(self, accept_encoding) -> Optional[str]:
+        """The encoding to use for a request's Accept-Encoding, zstd winning ties"""
+        best, best_quality = None, 0.0
+        for encoding in ("zstd", "gzip"):
+            quality = accept_encoding[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, response: Response) -> Response:
+        if (not self.enabled or request.method == "HEAD" or response.direct_passthrough
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or "Content-Encoding" in response.headers or not self._compressible(response.mimetype)):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = self.negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response.response, self._stream_compressor(encoding))
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_bytes:
+                return response
+            if encoding == "zstd":
+                response.set_data(zstandard.ZstdCompressor(level=self.zstd_level).compress(data))
+            else:
+                response.set_data(gzip.compress(data, self.gzip_level, mtime=0))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _compressible(mimetype: Optional[str]) -> bool:
+        return bool(mimetype) and (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES)
+
+    def _stream_compressor(self, encoding: str):
+        return _ZstdStream(self.zstd_level) if encoding == "zstd" else _GzipStream(self.gzip_level)
+
+    @staticmethod
+    def _stream(body: Iterable[Any], compressor) -> Iterator[bytes]:
+        try:
+            for data in body:
+                if data:
+                    yield compressor.chunk(data.encode("utf-8") if isinstance(data, str) else data)
+            yield compressor.end()
+        finally:
+            close = getattr(body, "close", None)
+            if close is not None:
+                close()
+
+
+RESPONSE_COMPRESSION = ResponseCompression()
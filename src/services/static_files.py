@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+import zstandard
+from flask import Response, current_app, request, send_file
+
+from src.services.metrics import METRICS
+from src.services.responses import COMPRESSIBLE_MIMETYPES
+from src.services.worker_pool import in_worker_process
+
+DEFAULT_MEMORY_BYTES = 1024 * 1024
+DEFAULT_MAX_AGE = 365 * 24 * 3600
+# Levels of the variants built in memory at startup: zstd 10 is about 7%
+# smaller than the per-response level 3 for 1 ms per 14 KB. Ship .zst and .gz
+# files for higher levels
+_GZIP_LEVEL = 6
+_ZSTD_LEVEL = 10
+# Pre-built variants looked for next to a file, by content coding
+VARIANT_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+# Names carrying a content hash, as bundlers emit them: app.3f9a1c2e.js,
+# index-BQ3zQ1Zx.css. The hash must contain a digit so words are not taken
+HASHED_NAME = re.compile(r"[.-](?=[A-Za-z_-]*\d)[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+METRICS.counter("static_responses_total", "Static file responses by outcome: sent, not_modified or not_found")
+
+
+def is_hashed_name(name: str) -> bool:
+    return HASHED_NAME.search(name) is not None
+
+
+def _compressible(mimetype: str) -> bool:
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+class _StaticFile:
+    """One indexed file: its ETag, headers and, when small, its bytes and variants"""
+
+    def __init__(self, path: str, name: str, stat: os.stat_result, memory_bytes: int):
+        self.path = path
+        self.signature = (stat.st_size, stat.st_mtime_ns)
+        self.mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.compressible = _compressible(self.mimetype)
+        self.hashed = is_hashed_name(name)
+        digest = hashlib.sha256()
+        content = b""
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+                if stat.st_size <= memory_bytes:
+                    content += block
+        self.etag = digest.hexdigest()[:32]
+        self.content: Optional[bytes] = content if stat.st_size <= memory_bytes else None
+        # Content coding -> (bytes in memory or None, path of a pre-built file or None)
+        self.variants: Dict[str, Tuple[Optional[bytes], Optional[str]]] = {}
+        if self.content is not None and self.compressible:
+            for encoding, data in (("zstd", zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(self.content)),
+                                   ("gzip", gzip.compress(self.content, _GZIP_LEVEL, mtime=0))):
+                if len(data) < len(self.content):
+                    self.variants[encoding] = (data, None)
+
+    def attach_prebuilt(self, prebuilt: Dict[str, str]) -> None:
+        """Serve these pre-built variants from disk, where none was built in memory"""
+        variants = {encoding: variant for encoding, variant in self.variants.items() if variant[0] is not None}
+        for encoding, path in prebuilt.items():
+            variants.setdefault(encoding, (None, path))
+        self.variants = variants
+
+
+class StaticFiles:
+    """Serves the files of the static folder from an index built at startup.
+
+    Every file is hashed once into a strong ETag, so conditional requests are
+    answered with 304 and no file access. Names carrying a content hash are
+    cached for ``STATIC_MAX_AGE`` as immutable; other files, index.html
+    included, must be revalidated. Compressible files are sent zstd or gzip
+    encoded as the client allows: ``app.js.zst`` and ``app.js.gz`` next to
+    ``app.js`` are served as they are, and files up to
+    ``STATIC_MEMORY_BYTES`` are held in memory with variants compressed once.
+    The index is built when the app is created and, with
+    ``STATIC_RELOAD_SECONDS``, rescanned at most that often so edits to the
+    folder are picked up; unchanged files are not hashed again.
+    """
+
+    def __init__(self):
+        self.folder: Optional[str] = None
+        self.memory_bytes = DEFAULT_MEMORY_BYTES
+        self.max_age = DEFAULT_MAX_AGE
+        self.reload_seconds = 0.0
+        self._files: Dict[str, _StaticFile] = {}
+        self._scanned_at = 0.0
+        self._lock = Lock()
+
+    def init_app(self, app) -> None:
+        self.folder = app.static_folder
+        self.memory_bytes = app.config.get('STATIC_MEMORY_BYTES', DEFAULT_MEMORY_BYTES)
+        self.max_age = app.config.get('STATIC_MAX_AGE', DEFAULT_MAX_AGE)
+        self.reload_seconds = app.config.get('STATIC_RELOAD_SECONDS', 0)
+        # Claim pool workers import the app but serve no requests
+        if not in_worker_process():
+            self.scan()
+        app.extensions['static_files'] = self
+
+    def scan(self) -> None:
+        """Index the folder, reusing the entries of files whose size and mtime are unchanged"""
+        with self._lock:
+            previous = self._files
+            files: Dict[str, _StaticFile] = {}
+            if self.folder and os.path.isdir(self.folder):
+                for directory, _, names in os.walk(self.folder):
+                    for name in names:
+                        path = os.path.join(directory, name)
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        key = os.path.relpath(path, self.folder).replace(os.sep, "/")
+                        entry = previous.get(key)
+                        if entry is None or entry.signature != (stat.st_size, stat.st_mtime_ns):
+                            try:
+                                entry = _StaticFile(path, name, stat, self.memory_bytes)
+                            except OSError as e:
+                                print(f"Static file index error: {e}")
+                                continue
+                        files[key] = entry
+                for key, entry in files.items():
+                    if entry.compressible:
+                        entry.attach_prebuilt({encoding: files[key + suffix].path
+                                               for encoding, suffix in VARIANT_SUFFIXES.items()
+                                               if key + suffix in files})
+            self._files = files
+            self._scanned_at = time.monotonic()
+
+    def lookup(self, path: str) -> Optional[_StaticFile]:
+        if self.reload_seconds and time.monotonic() - self._scanned_at >= self.reload_seconds:
+            self.scan()
+        return self._files.get(path)
+
+    def serve(self, path: str) -> Response:
+        """The file at ``path``, or index.html for paths that are not files (client-side routes)"""
+        entry = self.lookup(path) if path else None
+        if entry is None:
+            entry = self.lookup("index.html")
+            if entry is None:
+                METRICS.inc("static_responses_total", outcome="not_found")
+                return current_app.response_class("index.html not found", 404)
+
+        encoding = None
+        if entry.variants:
+            accepted = request.accept_encodings
+            encoding = max(entry.variants, key=lambda candidate: accepted[candidate])
+            if not accepted[encoding]:
+                encoding = None
+        content, prebuilt = entry.variants[encoding] if encoding else (entry.content, None)
+        etag = f"{entry.etag}-{encoding}" if encoding else entry.etag
+
+        if content is not None:
+            response = current_app.response_class(content, mimetype=entry.mimetype)
+            response.set_etag(etag)
+            response.make_conditional(request)
+        else:
+            response = send_file(prebuilt or entry.path, mimetype=entry.mimetype, etag=etag,
+                                 conditional=True, max_age=None)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if entry.variants:
+            response.vary.add("Accept-Encoding")
+        if entry.hashed:
+            response.cache_control.public = True
+            response.cache_control.max_age = self.max_age
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        METRICS.inc("static_responses_total", outcome="not_modified" if response.status_code == 304 else "sent")
+        return response
+
+
+STATIC_FILES = StaticFiles()
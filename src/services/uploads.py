@@ -0,0 +1,301 @@
+import glob
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+from threading import Condition
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+from flask import Request, current_app
+
+from src.services.worker_pool import process_alive
+
+DEFAULT_SPOOL_BYTES = 1024 * 1024
+DEFAULT_REQUEST_PAGES = 2000
+DEFAULT_GLOBAL_BYTES = 1024 * 1024 * 1024
+DEFAULT_GLOBAL_PAGES = 20000
+DEFAULT_SHARED_MIN_BYTES = 256 * 1024
+# RAM-backed tmpfs on Linux; elsewhere shared files go to the temp directory
+DEFAULT_SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# Shared upload files are named claim-upload-<pid>-<random>
+_SHARED_PREFIX = "claim-upload-"
+
+
+class UploadTooLarge(Exception):
+    """Raised when uploads exceed a size or page cap; answered with 413"""
+
+    def __init__(self, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class MappedUpload:
+    """Read-only contents of an upload spooled to disk, memory-mapped on demand.
+
+    Stands in for the upload's bytes: ``len()`` is its size, ``view()`` a
+    buffer for hashing or copying and ``open()`` a stream for pypdf. Mapped
+    pages live in the page cache rather than in the worker's heap, so the
+    kernel can reclaim them under pressure. Pickles as its path, so claim pool
+    workers map the same file instead of receiving a copy. ``close()`` (or
+    leaving a ``with`` block) unmaps the view, which is mapped again if used
+    after; streams from ``open()`` are closed by whoever reads them.
+    """
+
+    def __init__(self, path: str, size: Optional[int] = None):
+        self.path = path
+        self.size = os.path.getsize(path) if size is None else size
+        self._mapping = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __reduce__(self):
+        return MappedUpload, (self.path, self.size)
+
+    def __enter__(self) -> "MappedUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _map(self) -> mmap.mmap:
+        with open(self.path, "rb") as handle:
+            return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def view(self) -> Union[bytes, mmap.mmap]:
+        if self.size == 0:
+            return b""
+        if self._mapping is None:
+            self._mapping = self._map()
+        return self._mapping
+
+    def open(self) -> BinaryIO:
+        """A new read-only stream over the file, with its own position"""
+        return BytesIO() if self.size == 0 else self._map()
+
+    def close(self) -> None:
+        mapping, self._mapping = self._mapping, None
+        if mapping is not None:
+            mapping.close()
+
+
+Content = Union[bytes, MappedUpload]
+
+
+def as_buffer(content: Content):
+    """The upload contents as a bytes-like object"""
+    return content.view() if isinstance(content, MappedUpload) else content
+
+
+def open_content(content: Content) -> BinaryIO:
+    """A seekable stream over the upload contents for pypdf"""
+    return content.open() if isinstance(content, MappedUpload) else BytesIO(content)
+
+
+def close_content(content: Content) -> None:
+    """Unmap the view ``as_buffer`` gave of the upload contents, if any"""
+    if isinstance(content, MappedUpload):
+        content.close()
+
+
+class SpoolingRequest(Request):
+    """Request that writes the files of large uploads to named temporary files.
+
+    Requests up to ``UPLOAD_SPOOL_BYTES`` keep their files in memory; bigger
+    ones (or ones without a Content-Length) are spooled to
+    ``UPLOAD_SPOOL_DIR`` as they are parsed, so the upload is never held in
+    memory as a whole. The files are removed when the request is closed.
+    """
+
+    def _get_file_stream(self, total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None) -> BinaryIO:
+        threshold = current_app.config.get('UPLOAD_SPOOL_BYTES', DEFAULT_SPOOL_BYTES)
+        if total_content_length is not None and total_content_length <= threshold:
+            return BytesIO()
+        return tempfile.NamedTemporaryFile(
+            "w+b", prefix="upload-", suffix=".part", dir=current_app.config.get('UPLOAD_SPOOL_DIR'))
+
+
+def upload_content(file) -> Content:
+    """The contents of an uploaded file: mapped if it was spooled to disk, read otherwise"""
+    path = getattr(file.stream, "name", None)
+    if isinstance(path, str) and os.path.isfile(path):
+        file.stream.flush()
+        return MappedUpload(path)
+    return file.read()
+
+
+class SharedUploads:
+    """Hands in-memory uploads to claim pool workers as memory-backed files.
+
+    Pickling an upload into a worker's job copies it four times: into the
+    pickle, through the pipe, out of it and into the unpickled bytes. Instead
+    ``share()`` writes each upload of at least ``UPLOAD_SHARED_MIN_BYTES``
+    once to a file in ``UPLOAD_SHARED_DIR`` (/dev/shm where it exists) and
+    passes a MappedUpload, which pickles as the path; the worker maps it
+    read-only and pypdf reads the mapping, so nothing is copied on the way.
+    Spooled uploads are already mapped and are passed as they are. The files
+    are removed when the block exits, whether the documents succeeded,
+    failed or killed their worker; files left by a process that died before
+    removing them are swept when the next process starts.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.min_bytes = DEFAULT_SHARED_MIN_BYTES
+        self.directory = DEFAULT_SHARED_DIR
+
+    def init_app(self, app) -> None:
+        self.min_bytes = app.config.get('UPLOAD_SHARED_MIN_BYTES', DEFAULT_SHARED_MIN_BYTES)
+        self.directory = app.config.get('UPLOAD_SHARED_DIR') or DEFAULT_SHARED_DIR
+        self.enabled = self.min_bytes > 0
+        app.extensions['shared_uploads'] = self
+        self.sweep()
+
+    def shared(self, content: Content) -> bool:
+        """Whether ``share()`` writes this upload to a shared file"""
+        return self.enabled and not isinstance(content, MappedUpload) and len(content) >= self.min_bytes
+
+    @contextmanager
+    def share(self, jobs: List[Tuple[str, Content]]) -> Iterator[List[Tuple[str, Content]]]:
+        """The (filename, content) jobs with in-memory uploads moved to shared files for the block"""
+        paths = []
+        try:
+            shared_jobs = []
+            for filename, content in jobs:
+                if self.shared(content):
+                    fd, path = tempfile.mkstemp(prefix=f"{_SHARED_PREFIX}{os.getpid()}-", dir=self.directory)
+                    paths.append(path)
+                    with os.fdopen(fd, "wb") as handle:
+                        handle.write(content)
+                    content = MappedUpload(path, len(content))
+                shared_jobs.append((filename, content))
+            yield shared_jobs
+        finally:
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Shared upload cleanup error: {e}")
+
+    def sweep(self) -> int:
+        """Remove shared files of processes that are gone; returns how many"""
+        if os.name != "posix":
+            # Probing a pid with os.kill would terminate it on Windows
+            return 0
+        removed = 0
+        pattern = os.path.join(self.directory or tempfile.gettempdir(), _SHARED_PREFIX + "*")
+        for path in glob.glob(pattern):
+            pid = os.path.basename(path)[len(_SHARED_PREFIX):].split("-", 1)[0]
+            if not pid.isdigit() or process_alive(int(pid)):
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+class UploadLimits:
+    """Caps on the bytes and pages of one claim and on the bytes and pages held
+    by all claims in flight in this process.
+
+    The per-claim byte cap is Flask's ``MAX_CONTENT_LENGTH``. Parsing a request
+    body enforces it for claims uploaded on their own; ``check_bytes`` applies
+    it to claims unpacked from an archive before they are read.
+    """
+
+    def __init__(self):
+        self.request_bytes = 0
+        self.request_pages = DEFAULT_REQUEST_PAGES
+        self.global_bytes = DEFAULT_GLOBAL_BYTES
+        self.global_pages = DEFAULT_GLOBAL_PAGES
+        self.held_bytes = 0
+        self.held_pages = 0
+        self.peak_bytes = 0
+        self._changed = Condition()
+
+    def init_app(self, app) -> None:
+        self.request_bytes = app.config.get('MAX_CONTENT_LENGTH') or 0
+        self.request_pages = app.config.get('UPLOAD_MAX_PAGES', DEFAULT_REQUEST_PAGES)
+        self.global_bytes = app.config.get('UPLOAD_GLOBAL_BYTES', DEFAULT_GLOBAL_BYTES)
+        self.global_pages = app.config.get('UPLOAD_GLOBAL_PAGES', DEFAULT_GLOBAL_PAGES)
+        app.extensions['upload_limits'] = self
+
+    @staticmethod
+    def count_pages(content: Content) -> int:
+        """Page count an uploaded PDF declares; unreadable files count as none and fail later.
+
+        Runs in the request thread, outside the claim workers' time and memory
+        budget, so only the cross-reference table, the catalog and the page
+        tree root's /Count are read: no page is loaded and no content stream
+        decoded, and the work grows with the file's size, which
+        MAX_CONTENT_LENGTH caps, rather than with its pages. A PDF that
+        understates its pages still meets the workers' budget.
+        """
+        from pypdf import PdfReader
+        try:
+            count = PdfReader(open_content(content)).root_object["/Pages"]["/Count"]
+        except Exception:
+            return 0
+        return count if isinstance(count, int) and count > 0 else 0
+
+    def check_bytes(self, size: int) -> None:
+        """Raise UploadTooLarge if one claim's uploads of ``size`` bytes are over a byte cap"""
+        if 0 < self.request_bytes < size:
+            raise UploadTooLarge(f"Uploads are {size} bytes; the limit per claim is {self.request_bytes}")
+        if 0 < self.global_bytes < size:
+            raise UploadTooLarge("Uploads are larger than this server accepts at once")
+
+    def check(self, jobs: List[Tuple[str, Content]]) -> List[int]:
+        """Check one claim's uploads against the per-claim caps, raising
+        UploadTooLarge; returns the page count of every upload (all 0 when no
+        page cap is set)"""
+        self.check_bytes(sum(len(content) for _, content in jobs))
+        counts = [0] * len(jobs)
+        if self.request_pages > 0 or self.global_pages > 0:
+            counts = [self.count_pages(content) for _, content in jobs]
+        pages = sum(counts)
+        if 0 < self.request_pages < pages:
+            raise UploadTooLarge(f"Uploads have {pages} pages; the limit per request is {self.request_pages}")
+        if 0 < self.global_pages < pages:
+            raise UploadTooLarge("Uploads are larger than this server accepts at once")
+        return counts
+
+    def _fits(self, size: int, pages: int) -> bool:
+        return not (0 < self.global_bytes < self.held_bytes + size or 0 < self.global_pages < self.held_pages + pages)
+
+    @contextmanager
+    def reserve(self, jobs: List[Tuple[str, Content]], wait: Optional[float] = 0.0) -> Iterator[List[int]]:
+        """Check one claim's uploads and hold its share of the process budget
+        until the block exits; yields the page counts of ``check``.
+
+        When the process is at capacity, waits up to ``wait`` seconds (None:
+        until there is room) for other claims to finish, then raises
+        UploadTooLarge with a retry hint.
+        """
+        counts = self.check(jobs)
+        size, pages = sum(len(content) for _, content in jobs), sum(counts)
+        with self._changed:
+            if not self._changed.wait_for(lambda: self._fits(size, pages), wait):
+                raise UploadTooLarge("Server is at its upload capacity; retry shortly", retry_after=1)
+            self.held_bytes += size
+            self.held_pages += pages
+            self.peak_bytes = max(self.peak_bytes, self.held_bytes)
+        try:
+            yield counts
+        finally:
+            with self._changed:
+                self.held_bytes -= size
+                self.held_pages -= pages
+                self._changed.notify_all()
+
+    def stats(self):
+        with self._changed:
+            return {
+                "held_bytes": self.held_bytes,
+                "held_pages": self.held_pages,
+                "peak_bytes": self.peak_bytes,
+            }
@@ -0,0 +1,187 @@
+import csv
+import io
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.models.user import User, db
+from src.services.claim_store import InvalidQuery, decode_cursor, encode_cursor
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+# Conflicting and invalid rows listed in an import report; all are counted
+DEFAULT_REPORT_ROWS = 1000
+USERNAME_LENGTH = User.__table__.c.username.type.length
+EMAIL_LENGTH = User.__table__.c.email.type.length
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# (row number, fields) for one parsed import row; fields is None when the
+# row could not be parsed
+ImportRow = Tuple[int, Optional[Dict[str, Any]]]
+
+
+class InvalidImport(Exception):
+    """Raised for an import body that cannot be read at all; answered with 400"""
+
+
+def _user_dict(row) -> Dict[str, Any]:
+    # Same fields as User.to_dict, built from columns rather than entities
+    return {"id": row.id, "username": row.username, "email": row.email}
+
+
+def parse_csv(stream: BinaryIO) -> Iterator[ImportRow]:
+    """Rows of a UTF-8 CSV file with a header naming ``username`` and ``email``"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    if reader.fieldnames is None or not {"username", "email"} <= set(reader.fieldnames):
+        raise InvalidImport("CSV header must name the username and email columns")
+    try:
+        for number, fields in enumerate(reader, start=1):
+            yield number, fields
+    except csv.Error as e:
+        raise InvalidImport(f"CSV line {reader.line_num}: {e}")
+
+
+def parse_ndjson(stream: BinaryIO) -> Iterator[ImportRow]:
+    """Rows of a file with one JSON object per line; blank lines are skipped"""
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            fields = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            fields = None
+        yield number, fields if isinstance(fields, dict) else None
+
+
+def _validate(fields: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """(values, None) for a valid row, or (None, error)"""
+    if fields is None:
+        return None, "Row is not a JSON object"
+    username, email = fields.get("username"), fields.get("email")
+    if not isinstance(username, str) or not username.strip():
+        return None, "username is required"
+    if not isinstance(email, str) or not email.strip():
+        return None, "email is required"
+    username, email = username.strip(), email.strip()
+    if len(username) > USERNAME_LENGTH:
+        return None, f"username is longer than {USERNAME_LENGTH} characters"
+    if len(email) > EMAIL_LENGTH:
+        return None, f"email is longer than {EMAIL_LENGTH} characters"
+    return {"username": username, "email": email}, None
+
+
+class UserStore:
+    """Listing and bulk import of users.
+
+    Listings are in id order and paged with a cursor on the id, so every page
+    is one index range however deep it is; ``iter_all`` streams the whole
+    table in ``yield_per`` chunks. Imports insert ``batch_size`` rows per
+    multi-row ``INSERT ... ON CONFLICT DO NOTHING`` in a single transaction:
+    rows clashing with an existing user, or with an earlier row of the same
+    import, on the unique username or email are skipped and reported, and
+    any other failure rolls the whole import back.
+    """
+
+    def __init__(self):
+        self.batch_size = DEFAULT_IMPORT_BATCH_SIZE
+        self.report_rows = DEFAULT_REPORT_ROWS
+
+    def init_app(self, app) -> None:
+        self.batch_size = app.config.get('USER_IMPORT_BATCH_SIZE', DEFAULT_IMPORT_BATCH_SIZE)
+        self.report_rows = app.config.get('USER_IMPORT_REPORT_ROWS', DEFAULT_REPORT_ROWS)
+        app.extensions['user_store'] = self
+
+    def page(self, limit: int = DEFAULT_PAGE_SIZE,
+             cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of users after the cursor and the cursor of the next page"""
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise InvalidQuery(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        statement = select(User.id, User.username, User.email).order_by(User.id).limit(limit + 1)
+        if cursor:
+            statement = statement.where(User.id > decode_cursor(cursor))
+        rows = db.session.execute(statement).all()
+        next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+        return [_user_dict(row) for row in rows[:limit]], next_cursor
+
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """Every user in id order, loaded a thousand rows at a time"""
+        statement = select(User.id, User.username, User.email).order_by(User.id)
+        for row in db.session.execute(statement.execution_options(yield_per=1000)):
+            yield _user_dict(row)
+
+    def import_rows(self, rows: Iterable[ImportRow]) -> Dict[str, Any]:
+        """Insert parsed rows in one transaction and return the import report.
+
+        Raises after rolling back if the database fails; conflicting and
+        invalid rows are reported, not raised.
+        """
+        report: Dict[str, Any] = {"rows": 0, "inserted": 0, "conflict_count": 0, "invalid_count": 0,
+                                  "conflicts": [], "invalid": []}
+        batch: List[Tuple[int, Dict[str, str]]] = []
+        try:
+            for number, fields in rows:
+                report["rows"] += 1
+                values, error = _validate(fields)
+                if error is not None:
+                    report["invalid_count"] += 1
+                    if len(report["invalid"]) < self.report_rows:
+                        report["invalid"].append({"row": number, "error": error})
+                    continue
+                batch.append((number, values))
+                if len(batch) >= self.batch_size:
+                    self._insert(batch, report)
+                    batch = []
+            if batch:
+                self._insert(batch, report)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return report
+
+    def _insert(self, batch: List[Tuple[int, Dict[str, str]]], report: Dict[str, Any]) -> None:
+        # Rows repeating an earlier row of the batch exactly would be hidden
+        # by its RETURNING row, so they are counted as conflicts up front
+        unique: Dict[Tuple[str, str], int] = {}
+        repeats = []
+        for number, values in batch:
+            key = (values["username"], values["email"])
+            if key in unique:
+                repeats.append((number, values))
+            else:
+                unique[key] = number
+        rows = [{"username": username, "email": email} for username, email in unique]
+        statement = sqlite_insert(User).on_conflict_do_nothing().returning(User.username, User.email)
+        inserted = set(db.session.execute(statement, rows).tuples())
+        report["inserted"] += len(inserted)
+
+        skipped = [(number, {"username": username, "email": email})
+                   for (username, email), number in unique.items() if (username, email) not in inserted]
+        skipped.extend(repeats)
+        if not skipped:
+            return
+        report["conflict_count"] += len(skipped)
+        room = self.report_rows - len(report["conflicts"])
+        if room <= 0:
+            return
+        skipped.sort(key=lambda row: row[0])
+        skipped = skipped[:room]
+        # Every skipped username or email that exists now clashed; one of the two always does
+        usernames = set(db.session.execute(select(User.username).where(
+            User.username.in_([values["username"] for _, values in skipped]))).scalars())
+        emails = set(db.session.execute(select(User.email).where(
+            User.email.in_([values["email"] for _, values in skipped]))).scalars())
+        for number, values in skipped:
+            report["conflicts"].append({
+                "row": number,
+                **values,
+                "fields": [name for name, existing in (("username", usernames), ("email", emails))
+                           if values[name] in existing],
+            })
+
+
+USER_STORE = UserStore()
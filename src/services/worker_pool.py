@@ -0,0 +1,366 @@
+import itertools
+import multiprocessing
+import multiprocessing.context
+import multiprocessing.queues
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Prefix of pool worker process names, the marker in_worker_process checks
+_WORKER_NAME_PREFIX = "claim-pool-worker-"
+
+_pools: Dict[Tuple[int, Optional[int]], ProcessPoolExecutor] = {}
+_pools_lock = Lock()
+# Pools run_isolated takes for itself when jobs have a time budget, so a
+# timed-out job's workers can be killed without touching other requests'
+# jobs; kept for reuse between claims, at most _MAX_IDLE_POOLS per key
+_idle_pools: Dict[Tuple[int, Optional[int]], List[ProcessPoolExecutor]] = {}
+_MAX_IDLE_POOLS = 4
+# How long to wait for killed workers to exit
+_KILL_WAIT_SECONDS = 5.0
+
+# Workers of timed pools report each job as they start it, which is when its
+# time budget begins; reports are read this often while a job has not started
+_START_POLL_SECONDS = 0.05
+_start_tokens = itertools.count()
+# The start report queue of a timed pool, in its workers
+_start_reports: Optional[multiprocessing.queues.SimpleQueue] = None
+
+
+class JobTimeout(Exception):
+    """A job ran past its time budget and its worker was killed"""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"job exceeded its {seconds:g}s time budget")
+        self.seconds = seconds
+
+
+def default_pool_size() -> int:
+    return os.cpu_count() or 1
+
+
+def in_worker_process() -> bool:
+    """True in a pool worker, including while it re-imports the parent's main module.
+
+    Pool workers are named by _WorkerProcess, and a spawned process gets its
+    name before that import (a pool initializer only runs after it). Other
+    child processes, such as an ASGI server's workers, are not pool workers.
+    """
+    return multiprocessing.current_process().name.startswith(_WORKER_NAME_PREFIX)
+
+
+class _WorkerProcess(multiprocessing.context.SpawnProcess):
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # "_WorkerProcess-3" becomes "claim-pool-worker-3"
+        self.name = _WORKER_NAME_PREFIX + self.name.rsplit("-", 1)[-1]
+
+
+class _WorkerContext(multiprocessing.context.SpawnContext):
+    # Workers are started with "spawn" so forking a threaded server never
+    # copies held locks into a child
+    Process = _WorkerProcess
+
+
+_WORKER_CONTEXT = _WorkerContext()
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this pid exists (POSIX only: on Windows os.kill terminates it)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _limit_memory(limit: int) -> None:
+    """Pool initializer capping a worker's heap; allocations past it raise MemoryError.
+
+    RLIMIT_DATA leaves memory-mapped uploads out of the budget.
+    """
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows; the time budget still applies
+        return
+    which = getattr(resource, "RLIMIT_DATA", resource.RLIMIT_AS)
+    resource.setrlimit(which, (limit, limit))
+
+
+def _new_pool(size: int, memory_limit: Optional[int]) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=size, mp_context=_WORKER_CONTEXT,
+        initializer=_limit_memory if memory_limit else None,
+        initargs=(memory_limit,) if memory_limit else (),
+    )
+
+
+def _init_timed_worker(start_reports: multiprocessing.queues.SimpleQueue, memory_limit: Optional[int]) -> None:
+    global _start_reports
+    _start_reports = start_reports
+    if memory_limit:
+        _limit_memory(memory_limit)
+
+
+def _report_start(token: int, fn: Callable[..., Any], *args: Any) -> Any:
+    _start_reports.put(token)
+    return fn(*args)
+
+
+class _TimedPool(ProcessPoolExecutor):
+    """Pool for jobs with a time budget. A job waits in the pool's call queue
+    until a worker is started or free to run it, so workers put the token of
+    every job they start in ``start_reports``."""
+
+    def __init__(self, size: int, memory_limit: Optional[int]):
+        self.start_reports = _WORKER_CONTEXT.SimpleQueue()
+        super().__init__(max_workers=size, mp_context=_WORKER_CONTEXT, initializer=_init_timed_worker,
+                         initargs=(self.start_reports, memory_limit))
+
+    def submit_reporting(self, token: int, fn: Callable[..., Any], *args: Any) -> Future:
+        """Submit fn(*args), reporting ``token`` to start_reports when a worker starts it"""
+        return self.submit(_report_start, token, fn, *args)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+        self.start_reports.close()
+
+    def started(self) -> List[int]:
+        """Tokens of the jobs workers started since the last call"""
+        tokens = []
+        while not self.start_reports.empty():
+            tokens.append(self.start_reports.get())
+        return tokens
+
+
+def get_pool(size: int, memory_limit: Optional[int] = None) -> ProcessPoolExecutor:
+    """Return the shared process pool of the given size and worker memory
+    limit, creating it on first use"""
+    with _pools_lock:
+        pool = _pools.get((size, memory_limit))
+        if pool is None:
+            pool = _pools[(size, memory_limit)] = _new_pool(size, memory_limit)
+        return pool
+
+
+def _take_pool(size: int, memory_limit: Optional[int] = None) -> ProcessPoolExecutor:
+    """A pool no one else submits to until it is handed back with _return_pool"""
+    with _pools_lock:
+        idle = _idle_pools.get((size, memory_limit))
+        if idle:
+            return idle.pop()
+    return _TimedPool(size, memory_limit)
+
+
+def _return_pool(size: int, pool: ProcessPoolExecutor, memory_limit: Optional[int] = None) -> None:
+    with _pools_lock:
+        idle = _idle_pools.setdefault((size, memory_limit), [])
+        if len(idle) < _MAX_IDLE_POOLS:
+            idle.append(pool)
+            return
+    pool.shutdown(wait=False)
+
+
+def warm_pool(fn: Callable[[], Any], size: int, memory_limit: Optional[int] = None, timed: bool = False) -> None:
+    """Start every worker of a pool and run fn in them.
+
+    Warms the shared pool, or with ``timed`` one of the pools run_isolated
+    takes for jobs with a time budget. The jobs are submitted together so no
+    worker is idle when the next one arrives and the pool starts all
+    ``size`` workers; errors are logged.
+    """
+    size = max(1, size)
+    pool = _take_pool(size, memory_limit) if timed else get_pool(size, memory_limit)
+    futures = [pool.submit(fn) for _ in range(size)]
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Worker warm-up error: {e}")
+    if timed:
+        _return_pool(size, pool, memory_limit)
+
+
+def _forget_pools() -> None:
+    # A forked child cannot use its parent's workers; it starts its own pools
+    # on first use
+    global _pools_lock
+    _pools.clear()
+    _idle_pools.clear()
+    _pools_lock = Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pools)
+
+
+def _discard_pool(size: int, pool: ProcessPoolExecutor, memory_limit: Optional[int] = None) -> None:
+    with _pools_lock:
+        if _pools.get((size, memory_limit)) is pool:
+            del _pools[(size, memory_limit)]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _kill_pool(pool: ProcessPoolExecutor) -> None:
+    """Kill every worker of a pool taken with _take_pool, stopping a job that
+    would not finish on its own, and wait for them to exit"""
+    # shutdown() drops the executor's references to its workers
+    processes = list((pool._processes or {}).values())
+    for process in processes:
+        process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.join(_KILL_WAIT_SECONDS)
+
+
+def shutdown_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values()) + [pool for idle in _idle_pools.values() for pool in idle]
+        _pools.clear()
+        _idle_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def uses_pool(size: int, count: int, timeout: Optional[float] = None, memory_limit: Optional[int] = None) -> bool:
+    """Whether run_isolated runs ``count`` jobs on the process pool rather than in the calling process"""
+    return timeout is not None or memory_limit is not None or (size > 1 and count > 1)
+
+
+def run_isolated(fn: Callable[..., Any], jobs: Sequence[Tuple], size: int, timeout: Optional[float] = None,
+                 memory_limit: Optional[int] = None) -> List[Tuple[Any, Optional[BaseException]]]:
+    """Run fn(*job) for every job and return (result, error) pairs in job order.
+
+    With size <= 1 and no budget the jobs run in the calling process.
+    Otherwise they are spread over a process pool, one job per worker at a
+    time; an exception in one job is returned for that job only.
+
+    ``timeout`` is each job's time budget in seconds, counted from when a
+    worker reports starting it, so waiting for a worker to be started or
+    freed is not part of it. Timed jobs run on a pool of their own, not the
+    shared one: a job still running after its budget fails with JobTimeout
+    and that pool's workers are killed, the other jobs of this call they were
+    running starting over on a fresh pool. Jobs of other calls are not
+    affected.
+    ``memory_limit`` caps each worker's heap in bytes, so a job allocating
+    past it fails with MemoryError (or by killing its worker).
+
+    If a worker dies and takes the pool down, the jobs that were lost are
+    retried one at a time on a fresh pool so only the job that actually
+    kills its worker is reported as failed.
+    """
+    if not uses_pool(size, len(jobs), timeout, memory_limit):
+        results = []
+        for job in jobs:
+            try:
+                results.append((fn(*job), None))
+            except Exception as e:
+                results.append((None, e))
+        return results
+
+    size = max(1, size)
+    results: List[Tuple[Any, Optional[BaseException]]] = [(None, None)] * len(jobs)
+    lost = _run_window(fn, jobs, list(range(len(jobs))), size, size, timeout, memory_limit, results)
+    for index in lost:
+        if _run_window(fn, jobs, [index], 1, size, timeout, memory_limit, results):
+            results[index] = (None, BrokenProcessPool("worker process died while running the job"))
+    return results
+
+
+def _run_window(fn: Callable[..., Any], jobs: Sequence[Tuple], indexes: List[int], window: int, size: int,
+                timeout: Optional[float], memory_limit: Optional[int],
+                results: List[Tuple[Any, Optional[BaseException]]]) -> List[int]:
+    """Run the given jobs with at most ``window`` in flight, filling ``results``.
+
+    Returns the jobs that were in flight when a worker died.
+    """
+    queue = deque(indexes)
+    pending: Dict[Future, List[Any]] = {}
+    # Futures of the timed jobs in flight by start report token
+    reporting: Dict[int, Future] = {}
+    lost: List[int] = []
+    # Timed jobs may have to be killed, so they get workers no other call uses
+    own_pool = bool(timeout)
+
+    def fresh_pool(broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        if own_pool:
+            broken.shutdown(wait=False, cancel_futures=True)
+            return _take_pool(size, memory_limit)
+        _discard_pool(size, broken, memory_limit)
+        return get_pool(size, memory_limit)
+
+    def submit(index: int) -> Future:
+        if not own_pool:
+            return pool.submit(fn, *jobs[index])
+        token = next(_start_tokens)
+        reporting[token] = pool.submit_reporting(token, fn, *jobs[index])
+        return reporting[token]
+
+    pool = _take_pool(size, memory_limit) if own_pool else get_pool(size, memory_limit)
+    try:
+        while queue or pending:
+            while queue and len(pending) < window:
+                index = queue.popleft()
+                try:
+                    future = submit(index)
+                except BrokenProcessPool:
+                    pool = fresh_pool(pool)
+                    future = submit(index)
+                pending[future] = [index, None]
+
+            wait_for = None
+            if timeout:
+                now = time.monotonic()
+                for token in pool.started():
+                    future = reporting.pop(token, None)
+                    if future in pending:
+                        pending[future][1] = now + timeout
+                deadlines = [deadline for _, deadline in pending.values() if deadline is not None]
+                if deadlines:
+                    wait_for = max(0.0, min(deadlines) - now)
+                if len(deadlines) < len(pending):
+                    wait_for = min(wait_for, _START_POLL_SECONDS) if wait_for is not None else _START_POLL_SECONDS
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            broken = False
+            for future in done:
+                index, _ = pending.pop(future)
+                try:
+                    results[index] = (future.result(), None)
+                except BrokenProcessPool:
+                    lost.append(index)
+                    broken = True
+                except Exception as e:
+                    results[index] = (None, e)
+
+            now = time.monotonic()
+            expired = [future for future, (_, deadline) in pending.items()
+                       if deadline is not None and deadline <= now]
+            if expired:
+                for future in expired:
+                    index, _ = pending.pop(future)
+                    results[index] = (None, JobTimeout(timeout))
+                _kill_pool(pool)
+                # The other jobs in flight were only collateral; run them again
+                queue.extendleft(reversed([index for index, _ in pending.values()]))
+                pending.clear()
+                pool = _take_pool(size, memory_limit)
+            elif broken:
+                # Any job in flight may be the one that killed the worker
+                lost.extend(index for index, _ in pending.values())
+                pending.clear()
+                pool = fresh_pool(pool)
+    finally:
+        if own_pool and pending:
+            # Only left with jobs in flight by an exception; none may outlive this call
+            _kill_pool(pool)
+        elif own_pool:
+            _return_pool(size, pool, memory_limit)
+    return lost
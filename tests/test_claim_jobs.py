@@ -0,0 +1,90 @@
+import os
+import threading
+from datetime import timedelta
+
+import click
+import pytest
+from flask import Flask
+
+from src.models.claim_job import ClaimJob
+from src.models.user import db
+from src.services import claim_jobs
+from src.services.claim_jobs import ClaimJobQueue, _now
+
+
+def test_serving_skips_cli_commands_other_than_run(monkeypatch):
+    monkeypatch.delenv("FLASK_RUN_FROM_CLI", raising=False)
+    assert claim_jobs._serving()
+    monkeypatch.setenv("FLASK_RUN_FROM_CLI", "true")
+    assert not claim_jobs._serving()
+    for name, serving in (("init-db", False), ("run", True)):
+        with click.Context(click.Command(name)):
+            assert claim_jobs._serving() is serving
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.delenv("FLASK_RUN_FROM_CLI", raising=False)
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'jobs.db'}", CLAIM_JOB_WORKERS=1,
+                      CLAIM_JOB_POLL_SECONDS=0.05, CLAIM_JOB_STORAGE=str(tmp_path / "claim_jobs"))
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def test_workers_wait_for_the_schema(tmp_path, monkeypatch, capsys):
+    monkeypatch.delenv("FLASK_RUN_FROM_CLI", raising=False)
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'jobs.db'}", CLAIM_JOB_WORKERS=1,
+                      CLAIM_JOB_STORAGE=str(tmp_path / "claim_jobs"))
+    db.init_app(app)
+    queue = ClaimJobQueue(lambda job_id, uploads, config: {})
+    queue.init_app(app)
+    assert queue._threads == []
+    assert "run `flask init-db`" in capsys.readouterr().out
+    with app.app_context():
+        db.create_all()
+    queue.start()
+    try:
+        assert len(queue._threads) == 2
+    finally:
+        queue.stop(10)
+
+
+def test_workers_run_queued_jobs_without_a_request(app):
+    done = threading.Event()
+
+    def process(job_id, uploads, config):
+        done.set()
+        return {"uploads": [name for name, _ in uploads]}
+
+    queue = ClaimJobQueue(process)
+    queue.init_app(app)
+    try:
+        with app.app_context():
+            job_id = queue.submit([("bill.pdf", b"%PDF-1.4")]).id
+        assert done.wait(10)
+        queue.stop(10)
+        with app.app_context():
+            assert queue.get(job_id).status == ClaimJob.SUCCEEDED
+    finally:
+        queue.stop(10)
+
+
+def test_jobs_failed_by_lease_expiry_lose_their_uploads(app):
+    app.config["CLAIM_JOB_WORKERS"] = 0
+    queue = ClaimJobQueue(lambda job_id, uploads, config: {})
+    queue.init_app(app)
+    with app.app_context():
+        os.makedirs(queue.storage_dir)
+        jobs = [queue.submit([("bill.pdf", b"%PDF-1.4")]) for _ in range(2)]
+        for job, attempts in zip(jobs, (queue.max_attempts, 1)):
+            job.status, job.attempts = ClaimJob.RUNNING, attempts
+            job.lease_expires_at = _now() - timedelta(seconds=1)
+        db.session.commit()
+        queue._requeue_expired()
+        failed, retried = (db.session.get(ClaimJob, job.id) for job in jobs)
+        assert failed.status == ClaimJob.FAILED and not os.path.exists(failed.storage_path)
+        assert retried.status == ClaimJob.QUEUED and os.path.exists(retried.storage_path)
@@ -0,0 +1,78 @@
+import random
+
+from src.routes.claim import AdvancedClaimDecisionEngine, AdvancedClaimValidator
+from src.services.document_batch import DocumentBatch, compact, expand
+
+
+def random_claims(count, seed=3):
+    """Claims as the agents return them, and as they may arrive from elsewhere:
+    missing, extra and reordered fields, unparseable dates, non-int amounts
+    and documents of unknown types"""
+    rng = random.Random(seed)
+
+    def day():
+        return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+    claims = []
+    for number in range(count):
+        documents = []
+        for _ in range(rng.randint(0, 4)):
+            kind = rng.choice(["bill", "discharge_summary", "id_card"])
+            if kind == "bill":
+                document = {"type": kind, "hospital_name": rng.choice(["City Hospital", "Mercy Clinic"]),
+                            "total_amount": rng.choice([12500, 4200, 0, -5, 3.5, None, 10 ** 20, "12"]),
+                            "date_of_service": rng.choice([day(), day(), "2024-3-5", None, "bad"])}
+            elif kind == "discharge_summary":
+                document = {"type": kind, "patient_name": rng.choice(["Jane Roe", "Unknown Patient"]),
+                            "diagnosis": "Fracture", "admission_date": day(),
+                            "discharge_date": rng.choice([day(), None])}
+            else:
+                document = {"type": kind, "patient_name": "Jane Roe", "id_number": f"HP{number}",
+                            "insurance_provider": rng.choice(["Acme Health", None])}
+            draw = rng.random()
+            if draw < 0.05:
+                document["extra"] = 1
+            elif draw < 0.08:
+                document = {"type": "other", "text": "unclassified"}
+            elif draw < 0.1:
+                document.pop(next(key for key in document if key != "type"))
+            elif draw < 0.12:
+                document = dict(reversed(list(document.items())))
+            documents.append(document)
+        claims.append(documents)
+    return claims
+
+
+def test_round_trip_is_lossless():
+    claims = random_claims(3000)
+    batch = DocumentBatch.from_claims(claims)
+    assert len(batch) == sum(len(documents) for documents in claims)
+    for restored, documents in zip(batch.claim_documents(), claims):
+        assert restored == documents
+        assert [list(document) for document in restored] == [list(document) for document in documents]
+        for document in documents:
+            assert expand(compact(document)) == document
+            assert list(expand(compact(document))) == list(document)
+    assert batch.raw and batch.extras
+
+
+def test_checks_match_validator_and_decision_engine():
+    claims = random_claims(3000, seed=8)
+    batch = DocumentBatch.from_claims(claims)
+    validator, engine = AdvancedClaimValidator(), AdvancedClaimDecisionEngine()
+    dates, invalid = batch.date_discrepancies(), set(batch.invalid_bill_amounts())
+    for claim, documents in enumerate(claims):
+        expected = [message for message in validator.validate(documents)["discrepancies"] if "date" in message]
+        assert dates.get(claim, []) == expected, documents
+
+        bills = [document for document in documents if document.get("type") == "bill"]
+        if not bills:
+            assert claim not in invalid
+            continue
+        amount = bills[0].get("total_amount", 0)
+        if isinstance(amount, (int, float)):
+            rejected = engine.make_decision(documents, {})["reason"] == "Invalid or missing bill amount"
+            assert (claim in invalid) == rejected, documents
+        else:
+            # The engine cannot compare these with 0 at all
+            assert claim in invalid
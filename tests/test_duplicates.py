@@ -0,0 +1,88 @@
+from flask import Flask
+
+from src.models.user import db
+from src.routes.claim import BILL_FIELDS, DISCHARGE_FIELDS, ID_CARD_FIELDS, document_signature
+from src.services.duplicates import DuplicateIndex, claim_fingerprint, text_signature
+
+PLACEHOLDERS = {"bill": BILL_FIELDS.defaults(), "discharge_summary": DISCHARGE_FIELDS.defaults(),
+                "id_card": ID_CARD_FIELDS.defaults()}
+
+
+def claim(**bill):
+    return [
+        {"type": "bill", "hospital_name": "City Hospital", "total_amount": 4200, "date_of_service": "2024-03-02",
+         **bill},
+        {"type": "discharge_summary", "patient_name": "Jane Roe", "diagnosis": "Fracture",
+         "admission_date": "2024-03-01", "discharge_date": "2024-03-04"},
+        {"type": "id_card", "patient_name": "Jane Roe", "id_number": "HP123456", "insurance_provider": "Acme"},
+    ]
+
+
+def test_fingerprint_matches_same_fields():
+    assert claim_fingerprint(claim(), PLACEHOLDERS) == claim_fingerprint(claim(), PLACEHOLDERS)
+    assert claim_fingerprint(claim(), PLACEHOLDERS) != claim_fingerprint(claim(total_amount=4300), PLACEHOLDERS)
+
+
+def test_no_fingerprint_from_agent_defaults():
+    for field, default in PLACEHOLDERS["bill"].items():
+        assert claim_fingerprint(claim(**{field: default}), PLACEHOLDERS) is None
+    assert claim_fingerprint(claim()[1:], PLACEHOLDERS) is None
+    documents = claim()
+    documents[1]["patient_name"] = PLACEHOLDERS["discharge_summary"]["patient_name"]
+    documents[2]["patient_name"] = PLACEHOLDERS["id_card"]["patient_name"]
+    assert claim_fingerprint(documents, PLACEHOLDERS) is None
+
+
+def test_fingerprint_without_id_number():
+    without_card = claim()[:2]
+    assert claim_fingerprint(without_card, PLACEHOLDERS) is not None
+    assert claim_fingerprint(without_card, PLACEHOLDERS) != claim_fingerprint(claim(), PLACEHOLDERS)
+    documents = claim()
+    documents[2]["id_number"] = PLACEHOLDERS["id_card"]["id_number"]
+    assert claim_fingerprint(documents, PLACEHOLDERS) == claim_fingerprint(without_card, PLACEHOLDERS)
+
+
+def test_id_cards_are_not_signed():
+    pages = ["Member: Jane Roe\nMember ID: HP123456\nInsurance: Acme Health"]
+    assert document_signature(pages, 2, "id_card") is None
+    assert document_signature(pages, 2, "bill") == text_signature(pages[0])
+    documents = claim()
+    signatures = [text_signature(f"text of document {index}") for index in range(3)]
+    assert [document["type"] for document, _ in DuplicateIndex._signed(documents, signatures)] == \
+        ["bill", "discharge_summary"]
+
+
+TEMPLATE = """CITY HOSPITAL
+Patient billing statement. Please keep this statement for your records.
+Patient: {name}  Date of service: {date}
+Room and board  {room}
+Laboratory services  {lab}
+Total amount due: {total}
+Payment is due within 30 days of the statement date. Charges not covered by
+your insurance plan are the responsibility of the patient. For questions about
+this statement contact the billing office, Monday to Friday, 8am to 5pm.
+Thank you for choosing City Hospital for your care."""
+
+
+def test_template_bills_of_different_patients_are_not_duplicates(tmp_path):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'duplicates.db'}")
+    db.init_app(app)
+    index = DuplicateIndex()
+    index.init_app(app)
+    index.placeholders = PLACEHOLDERS
+    first = TEMPLATE.format(name="Jane Roe", date="2024-03-02", room="3,600.00", lab="600.00", total="4,200.00")
+    second = TEMPLATE.format(name="John Doe", date="2024-05-11", room="1,800.00", lab="250.00", total="2,050.00")
+    other = claim(total_amount=2050, date_of_service="2024-05-11")
+    other[1]["patient_name"] = other[2]["patient_name"] = "John Doe"
+    other[2]["id_number"] = "HP654321"
+    with app.app_context():
+        db.create_all()
+        index.add(claim(), [text_signature(first), None, None], "first")
+        assert index.find(other, [text_signature(second), None, None], "second") == []
+        assert index.find(claim(), [text_signature(first), None, None], "again") != []
+
+        index.near_duplicates = True
+        rescanned = claim(total_amount=4300)
+        assert index.find(rescanned, [text_signature(first), None, None], "rescan") == \
+            ["Document bill is a near-duplicate (100% similar) of a document in claim first"]
@@ -0,0 +1,121 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.routes.claim import AdvancedClaimValidator, EpisodeIndex
+
+START = datetime(2024, 1, 1)
+
+
+def random_stays(rng, count):
+    stays = []
+    for number in range(count):
+        admission = START + timedelta(days=rng.randrange(120))
+        stays.append((admission, admission + timedelta(days=rng.randrange(15)), {"number": number}))
+    return stays
+
+
+def contains(stay, day):
+    return stay[0] <= day <= stay[1]
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 5, 40])
+def test_index_matches_pairwise_checks(count):
+    rng = random.Random(count)
+    for _ in range(50):
+        index = EpisodeIndex(random_stays(rng, count))
+        for offset in range(-2, 140):
+            day = START + timedelta(days=offset)
+            found = index.find(day)
+            if any(contains(stay, day) for stay in index.episodes):
+                assert found is not None and contains(index.episodes[found], day)
+            else:
+                assert found is None
+        # An episode is reported as overlapping exactly when it overlaps an
+        # earlier admitted one, and only overlapping pairs are reported
+        overlapping = {later for later in range(count) for earlier in range(later)
+                       if index.episodes[later][0] <= index.episodes[earlier][1]}
+        assert {later for _, later in index.overlaps()} == overlapping
+        for earlier, later in index.overlaps():
+            assert index.episodes[later][0] <= index.episodes[earlier][1]
+
+
+def day(value):
+    return value.strftime("%Y-%m-%d")
+
+
+def claim(rng, stays, bills):
+    documents = [{"type": "discharge_summary", "patient_name": "Jane Roe", "admission_date": day(admission),
+                  "discharge_date": day(discharge)} for admission, discharge, _ in stays]
+    documents += [{"type": "bill", "hospital_name": "City Hospital", "total_amount": rng.randrange(100, 5000),
+                   "date_of_service": day(START + timedelta(days=rng.randrange(-5, 140)))} for _ in range(bills)]
+    rng.shuffle(documents)
+    return documents
+
+
+def test_episode_validation_matches_pairwise_matching():
+    rng = random.Random(11)
+    validator = AdvancedClaimValidator(episodes=True)
+    for _ in range(200):
+        # Disjoint stays, so every matched bill has exactly one episode
+        stays, admission = [], START
+        for _ in range(rng.randint(1, 6)):
+            admission += timedelta(days=rng.randrange(1, 10))
+            discharge = admission + timedelta(days=rng.randrange(8))
+            stays.append((admission, discharge, {}))
+            admission = discharge
+        documents = claim(rng, stays, rng.randint(0, 12))
+        result = validator.validate(documents)
+
+        expected_episodes = []
+        for admission, discharge, _ in stays:
+            matched = [doc["total_amount"] for doc in documents if doc["type"] == "bill"
+                       and day(admission) <= doc["date_of_service"] <= day(discharge)]
+            expected_episodes.append({"admission_date": day(admission), "discharge_date": day(discharge),
+                                      "bills": len(matched), "total_amount": round(float(sum(matched)), 2)})
+        bills = [doc for doc in documents if doc["type"] == "bill"]
+        expected_unmatched = [
+            {"bill": number, "date_of_service": doc["date_of_service"], "total_amount": doc["total_amount"]}
+            for number, doc in enumerate(bills, 1)
+            if not any(day(admission) <= doc["date_of_service"] <= day(discharge) for admission, discharge, _ in stays)
+        ]
+        assert result["episodes"] == expected_episodes
+        assert result["unmatched_bills"] == expected_unmatched
+        assert not any("Overlapping" in message for message in result["discrepancies"])
+
+
+def reference_single(documents):
+    """The validator's date checks as they were before the episode index"""
+    discrepancies = []
+    bills = [doc for doc in documents if doc.get("type") == "bill"]
+    discharges = [doc for doc in documents if doc.get("type") == "discharge_summary"]
+    if bills and discharges:
+        try:
+            bill_date = datetime.strptime(bills[0]["date_of_service"], "%Y-%m-%d")
+            admission_date = datetime.strptime(discharges[0]["admission_date"], "%Y-%m-%d")
+            discharge_date = datetime.strptime(discharges[0]["discharge_date"], "%Y-%m-%d")
+            if discharge_date < admission_date:
+                discrepancies.append("Discharge date is before admission date")
+            if bill_date < admission_date or bill_date > discharge_date:
+                discrepancies.append("Service date is outside admission period")
+        except (KeyError, TypeError, ValueError):
+            pass
+    return discrepancies
+
+
+def test_single_mode_matches_first_bill_check():
+    rng = random.Random(5)
+    validator = AdvancedClaimValidator()
+    for _ in range(300):
+        stays = random_stays(rng, rng.randint(0, 3))
+        stays = [(discharge, admission, doc) if rng.random() < 0.2 else (admission, discharge, doc)
+                 for admission, discharge, doc in stays]
+        documents = claim(rng, stays, rng.randint(0, 3))
+        for doc in documents:
+            if rng.random() < 0.1:
+                doc["date_of_service" if doc["type"] == "bill" else "admission_date"] = "2024-02-30"
+        result = validator.validate(documents)
+        assert result["discrepancies"] == reference_single(documents)
+        assert result["missing_documents"] == [kind for kind in ("bill", "discharge_summary")
+                                               if not any(doc["type"] == kind for doc in documents)]
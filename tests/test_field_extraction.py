@@ -0,0 +1,151 @@
+import random
+import re
+from datetime import datetime
+
+import pytest
+
+from src.routes.claim import AdvancedBillAgent, AdvancedDischargeAgent, AdvancedIDCardAgent
+
+# The agents' patterns as they were before FieldExtractor, tried the way they
+# were: re.findall over the whole text, keeping matches[0]
+TEXT_LINE = r"([^\n\r]+?)(?:\n|\r|$)"
+AMOUNT = r"(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)"
+LEGACY_FIELDS = {
+    "bill": [
+        ("hospital_name", "text", "ABC Hospital", 100, [
+            r"(?i)(?:hospital|medical center|clinic|health center|healthcare)[:\s]*" + TEXT_LINE,
+            r"(?i)([^\n\r]*(?:hospital|medical center|clinic|health center|healthcare)[^\n\r]*)",
+            r"(?i)(?:facility|provider)[:\s]*" + TEXT_LINE,
+            r"(?i)bill\s+from[:\s]*" + TEXT_LINE,
+        ]),
+        ("total_amount", "amount", 12500, None, [
+            r"(?i)total[^\d]*?" + AMOUNT,
+            r"(?i)amount\s+due[^\d]*?" + AMOUNT,
+            r"(?i)balance[^\d]*?" + AMOUNT,
+            r"\$\s*" + AMOUNT,
+            r"(?i)charges[^\d]*?" + AMOUNT,
+            AMOUNT + r"\s*(?:total|amount|due)",
+        ]),
+        ("date_of_service", "date", "2024-04-10", None, [
+            r"(?i)(?:date\s+of\s+service|service\s+date)[^\d]*?(\d{4}-\d{2}-\d{2})",
+            r"(?i)(?:date\s+of\s+service|service\s+date)[^\d]*?(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
+            r"(\d{4}-\d{2}-\d{2})",
+            r"(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
+        ]),
+    ],
+    "discharge_summary": [
+        ("patient_name", "text", "John Doe", 50, [
+            r"(?i)patient[^\w]*name[^\w]*:?\s*" + TEXT_LINE,
+            r"(?i)patient[^\w]*:?\s*" + TEXT_LINE,
+            r"(?i)name[^\w]*:?\s*" + TEXT_LINE,
+        ]),
+        ("diagnosis", "text", "Fracture", 100, [
+            r"(?i)(?:primary\s+)?diagnosis[^\w]*:?\s*" + TEXT_LINE,
+            r"(?i)condition[^\w]*:?\s*" + TEXT_LINE,
+            r"(?i)medical\s+condition[^\w]*:?\s*" + TEXT_LINE,
+        ]),
+        ("admission_date", "date", "2024-04-01", None, [
+            r"(?i)admission\s+date[^\d]*?(\d{4}-\d{2}-\d{2})",
+            r"(?i)admitted[^\d]*?(\d{4}-\d{2}-\d{2})",
+            r"(?i)admission[^\d]*?(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
+        ]),
+        ("discharge_date", "date", "2024-04-10", None, [
+            r"(?i)discharge\s+date[^\d]*?(\d{4}-\d{2}-\d{2})",
+            r"(?i)discharged[^\d]*?(\d{4}-\d{2}-\d{2})",
+            r"(?i)discharge[^\d]*?(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
+        ]),
+    ],
+    "id_card": [
+        ("patient_name", "text", "John Doe", 50, [
+            r"(?i)(?:name|member)[^\w]*:?\s*" + TEXT_LINE,
+            r"(?i)cardholder[^\w]*:?\s*" + TEXT_LINE,
+        ]),
+        ("id_number", "text", "ID123456789", 30, [
+            r"(?i)(?:id|member|policy)\s*(?:number|#)[^\w]*:?\s*([^\n\r\s]+)",
+            r"(?i)(?:id|member|policy)[^\w]*:?\s*([^\n\r\s]+)",
+        ]),
+        ("insurance_provider", "text", "Health Insurance Co.", 100, [
+            r"(?i)(?:insurance|provider|company)[^\w]*:?\s*" + TEXT_LINE,
+        ]),
+    ],
+}
+
+
+def legacy_value(kind, candidate, longest):
+    """The accepted value of a first match, or None to try the next pattern"""
+    if kind == "text":
+        candidate = candidate.strip()
+        return candidate if 3 < len(candidate) < longest else None
+    if kind == "amount":
+        try:
+            amount = float(candidate.replace(",", ""))
+        except ValueError:
+            return None
+        return int(amount) if 100 <= amount <= 1000000 else None
+    parts = candidate.split("/") if "/" in candidate else candidate.split("-")
+    if len(parts) != 3:
+        return None
+    if len(parts[2]) == 4:
+        formatted = f"{parts[2]}-{parts[0].zfill(2)}-{parts[1].zfill(2)}"
+    else:
+        formatted = f"{parts[0]}-{parts[1].zfill(2)}-{parts[2].zfill(2)}"
+    try:
+        datetime.strptime(formatted, "%Y-%m-%d")
+    except ValueError:
+        return None
+    return formatted
+
+
+def legacy_process(doc_type, text):
+    result = {"type": doc_type}
+    for name, kind, default, longest, patterns in LEGACY_FIELDS[doc_type]:
+        result[name] = default
+        for pattern in patterns:
+            matches = re.findall(pattern, text)
+            if matches:
+                value = legacy_value(kind, matches[0], longest)
+                if value is not None:
+                    result[name] = value
+                    break
+    return result
+
+
+AGENTS = {"bill": AdvancedBillAgent(), "discharge_summary": AdvancedDischargeAgent(), "id_card": AdvancedIDCardAgent()}
+
+DOCUMENTS = [
+    "CITY GENERAL HOSPITAL\nDate of Service: 04/10/2024\nTotal Amount Due: $12,450.00\n",
+    "Bill from: Riverside Clinic\r\nService date 2024-02-30\r\nCharges 950\r\nBalance 1,200.50",
+    "Hospital:\nFacility: St. Mary's Medical Center\nTotal: 50\nAmount due 99\n$ 2,500.00\n13/45/2024 4/5/2024",
+    "DISCHARGE SUMMARY\nPatient Name: Jane Roe\nPrimary Diagnosis: Closed fracture of radius\n"
+    "Admission Date: 2024-04-01\nDischarge Date: 2024-04-10\n",
+    "Patient: Al\nName: Maria Garcia Lopez\nCondition: stable\nAdmitted on 2024-03-03\nDischarged 2024-03-09",
+    "admission 3/4/2024\ndischarge 3/12/2024\nMedical condition: Pneumonia, resolved",
+    "Member: Jane Roe\nMember ID: HP-44120931\nInsurance: Acme Health Plans\n",
+    "Cardholder: Sam Lee\nPolicy # AB1\nPolicy Number: PN-778812\nProvider: SecureLife Health",
+    "ID: x\nid card\nCompany: HealthFirst Insurance Co.",
+    "",
+]
+
+FRAGMENTS = [
+    "Hospital: City Care", "medical center", "Clinic", "Facility: Lakeside", "Provider:", "bill from Mercy",
+    "Total", "Total: 1,234.56", "total 99", "Amount Due 3,000", "balance: 12", "$ 250", "charges 100000.00",
+    "750 total", "1,000,001 amount", "Date of Service: 2024-13-01", "service date 02/29/2024", "2023-12-31",
+    "12-25-2023", "1/2/2024", "Patient Name: Jo", "Patient: Ana Maria Rodriguez", "name: Bob Stone",
+    "Primary Diagnosis: Acute appendicitis", "Diagnosis:", "condition - stable", "Admission Date: 2024-01-05",
+    "admitted 2024-01-06", "Admission 1/5/2024", "Discharge Date 2024-01-09", "discharged: 2024-01-10",
+    "Discharge 1/11/2024", "Member: Lee", "member id: M-1", "ID # ABCD1234", "Policy: PX-99", "Insurance: Acme",
+    "company MediCare Plus", "cardholder Ann", "filler text with no fields", "x" * 120,
+]
+
+
+def random_documents(count, seed=5):
+    rng = random.Random(seed)
+    for _ in range(count):
+        separator = rng.choice(["\n", "\r\n", "\r", " "])
+        yield separator.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 10)))
+
+
+@pytest.mark.parametrize("doc_type", list(AGENTS))
+def test_agents_match_legacy_regexes(doc_type):
+    for text in DOCUMENTS + list(random_documents(1500)):
+        assert AGENTS[doc_type].process(text) == legacy_process(doc_type, text), text
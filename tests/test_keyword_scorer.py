@@ -0,0 +1,66 @@
+import random
+
+from src.routes.claim import DOCUMENT_INDICATORS, AdvancedDocumentClassifier
+from src.services.keyword_scorer import KeywordScorer
+
+WORDS = ("bill", "invoice", "amount", "due", "discharge", "summary", "patient", "member", "id", "card",
+         "policy", "number", "insurance", "hospital", "course", "statement", "the", "of", "billing")
+
+
+def reference_classify(filename, text_content):
+    """The classifier as it was before indicators moved to KeywordScorer"""
+    filename_lower, content_lower = filename.lower(), text_content.lower()
+    bill = DOCUMENT_INDICATORS.indicators("bill")
+    discharge = DOCUMENT_INDICATORS.indicators("discharge_summary")
+    id_card = DOCUMENT_INDICATORS.indicators("id_card")
+    if any(indicator in filename_lower for indicator in bill):
+        return "bill"
+    elif any(indicator in filename_lower for indicator in discharge):
+        return "discharge_summary"
+    elif any(indicator in filename_lower for indicator in id_card):
+        return "id_card"
+    bill_score = sum(1 for indicator in bill if indicator in content_lower)
+    discharge_score = sum(1 for indicator in discharge if indicator in content_lower)
+    id_score = sum(1 for indicator in id_card if indicator in content_lower)
+    if bill_score >= discharge_score and bill_score >= id_score:
+        return "bill"
+    elif discharge_score >= id_score:
+        return "discharge_summary"
+    return "id_card"
+
+
+def test_classifier_matches_reference():
+    rng = random.Random(7)
+    classifier = AdvancedDocumentClassifier()
+    for _ in range(2000):
+        filename = "_".join(rng.choice(WORDS + ("scan", "doc", "2024")) for _ in range(rng.randint(0, 2))) + ".pdf"
+        text = " ".join(rng.choice(WORDS).upper() if rng.random() < 0.2 else rng.choice(WORDS)
+                        for _ in range(rng.randint(0, 12)))
+        assert classifier.classify_document(filename, text) == reference_classify(filename, text), (filename, text)
+
+
+def test_shared_and_overlapping_indicators_count_per_label():
+    scorer = KeywordScorer()
+    scorer.register("a", ["member", "member id", "id"])
+    scorer.register("b", ["id", "card"])
+    assert scorer.find("member id card") == {"member", "member id", "id", "card"}
+    assert scorer.score("member id card") == {"a": 3, "b": 2}
+    assert scorer.score("nothing here") == {"a": 0, "b": 0}
+    assert scorer.best("nothing here") == "a"
+    assert scorer.first_match("a card") == "b"
+    scorer.register("a", ["card"])
+    assert scorer.find("member id card") == {"id", "card"}
+
+
+def test_automaton_matches_substring_scan():
+    rng = random.Random(3)
+    indicators = ["".join(rng.choice("abc ") for _ in range(rng.randint(1, 5))).strip() or "a" for _ in range(60)]
+    scanned, automaton = KeywordScorer(), KeywordScorer(automaton_min_indicators=1)
+    for index in range(6):
+        scanned.register(f"label_{index}", indicators[index * 10:index * 10 + 10])
+        automaton.register(f"label_{index}", indicators[index * 10:index * 10 + 10])
+    assert scanned._automaton is None and automaton._automaton is not None
+    for _ in range(500):
+        text = "".join(rng.choice("abcd ") for _ in range(rng.randint(0, 40)))
+        assert automaton.find(text) == scanned.find(text), text
+        assert automaton.score(text) == scanned.score(text)
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from flask import Flask
+
+from src.services.metrics import Metrics
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_startup_sweeps_files_of_exited_processes(tmp_path):
+    snapshot = {"counters": [["claims_total", {}, 3]], "histograms": []}
+    dead = tmp_path / f"metrics-{exited_pid()}-0000abcd.json"
+    alive = tmp_path / f"metrics-{os.getppid()}-0000abcd.json"
+    for path in (dead, alive, tmp_path / f"metrics-{exited_pid()}-0000abcd.json.tmp"):
+        path.write_text(json.dumps(snapshot))
+
+    app = Flask(__name__)
+    app.config.update(METRICS_DIR=str(tmp_path), CLAIM_TIMING_LOG="")
+    metrics = Metrics()
+    metrics.counter("claims_total", "Claims")
+    metrics.init_app(app)
+    metrics.inc("claims_total")
+
+    assert not dead.exists() and alive.exists()
+    assert "claims_total 4" in metrics.render()
+    assert sorted(os.listdir(tmp_path)) == sorted([alive.name, os.path.basename(metrics._path)])
+    metrics.stop()
+
+
+def test_idle_process_publishes_its_last_updates(tmp_path):
+    app = Flask(__name__)
+    app.config.update(METRICS_DIR=str(tmp_path), METRICS_FLUSH_SECONDS=0.05, CLAIM_TIMING_LOG="")
+    serving, scraped = Metrics(), Metrics()
+    for metrics in (serving, scraped):
+        metrics.counter("claims_total", "Claims")
+        metrics.init_app(app)
+    try:
+        serving.inc("claims_total", 2)
+        # No further claims and no exit: the publisher thread writes the file
+        time.sleep(0.5)
+        assert "claims_total 2" in scraped.render()
+    finally:
+        serving.stop()
+        scraped.stop()
@@ -0,0 +1,45 @@
+import threading
+
+from src.services.profiling import Profile
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+def test_overlapping_deterministic_profiles_fall_back_to_sampling():
+    outer = Profile("deterministic", interval=0.001)
+    with outer:
+        inner = Profile("deterministic", interval=0.001)
+        with inner:
+            busy(200_000)
+        busy(1000)
+    assert outer.mode == "deterministic" and outer.stats
+    assert inner.mode == "sampling" and inner.stacks
+    again = Profile("deterministic")
+    with again:
+        busy(1000)
+    assert again.mode == "deterministic"
+
+
+def test_overlapping_deterministic_profiles_in_threads():
+    profiles, errors = [], []
+    inside = threading.Barrier(4)
+
+    def profiled():
+        try:
+            profile = Profile("deterministic", interval=0.001)
+            with profile:
+                inside.wait(10)
+                busy(10_000)
+            profiles.append(profile)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=profiled) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert sorted(profile.mode for profile in profiles) == ["deterministic"] + ["sampling"] * 3
@@ -0,0 +1,41 @@
+import datetime
+import decimal
+import json
+import uuid
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from src.services.responses import OrjsonProvider
+
+VALUES = [
+    {"b": 1, "a": [1, 2.5, None, True], "nested": {"z": "", "y": -3}},
+    {"amount": 1e20, "small": 1e-7, "total": 4200.0},
+    {"date": datetime.date(2024, 1, 2), "at": datetime.datetime(2024, 1, 2, 3, 4, 5)},
+    {"amount": decimal.Decimal("1.50"), "id": uuid.UUID(int=7)},
+    {"patient_name": "José Muñoz", "total": "₹500", "note": "  </script>"},
+    {"big": 2 ** 70},
+]
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_response_decodes_like_the_default_provider(app, value):
+    with app.app_context():
+        expected = DefaultJSONProvider(app).response(value).get_data()
+        actual = OrjsonProvider(app).response(value).get_data()
+    assert json.loads(actual) == json.loads(expected)
+    assert list(json.loads(actual)) == list(json.loads(expected))
+
+
+def test_non_ascii_is_written_as_utf8(app):
+    with app.app_context():
+        default = DefaultJSONProvider(app).response({"name": "José"}).get_data()
+        body = OrjsonProvider(app).response({"name": "José"}).get_data()
+    assert default == b'{"name":"Jos\\u00e9"}\n'
+    assert body == '{"name":"José"}\n'.encode("utf-8")
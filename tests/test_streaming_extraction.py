@@ -0,0 +1,80 @@
+import random
+from io import BytesIO
+
+import pytest
+
+from benchmarks.synthetic_pdf import KINDS, PLACEMENTS, claim_facts, synthetic_document
+from src.routes.claim import (
+    AdvancedBillAgent, AdvancedDischargeAgent, AdvancedIDCardAgent, PdfPageStream, process_document,
+)
+
+AGENTS = {"bill": AdvancedBillAgent(), "discharge_summary": AdvancedDischargeAgent(), "id_card": AdvancedIDCardAgent()}
+
+# Field lines and near misses, so that different patterns of one field match
+# on different pages
+FRAGMENTS = [
+    "Hospital: City Care", "Riverside medical center", "Facility: Lakeside", "bill from Mercy", "Total: 50",
+    "Total: 1,234.56", "Amount Due 3,000", "$ 250", "750 total", "Date of Service: 2024-13-01", "2023-12-31",
+    "service date 02/29/2024", "1/2/2024", "Patient Name: Jo", "Patient: Ana Maria Rodriguez", "name: Bob Stone",
+    "Primary Diagnosis: Acute appendicitis", "condition - stable", "Admission Date: 2024-01-05",
+    "admitted 2024-01-06", "Admission 1/5/2024", "Discharge Date 2024-01-09", "Discharge 1/11/2024",
+    "Member: Lee", "ID # ABCD1234", "Policy: PX-99", "Insurance: Acme", "cardholder Ann", "",
+    "no fields on this line",
+]
+
+
+class Pages:
+    """Page texts served the way PdfPageStream serves a PDF's"""
+
+    def __init__(self, page_texts):
+        self.page_texts = page_texts
+        self.pages_total = len(page_texts)
+        self.pages_parsed = 0
+
+    def prefix(self, count):
+        self.pages_parsed = max(self.pages_parsed, min(count, self.pages_total))
+        complete = count >= self.pages_total
+        return PdfPageStream.join(self.page_texts[:count], complete), complete
+
+    def text(self):
+        return self.prefix(self.pages_total)[0]
+
+
+def random_pages(rng):
+    return ["\n".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 4))) for _ in range(rng.randint(1, 12))]
+
+
+@pytest.mark.parametrize("doc_type", KINDS)
+def test_agents_on_pulled_pages_match_full_text(doc_type):
+    rng = random.Random(3)
+    for _ in range(500):
+        page_texts = random_pages(rng)
+        expected = AGENTS[doc_type].process(Pages(page_texts).text())
+        assert AGENTS[doc_type].process_pages(Pages(page_texts)) == expected, page_texts
+
+
+@pytest.mark.parametrize("placement", PLACEMENTS)
+@pytest.mark.parametrize("pages", [1, 3, 9])
+def test_agents_on_pdf_pages_match_full_text(placement, pages):
+    rng = random.Random(pages)
+    facts = claim_facts(rng)
+    for doc_type in KINDS:
+        content = synthetic_document(doc_type, facts, rng, pages, lines_per_page=10, placement=placement)
+        expected = AGENTS[doc_type].process(PdfPageStream(BytesIO(content)).text())
+        assert AGENTS[doc_type].process_pages(PdfPageStream(BytesIO(content))) == expected
+
+
+@pytest.mark.parametrize("pages", [1, 6])
+def test_streaming_document_matches_full_extraction(pages):
+    # Classification reads the first pages in streaming mode, so the field
+    # lines go on the first page for both modes to pick the same agent
+    rng = random.Random(pages)
+    facts = claim_facts(rng)
+    for doc_type in KINDS:
+        content = synthetic_document(doc_type, facts, rng, pages, lines_per_page=10, placement="first")
+        full_payload, full_type, full_doc = process_document("scan.pdf", content, streaming=False)
+        payload, streamed_type, streamed_doc = process_document("scan.pdf", content, streaming=True)
+        assert (streamed_type, streamed_doc) == (full_type, full_doc)
+        assert full_type == doc_type
+        assert payload["pages"] == full_payload["pages"][:len(payload["pages"])]
+        assert payload["pages_total"] == full_payload["pages_total"] == pages
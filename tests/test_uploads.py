@@ -0,0 +1,96 @@
+import os
+import threading
+from io import BytesIO
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from src.routes.claim import process_documents
+from src.services.uploads import MappedUpload, UploadLimits, UploadTooLarge, as_buffer
+
+
+def blank_pdf(pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(612, 792)
+    out = BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("pages", [1, 7, 300])
+def test_count_pages_matches_page_tree(pages):
+    content = blank_pdf(pages)
+    assert UploadLimits.count_pages(content) == len(PdfReader(BytesIO(content)).pages) == pages
+
+
+def test_unreadable_upload_counts_no_pages():
+    assert UploadLimits.count_pages(b"not a pdf") == 0
+
+
+def test_reserve_yields_counts_and_enforces_request_cap():
+    limits = UploadLimits()
+    limits.request_pages = 10
+    jobs = [("a.pdf", blank_pdf(3)), ("b.pdf", b"garbage"), ("c.pdf", blank_pdf(4))]
+    with limits.reserve(jobs) as counts:
+        assert counts == [3, 0, 4]
+        assert limits.held_pages == 7
+    assert limits.held_pages == 0
+    with pytest.raises(UploadTooLarge):
+        with limits.reserve(jobs + [("d.pdf", blank_pdf(4))]):
+            pass
+
+
+def test_check_bytes_applies_per_claim_cap():
+    limits = UploadLimits()
+    limits.request_bytes = 100
+    limits.check_bytes(100)
+    with pytest.raises(UploadTooLarge):
+        limits.check_bytes(101)
+
+
+def test_reserve_waits_for_room():
+    limits = UploadLimits()
+    limits.request_pages = limits.global_pages = 0
+    limits.global_bytes = 10
+    jobs = [("a.pdf", b"x" * 6)]
+    with limits.reserve(jobs):
+        with pytest.raises(UploadTooLarge):
+            with limits.reserve(jobs):
+                pass
+    held = limits.reserve(jobs)
+    held.__enter__()
+    release = threading.Timer(0.2, held.__exit__, (None, None, None))
+    release.start()
+    with limits.reserve(jobs, wait=5) as counts:
+        assert counts == [0]
+        assert limits.held_bytes == 6
+    release.join()
+
+
+def test_mapped_upload_closes_its_mapping(tmp_path):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(blank_pdf(1))
+    with MappedUpload(str(path)) as upload:
+        mapping = upload.view()
+        assert as_buffer(upload)[:5] == b"%PDF-"
+    assert mapping.closed
+    assert upload.view()[:5] == b"%PDF-"
+    upload.close()
+
+
+def test_process_documents_leaves_no_mapping_open(tmp_path, monkeypatch):
+    opened = []
+    open_mapping = MappedUpload.open
+
+    def tracked_open(self):
+        opened.append(open_mapping(self))
+        return opened[-1]
+
+    monkeypatch.setattr(MappedUpload, "open", tracked_open)
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(blank_pdf(2) + b"%" + os.urandom(8).hex().encode())
+    upload = MappedUpload(str(path))
+    process_documents([("bill.pdf", upload)], workers=0)
+    assert upload._mapping is None
+    assert opened and all(mapping.closed for mapping in opened)
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from src.services.worker_pool import JobTimeout, in_worker_process, run_isolated, shutdown_pools
+
+
+def sleep_after_writing_pid(path, seconds):
+    with open(path, "a") as f:
+        f.write(f"{os.getpid()}\n")
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+@pytest.fixture(autouse=True)
+def pools():
+    yield
+    shutdown_pools()
+
+
+def test_timed_out_job_worker_is_killed(tmp_path):
+    path = str(tmp_path / "pids")
+    [(result, error)] = run_isolated(sleep_after_writing_pid, [(path, 20)], 1, timeout=1)
+    assert result is None
+    assert isinstance(error, JobTimeout)
+    with open(path) as f:
+        [pid] = [int(line) for line in f]
+    assert not _pid_alive(pid)
+
+
+def test_timeout_leaves_other_calls_jobs_running(tmp_path):
+    hung, healthy = str(tmp_path / "hung"), str(tmp_path / "healthy")
+    outcomes = {}
+
+    def run_healthy():
+        outcomes["healthy"] = run_isolated(sleep_after_writing_pid, [(healthy, 3)], 1, timeout=30)
+
+    thread = threading.Thread(target=run_healthy)
+    thread.start()
+    [(_, error)] = run_isolated(sleep_after_writing_pid, [(hung, 20)], 1, timeout=1)
+    thread.join()
+    assert isinstance(error, JobTimeout)
+    [(pid, healthy_error)] = outcomes["healthy"]
+    assert healthy_error is None
+    # Ran once, not restarted after the other call's workers were killed
+    with open(healthy) as f:
+        assert [int(line) for line in f] == [pid]
+
+
+SLOW_START_JOB = """import multiprocessing
+import time
+
+# Stands in for a worker that is slow to pick the job up
+if multiprocessing.current_process().name != "MainProcess":
+    time.sleep(2)
+
+
+def job():
+    return "done"
+"""
+
+
+def test_budget_starts_when_the_worker_starts_the_job(tmp_path, monkeypatch):
+    (tmp_path / "slow_start_job.py").write_text(SLOW_START_JOB)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    from slow_start_job import job
+
+    assert run_isolated(job, [()], 1, timeout=1) == [("done", None)]
+
+
+def serving_state(static_folder, database, storage):
+    """What a server process outside the claim pool sets up at startup"""
+    from flask import Flask
+
+    from src.models.user import db
+    from src.services.claim_jobs import ClaimJobQueue
+    from src.services.static_files import StaticFiles
+
+    app = Flask(__name__, static_folder=static_folder)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{database}", CLAIM_JOB_WORKERS=1,
+                      CLAIM_JOB_STORAGE=storage)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    static_files, queue = StaticFiles(), ClaimJobQueue(lambda job_id, uploads, config: {})
+    static_files.init_app(app)
+    queue.init_app(app)
+    state = (in_worker_process(), sorted(static_files._files), len(queue._threads))
+    queue.stop(10)
+    return state
+
+
+def test_pool_workers_are_marked():
+    assert run_isolated(in_worker_process, [(), ()], 2) == [(True, None), (True, None)]
+    assert not in_worker_process()
+
+
+def test_other_spawned_processes_are_not_pool_workers(tmp_path):
+    # As an ASGI server's worker processes are started
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "index.html").write_text("<html></html>")
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as server:
+        worker, files, threads = server.apply(
+            serving_state, (str(static), str(tmp_path / "jobs.db"), str(tmp_path / "claim_jobs")))
+    assert not worker
+    assert files == ["index.html"]
+    assert threads == 2